@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for the AdGuard Home rewrite API.
+Serves /control/rewrite/list, add, delete and update with HTTP/1.1
+keep-alive so adguard_sync.py can be exercised without a real AdGuard
+Home instance. It counts connections and requests and prints them on exit.
+
+Usage:
+    adguard_stub.py --port 3000
+    adguard_stub.py --port 3000 --seed adguard_dns.conf
+"""
+
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+class StubState:
+    """Rewrites and traffic counters shared by all connections."""
+
+    def __init__(self, rewrites: Optional[List[Tuple[str, str]]] = None):
+        self.rewrites = list(rewrites or [])
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class RewriteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state: StubState = None
+
+    def setup(self):
+        super().setup()
+        with self.state.lock:
+            self.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes = b'', content_type: str = 'text/plain'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def do_GET(self):
+        with self.state.lock:
+            self.state.requests += 1
+            rewrites = [{'domain': domain, 'answer': answer} for domain, answer in self.state.rewrites]
+        if self.path != '/control/rewrite/list':
+            self._reply(404, b'not found')
+            return
+        self._reply(200, json.dumps(rewrites).encode('utf-8'), 'application/json')
+
+    def _change(self):
+        try:
+            body = self._body()
+        except ValueError:
+            self._reply(400, b'invalid json')
+            return
+        with self.state.lock:
+            self.state.requests += 1
+            rewrites = self.state.rewrites
+            if self.path == '/control/rewrite/add' and self.command == 'POST':
+                rewrites.append((body['domain'], body['answer']))
+            elif self.path == '/control/rewrite/delete' and self.command == 'POST':
+                target = (body['domain'], body['answer'])
+                if target not in rewrites:
+                    self._reply(400, b'rewrite not found')
+                    return
+                rewrites.remove(target)
+            elif self.path == '/control/rewrite/update' and self.command == 'PUT':
+                target = (body['target']['domain'], body['target']['answer'])
+                if target not in rewrites:
+                    self._reply(400, b'rewrite not found')
+                    return
+                rewrites[rewrites.index(target)] = (body['update']['domain'], body['update']['answer'])
+            else:
+                self._reply(404, b'not found')
+                return
+        self._reply(200)
+
+    do_POST = _change
+    do_PUT = _change
+
+
+def serve(host: str, port: int, state: StubState) -> ThreadingHTTPServer:
+    """Return a server bound to (host, port) backed by ``state``; call serve_forever() on it."""
+    handler = type('Handler', (RewriteHandler,), {'state': state})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def load_seed(path: Path) -> List[Tuple[str, str]]:
+    """Read rewrites from an adguard_dns.conf file ("domain type value" per line)."""
+    rewrites = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 3 and not line.startswith('#'):
+                rewrites.append((fields[0], fields[2]))
+    return rewrites
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Serve an in-memory AdGuard Home rewrite API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--seed', type=Path, help="Start with the rewrites in this adguard_dns.conf")
+    args = parser.parse_args()
+
+    state = StubState(load_seed(args.seed) if args.seed else None)
+    server = serve(args.host, args.port, state)
+    print(f"AdGuard Home stub listening on http://{args.host}:{server.server_port} "
+          f"with {len(state.rewrites)} rewrite(s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{state.requests} request(s) over {state.connections} connection(s); "
+              f"{len(state.rewrites)} rewrite(s) at exit")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Sync AdGuard Home DNS rewrites with contracts/dns-zones.yaml.
+Fetches the current rewrites over the AdGuard Home HTTP API, computes the
+minimal add/update/delete diff for the contract's zones and applies it over
+one keep-alive connection, in batches. Rewrites outside the contract's zones
+are left alone. Rewrites take effect immediately; AdGuard is not restarted.
+
+Usage:
+    adguard_sync.py --url http://10.0.1.53:3000 --dry-run
+    ADGUARD_USERNAME=admin ADGUARD_PASSWORD=... adguard_sync.py --url http://10.0.1.53:3000
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate_dns_config import DNSConfigGenerator  # noqa: E402
+# generate_dns_config puts scripts/validation on the path
+from cli_types import positive_int  # noqa: E402
+
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_TIMEOUT = 10.0
+
+# Requests that are safe to resend after the response was lost
+IDEMPOTENT_METHODS = ('GET',)
+
+# Times a sync re-reads the server and re-diffs after a change was lost in flight
+MAX_RESYNCS = 3
+
+Rewrite = Tuple[str, str]
+
+
+class AdGuardError(Exception):
+    """An AdGuard Home API request failed."""
+
+
+class OutcomeUnknown(AdGuardError):
+    """A change was sent but the connection dropped before its response arrived."""
+
+
+class AdGuardClient:
+    """AdGuard Home rewrite API client over a single persistent HTTP connection.
+
+    Every request reuses the same keep-alive connection. It is reopened
+    transparently if the server closed it while idle, which shows as a
+    failure to send on a reused connection. Once a request has been sent, a
+    dropped connection is only retried for idempotent methods; for changes
+    it raises OutcomeUnknown, since the server may have applied them.
+    ``requests`` and ``connections`` count what was actually sent.
+    """
+
+    def __init__(self, base_url: str, username: Optional[str] = None, password: Optional[str] = None,
+                 timeout: float = DEFAULT_TIMEOUT):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"invalid AdGuard Home URL: {base_url!r}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if username is not None:
+            token = base64.b64encode(f"{username}:{password or ''}".encode('utf-8')).decode('ascii')
+            self.headers['Authorization'] = f"Basic {token}"
+        self.requests = 0
+        self.connections = 0
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self._supports_update = True
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._connection = cls(self.host, self.port, timeout=self.timeout)
+            self.connections += 1
+        return self._connection
+
+    def request(self, method: str, path: str, body: Any = None) -> Tuple[int, bytes]:
+        """Send one request and return (status, body), reconnecting once on a stale connection."""
+        payload = None if body is None else json.dumps(body).encode('utf-8')
+        for attempt in (1, 2):
+            reused = self._connection is not None
+            connection = self._connect()
+            try:
+                connection.request(method, self.prefix + path, body=payload, headers=self.headers)
+            except (BrokenPipeError, ConnectionResetError) as e:
+                # The server closed the idle connection before reading this request
+                self.close()
+                if reused and attempt == 1:
+                    continue
+                raise AdGuardError(f"{method} {path}: {e}")
+            except OSError as e:
+                self.close()
+                raise AdGuardError(f"{method} {path}: {e}")
+            try:
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                self.close()
+                if method in IDEMPOTENT_METHODS and reused and attempt == 1:
+                    continue
+                if method in IDEMPOTENT_METHODS:
+                    raise AdGuardError(f"{method} {path}: {e}")
+                raise OutcomeUnknown(f"{method} {path}: connection lost after sending ({e})")
+            except OSError as e:
+                self.close()
+                raise AdGuardError(f"{method} {path}: {e}")
+            self.requests += 1
+            if response.will_close:
+                self.close()
+            return response.status, data
+        raise AssertionError("unreachable")
+
+    def _call(self, method: str, path: str, body: Any = None) -> bytes:
+        status, data = self.request(method, path, body)
+        if status != 200:
+            message = data.decode('utf-8', 'replace').strip()
+            raise AdGuardError(f"{method} {path} returned HTTP {status}" + (f": {message}" if message else ""))
+        return data
+
+    def list_rewrites(self) -> List[Rewrite]:
+        """Return every configured rewrite as (domain, answer)."""
+        entries = json.loads(self._call('GET', '/control/rewrite/list') or b'[]') or []
+        return [(str(entry['domain']), str(entry['answer'])) for entry in entries]
+
+    def add(self, rewrite: Rewrite):
+        self._call('POST', '/control/rewrite/add', {'domain': rewrite[0], 'answer': rewrite[1]})
+
+    def delete(self, rewrite: Rewrite):
+        self._call('POST', '/control/rewrite/delete', {'domain': rewrite[0], 'answer': rewrite[1]})
+
+    def update(self, old: Rewrite, new: Rewrite):
+        """Replace ``old`` with ``new`` in one request where the server supports it.
+
+        Servers older than v0.107.33 have no update endpoint. For them this
+        falls back to a delete followed by an add.
+        """
+        if self._supports_update:
+            status, data = self.request('PUT', '/control/rewrite/update', {
+                'target': {'domain': old[0], 'answer': old[1]},
+                'update': {'domain': new[0], 'answer': new[1]},
+            })
+            if status == 200:
+                return
+            if status not in (404, 405):
+                message = data.decode('utf-8', 'replace').strip()
+                raise AdGuardError(f"PUT /control/rewrite/update returned HTTP {status}"
+                                   + (f": {message}" if message else ""))
+            self._supports_update = False
+        self.delete(old)
+        self.add(new)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class RewriteDiff:
+    """Minimal set of changes turning the current rewrites into the desired ones.
+
+    Deleted rewrites, and the old side of updates, carry the domain and
+    answer exactly as the server listed them, so they match on delete.
+    """
+
+    def __init__(self, add: List[Rewrite], delete: List[Rewrite], update: List[Tuple[Rewrite, Rewrite]],
+                 unchanged: int, unmanaged: int):
+        self.add = add
+        self.delete = delete
+        self.update = update
+        self.unchanged = unchanged
+        self.unmanaged = unmanaged
+
+    def __len__(self) -> int:
+        return len(self.add) + len(self.delete) + len(self.update)
+
+    def operations(self) -> List[Tuple[str, Any]]:
+        """Operations in apply order: deletes first, so a domain never briefly has two answers."""
+        return ([('delete', rewrite) for rewrite in self.delete] +
+                [('update', pair) for pair in self.update] +
+                [('add', rewrite) for rewrite in self.add])
+
+
+def _managed(domain: str, zones: Set[str]) -> bool:
+    labels = domain.split('.')
+    return any('.'.join(labels[i:]) in zones for i in range(len(labels)))
+
+
+def diff_rewrites(current: Iterable[Rewrite], desired: Iterable[Rewrite], zones: Iterable[str]) -> RewriteDiff:
+    """Diff ``current`` against ``desired`` within ``zones``.
+
+    Domains are compared case-insensitively. A domain that changes exactly
+    one answer becomes one update rather than a delete plus an add. Server
+    entries that differ only in domain case or a trailing dot are all
+    deleted when their rewrite goes.
+    """
+    zone_set = {zone.strip().lower().rstrip('.') for zone in zones}
+    originals: Dict[Rewrite, List[Rewrite]] = {}
+    unmanaged = 0
+    for domain, answer in current:
+        normalized = domain.strip().lower().rstrip('.')
+        if _managed(normalized, zone_set):
+            originals.setdefault((normalized, answer), []).append((domain, answer))
+        else:
+            unmanaged += 1
+    current_set = set(originals)
+    desired_set = set(desired)
+
+    deletes: Dict[str, List[Rewrite]] = {}
+    for rewrite in sorted(current_set - desired_set):
+        deletes.setdefault(rewrite[0], []).extend(originals[rewrite])
+    adds: Dict[str, List[Rewrite]] = {}
+    for rewrite in sorted(desired_set - current_set):
+        adds.setdefault(rewrite[0], []).append(rewrite)
+
+    update = []
+    for domain in sorted(deletes.keys() & adds.keys()):
+        if len(deletes[domain]) == 1 and len(adds[domain]) == 1:
+            update.append((deletes.pop(domain)[0], adds.pop(domain)[0]))
+
+    return RewriteDiff(
+        add=[rewrite for rewrites in adds.values() for rewrite in rewrites],
+        delete=[rewrite for rewrites in deletes.values() for rewrite in rewrites],
+        update=update,
+        unchanged=len(current_set & desired_set),
+        unmanaged=unmanaged,
+    )
+
+
+def print_diff(diff: RewriteDiff):
+    """Print the diff one rewrite per line."""
+    for domain, answer in diff.delete:
+        print(f"- {domain}\t{answer}")
+    for (domain, old), (_, new) in diff.update:
+        print(f"~ {domain}\t{old} -> {new}")
+    for domain, answer in diff.add:
+        print(f"+ {domain}\t{answer}")
+    print(f"{len(diff.add)} to add, {len(diff.update)} to update, {len(diff.delete)} to delete, "
+          f"{diff.unchanged} unchanged, {diff.unmanaged} outside managed zones")
+
+
+def apply_diff(client: AdGuardClient, diff: RewriteDiff, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Apply ``diff`` in batches of ``batch_size`` operations, reporting progress per batch.
+
+    Raises OutcomeUnknown if a change may or may not have been applied; the
+    caller re-reads the server before going on.
+    """
+    operations = diff.operations()
+    batches = max(1, -(-len(operations) // batch_size))
+    for number, offset in enumerate(range(0, len(operations), batch_size), 1):
+        started = time.perf_counter()
+        for kind, item in operations[offset:offset + batch_size]:
+            if kind == 'delete':
+                client.delete(item)
+            elif kind == 'add':
+                client.add(item)
+            else:
+                client.update(*item)
+        count = len(operations[offset:offset + batch_size])
+        print(f"  Batch {number}/{batches}: {count} change(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+def sync(contracts_dir: Path, client: AdGuardClient, dry_run: bool = False,
+         batch_size: int = DEFAULT_BATCH_SIZE, store=None) -> RewriteDiff:
+    """Diff the contract against the server and, unless ``dry_run``, apply it."""
+    generator = DNSConfigGenerator(contracts_dir, store)
+    dns_data = generator.load_dns_zones()
+    zones = [zone.name for zone in generator._zones(dns_data)]
+    desired = list(generator.iter_rewrites(dns_data))
+
+    diff = diff_rewrites(client.list_rewrites(), desired, zones)
+    print_diff(diff)
+    if dry_run or not diff:
+        return diff
+
+    remaining = diff
+    for resync in range(MAX_RESYNCS + 1):
+        try:
+            apply_diff(client, remaining, batch_size)
+            return diff
+        except OutcomeUnknown as e:
+            if resync == MAX_RESYNCS:
+                raise
+            # Never resend a change blindly; see what the server has now
+            print(f"[WARNING] {e}; re-reading rewrites")
+            remaining = diff_rewrites(client.list_rewrites(), desired, zones)
+            if not remaining:
+                return diff
+            print_diff(remaining)
+
+
+def run(contracts_dir: Path, args, store=None) -> int:
+    """Execute a sync with parsed command-line ``args``."""
+    url = args.url or os.environ.get('ADGUARD_URL')
+    if not url:
+        print("Error: no AdGuard Home URL (use --url or ADGUARD_URL)")
+        return 1
+    try:
+        client = AdGuardClient(url, os.environ.get('ADGUARD_USERNAME'), os.environ.get('ADGUARD_PASSWORD'),
+                               args.timeout)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    started = time.perf_counter()
+    try:
+        diff = sync(contracts_dir, client, args.dry_run, args.batch_size, store)
+    except (AdGuardError, OSError, ValueError) as e:
+        print(f"[ERROR] AdGuard sync failed: {e}")
+        return 1
+    finally:
+        client.close()
+
+    action = "Dry run" if args.dry_run else "Synced"
+    print(f"[SUCCESS] {action}: {len(diff)} change(s), {client.requests} request(s) over "
+          f"{client.connections} connection(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Register the sync options on ``parser``."""
+    parser.add_argument('--url', help="AdGuard Home base URL (default: $ADGUARD_URL)")
+    parser.add_argument('--dry-run', action='store_true', help="Print the diff without changing anything")
+    parser.add_argument('--batch-size', type=positive_int, default=DEFAULT_BATCH_SIZE, help="Changes per batch")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="Per-request timeout in seconds")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Sync AdGuard Home DNS rewrites with dns-zones.yaml")
+    add_arguments(parser)
+    args = parser.parse_args()
+    sys.exit(run(Path(__file__).parent.parent / 'contracts', args))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,117 +4,244 @@ Generate DNS configuration from contracts/dns-zones.yaml.
 Supports multiple DNS server formats (AdGuard Home, BIND, etc.)
 """
 
-import yaml
 import sys
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Any
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'scripts' / 'validation'))
+
+from contract_model import ZoneRecords, dns_model, normalize_name  # noqa: E402
+from contract_store import ContractStore  # noqa: E402
+from dns_index import NAME_TYPES, iter_fqdns, record_value  # noqa: E402
+from output_pipeline import Artifact, Streamed, generate_artifacts  # noqa: E402
+from reverse_zones import ReverseZones, build_reverse_zones, iter_adguard_rules  # noqa: E402
+from zone_state import (initial_serial, iter_nsupdate, load_state, plan_zones, rdata,  # noqa: E402
+                        relative_name, state_document)
+
+
+# Record types AdGuard Home can serve as DNS rewrites
+REWRITE_TYPES = ('A', 'AAAA', 'CNAME')
+
+# Group-wide DNS vars; per-host records go to the network generator's vars shards
+ANSIBLE_VARS_FILE = 'group_vars/all/dns.yml'
+ANSIBLE_VARS_MARKER = "# Generated by infra/dns/generate_dns_config.py from contracts; do not edit"
 
 
 class DNSConfigGenerator:
-    def __init__(self, contracts_dir: Path):
+    def __init__(self, contracts_dir: Path, store: ContractStore = None):
         self.contracts_dir = contracts_dir
+        self.store = store or ContractStore.shared(contracts_dir)
         
     def load_dns_zones(self) -> Dict[str, Any]:
         """Load DNS zones from contracts."""
-        dns_file = self.contracts_dir / 'dns-zones.yaml'
-        
-        if not dns_file.exists():
-            print(f"Error: DNS zones file not found: {dns_file}")
+        if not self.store.exists('dns-zones.yaml'):
+            print(f"Error: DNS zones file not found: {self.contracts_dir / 'dns-zones.yaml'}")
             sys.exit(1)
         
-        with open(dns_file, 'r') as f:
-            return yaml.safe_load(f) or {}
+        return self.store.load('dns-zones.yaml')
     
-    def generate_adguard_config(self, dns_data: Dict[str, Any]) -> str:
-        """Generate AdGuard Home configuration."""
-        config_lines = []
-        config_lines.append("# AdGuard Home DNS configuration")
-        config_lines.append("# Generated from contracts/dns-zones.yaml")
-        config_lines.append("")
-        
-        if 'zones' not in dns_data:
-            return "\n".join(config_lines)
-        
-        for zone in dns_data['zones']:
-            zone_name = zone.get('name', '')
-            if not zone_name:
+    def load_reverse_zones(self, dns_data: Dict[str, Any]) -> ReverseZones:
+        """Build reverse zones from ipam.yaml, naming PTRs from ``dns_data``."""
+        ipam_data = self.store.load('ipam.yaml') if self.store.exists('ipam.yaml') else {}
+        return build_reverse_zones(ipam_data, dns_data)
+    
+    def planned_zones(self, dns_data: Dict[str, Any], reverse: ReverseZones) -> List[ZoneRecords]:
+        """Every zone written to BIND, forward then reverse, as zone state plans them."""
+        return list(self._zones(dns_data)) + list(self._zones(reverse.data))
+    
+    @staticmethod
+    def _zones(dns_data: Dict[str, Any], zones: Optional[List[str]] = None) -> Iterator[ZoneRecords]:
+        """Yield named zone record tables, optionally restricted to ``zones``."""
+        for zone in dns_model(dns_data).zones:
+            if not zone.name or (zones is not None and zone.name not in zones):
                 continue
+            yield zone
+    
+    @staticmethod
+    def write_lines(lines: Iterable[str], f: TextIO):
+        """Write ``lines`` joined by newlines without materializing them."""
+        first = True
+        for line in lines:
+            if not first:
+                f.write("\n")
+            f.write(line)
+            first = False
+    
+    def iter_adguard_config(self, dns_data: Dict[str, Any], zones: Optional[List[str]] = None) -> Iterator[str]:
+        """Yield AdGuard Home configuration lines one record at a time."""
+        yield "# AdGuard Home DNS configuration"
+        yield "# Generated from contracts/dns-zones.yaml"
+        yield ""
+        
+        for zone in self._zones(dns_data, zones):
+            zone_name = zone.name
             
-            config_lines.append(f"# Zone: {zone_name}")
+            yield f"# Zone: {zone_name}"
             
-            if 'records' in zone:
-                for record in zone['records']:
-                    name = record.get('name', '')
-                    record_type = record.get('type', 'A')
-                    value = record.get('value', '')
-                    
-                    if name and value:
-                        fqdn = f"{name}.{zone_name}" if name != zone_name else zone_name
-                        config_lines.append(f"{fqdn}\t{record_type}\t{value}")
+            for (fqdn, record_type), value in zip(iter_fqdns(zone), zone.values):
+                if fqdn and value:
+                    yield f"{fqdn}\t{record_type}\t{value}"
             
-            config_lines.append("")
-        
-        return "\n".join(config_lines)
+            yield ""
     
-    def generate_bind_config(self, dns_data: Dict[str, Any]) -> str:
-        """Generate BIND zone file format."""
-        config_lines = []
-        config_lines.append("; BIND zone file")
-        config_lines.append("; Generated from contracts/dns-zones.yaml")
-        config_lines.append("")
+    def iter_rewrites(self, dns_data: Dict[str, Any], zones: Optional[List[str]] = None) -> Iterator[Tuple[str, str]]:
+        """Yield (domain, answer) AdGuard Home rewrites for A, AAAA and CNAME records.
+
+        Names are qualified by ``iter_fqdns``: with the zone only when not
+        already inside it or absolute, lowercased and without trailing dots,
+        as AdGuard stores them.
+        """
+        for zone in self._zones(dns_data, zones):
+            for (fqdn, record_type), value in zip(iter_fqdns(zone), zone.values):
+                if fqdn and value and record_type in REWRITE_TYPES:
+                    yield fqdn, record_value(record_type, value)
+    
+    def generate_adguard_config(self, dns_data: Dict[str, Any]) -> str:
+        """Generate AdGuard Home configuration."""
+        return "\n".join(self.iter_adguard_config(dns_data))
+    
+    def write_adguard_config(self, dns_data: Dict[str, Any], f: TextIO, zones: Optional[List[str]] = None):
+        """Stream AdGuard Home configuration straight to ``f``."""
+        self.write_lines(self.iter_adguard_config(dns_data, zones), f)
+    
+    def iter_bind_config(self, dns_data: Dict[str, Any], zones: Optional[List[str]] = None,
+                         serials: Optional[Dict[str, int]] = None, soa_domain: Optional[str] = None) -> Iterator[str]:
+        """Yield BIND zone file lines one record at a time.
         
-        if 'zones' not in dns_data:
-            return "\n".join(config_lines)
+        ``serials`` maps zone names to SOA serials (see zone_state.py); zones
+        without one get today's first serial. The SOA names ns1 and admin in
+        ``soa_domain``, by default the zone itself.
+        """
+        yield "; BIND zone file"
+        yield "; Generated from contracts/dns-zones.yaml"
+        yield ""
         
-        for zone in dns_data['zones']:
-            zone_name = zone.get('name', '')
-            if not zone_name:
-                continue
+        for zone in self._zones(dns_data, zones):
+            zone_name = normalize_name(zone.name)
+            serial = (serials or {}).get(zone_name) or initial_serial()
             
-            config_lines.append(f"; Zone: {zone_name}")
-            config_lines.append(f"$ORIGIN {zone_name}.")
-            config_lines.append(f"$TTL 3600")
-            config_lines.append("")
-            config_lines.append("@\tIN\tSOA\tns1.{zone_name}.\tadmin.{zone_name}.\t(")
-            config_lines.append("\t\t2024010101\t; Serial")
-            config_lines.append("\t\t3600\t\t; Refresh")
-            config_lines.append("\t\t1800\t\t; Retry")
-            config_lines.append("\t\t604800\t\t; Expire")
-            config_lines.append("\t\t86400\t\t; Minimum TTL")
-            config_lines.append("\t)")
-            config_lines.append("")
+            yield f"; Zone: {zone_name}"
+            yield f"$ORIGIN {zone_name}."
+            yield f"$TTL 3600"
+            yield ""
+            domain = soa_domain or zone_name
+            yield f"@\tIN\tSOA\tns1.{domain}.\tadmin.{domain}.\t("
+            yield f"\t\t{serial}\t; Serial"
+            yield "\t\t3600\t\t; Refresh"
+            yield "\t\t1800\t\t; Retry"
+            yield "\t\t604800\t\t; Expire"
+            yield "\t\t86400\t\t; Minimum TTL"
+            yield "\t)"
+            yield ""
             
-            if 'records' in zone:
-                for record in zone['records']:
-                    name = record.get('name', '')
-                    record_type = record.get('type', 'A')
-                    value = record.get('value', '')
-                    
-                    if name and value:
-                        record_name = name if name != zone_name else "@"
-                        config_lines.append(f"{record_name}\tIN\t{record_type}\t{value}")
+            for (fqdn, record_type), value in zip(iter_fqdns(zone), zone.values):
+                if fqdn and value:
+                    if record_type in NAME_TYPES:
+                        value = rdata(record_type, normalize_name(value))
+                    yield f"{relative_name(fqdn, zone_name)}\tIN\t{record_type}\t{value}"
             
-            config_lines.append("")
-        
-        return "\n".join(config_lines)
+            yield ""
+    
+    def generate_bind_config(self, dns_data: Dict[str, Any]) -> str:
+        """Generate BIND zone file format."""
+        return "\n".join(self.iter_bind_config(dns_data))
+    
+    def write_bind_config(self, dns_data: Dict[str, Any], f: TextIO, zones: Optional[List[str]] = None,
+                          serials: Optional[Dict[str, int]] = None, soa_domain: Optional[str] = None):
+        """Stream BIND zone file content straight to ``f``."""
+        self.write_lines(self.iter_bind_config(dns_data, zones, serials, soa_domain), f)
     
     def generate_ansible_vars(self, dns_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate Ansible variables for DNS configuration."""
-        vars_dict = {
-            'dns_zones': [],
-            'dns_policy': dns_data.get('dns_policy', {})
-        }
-        
-        if 'zones' in dns_data:
-            for zone in dns_data['zones']:
-                zone_dict = {
-                    'name': zone.get('name', ''),
-                    'type': zone.get('type', 'authoritative'),
-                    'records': zone.get('records', [])
-                }
-                vars_dict['dns_zones'].append(zone_dict)
+        """Generate the Ansible variables every host needs: policy and resolver settings.
         
-        return vars_dict
+        Records are not included; each host's records are in its network
+        vars shard (see ``generate_network_config.generate_ansible_vars``).
+        """
+        return {
+            'dns_policy': dns_data.get('dns_policy', {}),
+            'dns_search_domains': [normalize_name(zone.name) for zone in self._zones(dns_data)],
+        }
+    
+    def render_ansible_vars(self, dns_data: Dict[str, Any]) -> str:
+        """Render the group-wide DNS vars as YAML under the generated-file marker."""
+        return ANSIBLE_VARS_MARKER + "\n" + yaml.safe_dump(self.generate_ansible_vars(dns_data),
+                                                           sort_keys=False, default_flow_style=False)
+
+
+def artifacts(contracts_dir: Path, output_dir: Path, store: ContractStore = None,
+              split_zones: bool = False, inventory_dir: Path = None) -> List[Artifact]:
+    """Return the DNS artifacts as (label, path, render) pipeline entries.
+    
+    Zone files are streamed to disk record by record. With ``split_zones``,
+    each zone also gets its own file under ``zones/``. Reverse zones for the
+    IPAM networks go to their own BIND file and AdGuard rule list. SOA serials come from
+    the saved zone state, which is rewritten alongside; when a zone changed,
+    the nsupdate delta against the previous state is written too. Otherwise
+    the last delta is kept, since reapplying it is a no-op. A zone removed
+    from the contracts is warned about and its records deleted in the delta.
+    The DNS policy and search domains apply to every host, so they go to
+    ``group_vars/all/dns.yml`` in ``inventory_dir`` (by default the inventory
+    next to the contracts); per-host records are written by the network
+    generator.
+    """
+    generator = DNSConfigGenerator(contracts_dir, store)
+    dns_data = generator.load_dns_zones()
+    inventory_dir = inventory_dir or contracts_dir.parent / 'ansible' / 'inventory'
+    reverse = generator.load_reverse_zones(dns_data)
+    for duplicate in reverse.duplicates:
+        print(f"[WARNING] Reverse DNS: {duplicate}")
+    reverse_data = reverse.data
+    # Reverse zones name their SOA servers in the first forward zone
+    soa_domain = next((normalize_name(zone.name) for zone in generator._zones(dns_data)), None)
+    
+    state_path = output_dir / 'bind_zones.state.json'
+    nsupdate_path = output_dir / 'bind_zones.nsupdate'
+    plans = plan_zones(generator.planned_zones(dns_data, reverse), load_state(state_path))
+    for plan in plans:
+        if plan.dropped:
+            print(f"[WARNING] Zone {plan.name} was removed from the contracts; {nsupdate_path.name} deletes "
+                  f"its {len(plan.removed)} record(s), and the zone must be removed from the server's config")
+    serials = {plan.name: plan.serial for plan in plans}
+    
+    entries = [
+        ("AdGuard Home config", output_dir / 'adguard_dns.conf',
+         Streamed(lambda f: generator.write_adguard_config(dns_data, f))),
+        ("BIND config", output_dir / 'bind_zones.conf',
+         Streamed(lambda f: generator.write_bind_config(dns_data, f, serials=serials))),
+        ("BIND reverse zones", output_dir / 'bind_reverse_zones.conf',
+         Streamed(lambda f: generator.write_bind_config(reverse_data, f, serials=serials, soa_domain=soa_domain))),
+        ("AdGuard reverse rules", output_dir / 'adguard_reverse_rules.txt',
+         Streamed(lambda f: generator.write_lines(iter_adguard_rules(reverse), f))),
+        ("BIND zone state", state_path, lambda: state_document(plans)),
+        ("DNS Ansible vars", inventory_dir / ANSIBLE_VARS_FILE, lambda: generator.render_ansible_vars(dns_data)),
+    ]
+    if any(plan.changed for plan in plans) or not nsupdate_path.exists():
+        entries.append(("BIND nsupdate delta", nsupdate_path, lambda: "\n".join(iter_nsupdate(plans))))
+    
+    if split_zones:
+        for zone in generator._zones(dns_data):
+            zones = [zone.name]
+            entries.append((f"BIND zone {zone.name}", output_dir / 'zones' / f"{zone.name}.zone",
+                            Streamed(lambda f, zones=zones: generator.write_bind_config(dns_data, f, zones, serials))))
+            entries.append((f"AdGuard zone {zone.name}", output_dir / 'zones' / f"{zone.name}.adguard.conf",
+                            Streamed(lambda f, zones=zones: generator.write_adguard_config(dns_data, f, zones))))
+        for zone in generator._zones(reverse_data):
+            zones = [zone.name]
+            # RFC 2317 zone names contain a slash
+            filename = zone.name.replace('/', '-')
+            entries.append((f"BIND zone {zone.name}", output_dir / 'zones' / f"{filename}.zone",
+                            Streamed(lambda f, zones=zones: generator.write_bind_config(reverse_data, f, zones,
+                                                                                        serials, soa_domain))))
+    
+    return entries
+
+
+def generate(contracts_dir: Path, output_dir: Path, store: ContractStore = None,
+             split_zones: bool = False) -> List[Dict[str, Any]]:
+    """Generate every DNS artifact into ``output_dir``."""
+    return generate_artifacts(artifacts(contracts_dir, output_dir, store, split_zones))
 
 
 def main():
@@ -122,32 +249,10 @@ def main():
     script_dir = Path(__file__).parent
     contracts_dir = script_dir.parent / 'contracts'
     
-    generator = DNSConfigGenerator(contracts_dir)
-    dns_data = generator.load_dns_zones()
-    
-    # Generate AdGuard Home config
-    adguard_config = generator.generate_adguard_config(dns_data)
-    output_file = script_dir / 'adguard_dns.conf'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(adguard_config)
-    print(f"[SUCCESS] Generated AdGuard Home config: {output_file}")
-    
-    # Generate BIND config
-    bind_config = generator.generate_bind_config(dns_data)
-    output_file = script_dir / 'bind_zones.conf'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(bind_config)
-    print(f"[SUCCESS] Generated BIND config: {output_file}")
-    
-    # Generate Ansible vars
-    import json
-    ansible_vars = generator.generate_ansible_vars(dns_data)
-    output_file = script_dir / 'ansible_vars.json'
-    with open(output_file, 'w') as f:
-        json.dump(ansible_vars, f, indent=2)
-    print(f"[SUCCESS] Generated Ansible vars: {output_file}")
+    split_zones = '--split-zones' in sys.argv[1:]
+    results = generate(contracts_dir, script_dir, split_zones=split_zones)
+    sys.exit(1 if any(result['error'] for result in results) else 0)
 
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Reverse (PTR) zones for the networks in ipam.yaml.
+Every network CIDR gets in-addr.arpa (or ip6.arpa) zones. Prefixes that do
+not end on an octet (nibble for IPv6) boundary are covered by the enclosing
+aligned zones, or for IPv4 prefixes longer than /24 by an RFC 2317 classless
+child zone plus CNAMEs in its /24 parent. PTR targets come from reservation
+hostnames and forward A/AAAA records, gathered in one pass over both.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from contract_model import INVALID, dns_model, format_ip, ipam_model, normalize_name, qualify_name
+from dns_index import iter_fqdns
+from ipam_index import IPAMIndex
+
+
+# Bits per reverse label and the reverse tree, by IP version
+LABEL_BITS = {4: 8, 6: 4}
+SUFFIX = {4: 'in-addr.arpa', 6: 'ip6.arpa'}
+WIDTH = {4: 32, 6: 128}
+
+
+def reverse_labels(version: int, value: int) -> List[str]:
+    """Reverse-tree labels of an address, least significant first."""
+    if version == 4:
+        return [str(value & 255), str((value >> 8) & 255), str((value >> 16) & 255), str(value >> 24)]
+    return list(format(value, '032x')[::-1])
+
+
+def aligned_prefix(version: int, prefixlen: int) -> int:
+    """Smallest label-aligned prefix length at least ``prefixlen`` (and at least one label)."""
+    bits = LABEL_BITS[version]
+    return max(bits, -(-prefixlen // bits) * bits)
+
+
+def classless(version: int, prefixlen: int) -> bool:
+    """Whether a network needs RFC 2317 classless delegation."""
+    return version == 4 and prefixlen > 24
+
+
+def zone_for(version: int, value: int, prefixlen: int, start: int,
+             labels: Optional[List[str]] = None) -> Tuple[str, str]:
+    """Return (reverse zone, owner relative to it) of an address in a network."""
+    labels = labels or reverse_labels(version, value)
+    if classless(version, prefixlen):
+        parent = '.'.join(labels[1:] + [SUFFIX[4]])
+        return f"{start & 255}/{prefixlen}.{parent}", labels[0]
+    keep = aligned_prefix(version, prefixlen) // LABEL_BITS[version]
+    split = len(labels) - keep
+    return '.'.join(labels[split:] + [SUFFIX[version]]), '.'.join(labels[:split])
+
+
+def network_zones(version: int, start: int, end: int, prefixlen: int) -> List[str]:
+    """Every reverse zone that covers the network [start, end]."""
+    if classless(version, prefixlen):
+        return [zone_for(version, start, prefixlen, start)[0]]
+    step = 1 << (WIDTH[version] - aligned_prefix(version, prefixlen))
+    return [zone_for(version, value, prefixlen, start)[0] for value in range(start, end + 1, step)]
+
+
+class ReverseZones:
+    """Reverse zones as a dns-zones.yaml-shaped mapping plus flat PTRs.
+
+    ``data`` feeds the BIND writer and zone state like any forward contract,
+    ``pointers`` lists (reverse name, target) for resolvers without zones,
+    and ``duplicates`` describes addresses with several forward names.
+    """
+
+    __slots__ = ('data', 'pointers', 'duplicates')
+
+    def __init__(self, data: Dict[str, Any], pointers: List[Tuple[str, str]], duplicates: List[str]):
+        self.data = data
+        self.pointers = pointers
+        self.duplicates = duplicates
+
+
+def build_reverse_zones(ipam_data: Dict[str, Any], dns_data: Optional[Dict[str, Any]]) -> ReverseZones:
+    """Build reverse zones for every IPAM network.
+
+    Each address takes its PTR from the first name seen for it, reservations
+    before forward records. Single-label reservation hostnames such as
+    ``nas`` are qualified with the first forward zone. Addresses outside
+    every network get no PTR; the validator already warns about them.
+    """
+    ipam = ipam_model(ipam_data)
+    index = IPAMIndex.from_model(ipam)
+    forward = dns_model(dns_data or {})
+    default_zone = next((normalize_name(zone.name) for zone in forward.zones if zone.name), '')
+
+    names: Dict[Tuple[int, int], Dict[str, None]] = {}
+    table = ipam.reservations
+    for hostname, version, value in zip(table.hostnames, table.versions, table.ips):
+        if hostname and value != INVALID:
+            fqdn = normalize_name(hostname)
+            if '.' not in fqdn and default_zone:
+                fqdn = qualify_name(fqdn, default_zone)
+            names.setdefault((version, value), {})[fqdn] = None
+    for zone in forward.zones:
+        if not zone.name:
+            continue
+        for (fqdn, _), version, value in zip(iter_fqdns(zone), zone.versions, zone.ips):
+            if fqdn and value != INVALID:
+                names.setdefault((version, value), {})[fqdn] = None
+
+    zones: Dict[str, List[Dict[str, Any]]] = {}
+    for version, start, end, prefixlen in sorted(index.networks.values()):
+        for zone_name in network_zones(version, start, end, prefixlen):
+            zones.setdefault(zone_name, [])
+        if classless(version, prefixlen):
+            # RFC 2317: the /24 parent aliases every address into the child zone
+            child = network_zones(version, start, end, prefixlen)[0]
+            parent = child.split('.', 1)[1]
+            records = zones.setdefault(parent, [])
+            for value in range(start, end + 1):
+                label = str(value & 255)
+                records.append({'name': label, 'type': 'CNAME', 'value': f"{label}.{child}"})
+
+    pointers: List[Tuple[str, str]] = []
+    duplicates: List[str] = []
+    for (version, value), fqdns in sorted(names.items()):
+        network = index.lookup((version, value))
+        if network is None:
+            continue
+        _, start, _, prefixlen = index.networks[network]
+        labels = reverse_labels(version, value)
+        zone_name, owner = zone_for(version, value, prefixlen, start, labels)
+        targets = list(fqdns)
+        if len(targets) > 1:
+            duplicates.append(f"{format_ip(version, value)} has forward names {', '.join(targets)}; "
+                              f"PTR uses {targets[0]}")
+        zones[zone_name].append({'name': owner, 'type': 'PTR', 'value': targets[0]})
+        pointers.append(('.'.join(labels) + '.' + SUFFIX[version], targets[0]))
+
+    data = {'zones': [{'name': name, 'type': 'reverse', 'records': records} for name, records in zones.items()]}
+    return ReverseZones(data, pointers, duplicates)
+
+
+def iter_adguard_rules(reverse: ReverseZones) -> Iterator[str]:
+    """Yield AdGuard Home custom filtering rules answering each PTR query."""
+    yield "! AdGuard Home reverse DNS rules"
+    yield "! Generated from contracts/ipam.yaml and contracts/dns-zones.yaml"
+    for pointer, target in reverse.pointers:
+        yield f"||{pointer}^$dnsrewrite=NOERROR;PTR;{target}."
+    yield ""
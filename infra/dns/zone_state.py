@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Saved BIND zone state: content-derived serials and RFC 2136 deltas.
+Each generation records every zone's resource records, digest and serial in
+bind_zones.state.json. A zone keeps its serial while its records are
+unchanged; when they change the serial moves to the next YYYYMMDDnn value,
+and the added and removed records become an nsupdate script, so secondaries
+and dynamic zones can be updated incrementally instead of reloaded.
+
+Usage:
+    zone_state.py              # show what the next generation would change
+    zone_state.py --nsupdate   # also print the nsupdate delta
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'scripts' / 'validation'))
+
+from contract_model import ZoneRecords, normalize_name  # noqa: E402
+from dns_index import NAME_TYPES, iter_fqdns, record_value  # noqa: E402
+
+
+STATE_VERSION = 1
+DEFAULT_TTL = 3600
+
+# (owner FQDN, type, value), all normalized
+RR = Tuple[str, str, str]
+
+
+def zone_records(zone: ZoneRecords) -> List[RR]:
+    """Return ``zone``'s records as sorted, de-duplicated RRs."""
+    return sorted({(fqdn, record_type, record_value(record_type, value))
+                   for (fqdn, record_type), value in zip(iter_fqdns(zone), zone.values) if fqdn and value})
+
+
+def records_digest(records: Iterable[RR]) -> str:
+    """SHA-256 over sorted ``records``; equal record sets give equal digests."""
+    digest = hashlib.sha256()
+    for record in records:
+        digest.update('\t'.join(record).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def initial_serial(today: Optional[datetime.date] = None) -> int:
+    """First YYYYMMDDnn serial of ``today`` (UTC by default)."""
+    today = today or datetime.datetime.now(datetime.timezone.utc).date()
+    return int(today.strftime('%Y%m%d')) * 100
+
+
+def next_serial(previous: Optional[int], today: Optional[datetime.date] = None) -> int:
+    """Next YYYYMMDDnn serial after ``previous``, never going backwards."""
+    initial = initial_serial(today)
+    return initial if previous is None else max(previous + 1, initial)
+
+
+def relative_name(owner: str, zone: str) -> str:
+    """``owner`` relative to ``$ORIGIN zone.``, as written in the zone file."""
+    if owner == zone:
+        return '@'
+    if owner.endswith('.' + zone):
+        return owner[:-len(zone) - 1]
+    return owner + '.'
+
+
+def rdata(record_type: str, value: str) -> str:
+    """Zone file form of a normalized record value; names are written absolute."""
+    return value + '.' if record_type in NAME_TYPES else value
+
+
+class ZonePlan:
+    """One zone's records for this generation and how they differ from the saved state.
+
+    A zone that is in the saved state but no longer in the contracts is
+    ``dropped``: it has no serial and its delta removes every saved record.
+    """
+
+    __slots__ = ('name', 'records', 'digest', 'serial', 'previous_serial', 'added', 'removed')
+
+    def __init__(self, name: str, records: List[RR], digest: str, serial: Optional[int],
+                 previous_serial: Optional[int], added: List[RR], removed: List[RR]):
+        self.name = name
+        self.records = records
+        self.digest = digest
+        self.serial = serial
+        self.previous_serial = previous_serial
+        self.added = added
+        self.removed = removed
+
+    @property
+    def changed(self) -> bool:
+        return self.serial != self.previous_serial
+
+    @property
+    def dropped(self) -> bool:
+        return self.serial is None
+
+
+def load_state(path: Path) -> Dict[str, Any]:
+    """Load the saved zone state, or an empty one if missing or from another version."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+        return {}
+    return state.get('zones') or {}
+
+
+def plan_zones(zones: Iterable[ZoneRecords], state: Dict[str, Any],
+               today: Optional[datetime.date] = None) -> List[ZonePlan]:
+    """Compare ``zones`` with the saved ``state`` and assign serials.
+
+    Saved zones missing from ``zones`` get a dropped plan after the others.
+    """
+    plans = []
+    for zone in zones:
+        name = normalize_name(zone.name)
+        records = zone_records(zone)
+        digest = records_digest(records)
+        saved = state.get(name) or {}
+        previous = saved.get('serial')
+        if previous is not None and saved.get('digest') == digest:
+            plans.append(ZonePlan(name, records, digest, previous, previous, [], []))
+            continue
+        old = set(tuple(record.split('\t', 2)) for record in saved.get('records') or [])
+        current = set(records)
+        plans.append(ZonePlan(name, records, digest, next_serial(previous, today), previous,
+                              sorted(current - old), sorted(old - current)))
+    planned = {plan.name for plan in plans}
+    for name in sorted(set(state) - planned):
+        saved = state.get(name) or {}
+        old = set(tuple(record.split('\t', 2)) for record in saved.get('records') or [])
+        plans.append(ZonePlan(name, [], records_digest([]), None, saved.get('serial'), [], sorted(old)))
+    return plans
+
+
+def state_document(plans: Iterable[ZonePlan]) -> str:
+    """Serialize ``plans`` as the state file for the next generation; dropped zones are left out."""
+    zones = {plan.name: {'serial': plan.serial, 'digest': plan.digest,
+                         'records': ['\t'.join(record) for record in plan.records]}
+             for plan in plans if not plan.dropped}
+    return json.dumps({'version': STATE_VERSION, 'zones': zones}, indent=2, sort_keys=True) + '\n'
+
+
+def iter_nsupdate(plans: Iterable[ZonePlan], ttl: int = DEFAULT_TTL) -> Iterator[str]:
+    """Yield an nsupdate(1) script applying every changed zone's delta.
+
+    Removals come first, so a changed value never briefly has both answers.
+    Each zone is one ``send``, i.e. one atomic RFC 2136 UPDATE message. A
+    dropped zone gets all its records deleted; RFC 2136 cannot remove the
+    zone itself, so it still has to be taken out of the server's config.
+    """
+    yield "; nsupdate delta generated from contracts/dns-zones.yaml"
+    yield "; Apply with: nsupdate -k <keyfile> bind_zones.nsupdate"
+    for plan in plans:
+        if not plan.added and not plan.removed:
+            continue
+        yield ""
+        if plan.dropped:
+            yield f"; {plan.name}: removed from the contracts (serial {plan.previous_serial}), " \
+                  f"-{len(plan.removed)}; also remove the zone from the server's config"
+        else:
+            yield f"; {plan.name}: serial {plan.previous_serial or 'new'} -> {plan.serial}, " \
+                  f"+{len(plan.added)} -{len(plan.removed)}"
+        yield f"zone {plan.name}."
+        for owner, record_type, value in plan.removed:
+            yield f"update delete {owner}. IN {record_type} {rdata(record_type, value)}"
+        for owner, record_type, value in plan.added:
+            yield f"update add {owner}. {ttl} IN {record_type} {rdata(record_type, value)}"
+        yield "send"
+    yield ""
+
+
+def print_plans(plans: List[ZonePlan]):
+    """Print one line per zone describing the pending change."""
+    for plan in plans:
+        if plan.dropped:
+            print(f"  {plan.name}: removed from the contracts (serial {plan.previous_serial}, "
+                  f"-{len(plan.removed)} records)")
+        elif plan.changed:
+            print(f"  {plan.name}: serial {plan.previous_serial or 'new'} -> {plan.serial} "
+                  f"(+{len(plan.added)} -{len(plan.removed)} records)")
+        else:
+            print(f"  {plan.name}: unchanged (serial {plan.serial})")
+
+
+def main():
+    """Main entry point."""
+    from generate_dns_config import DNSConfigGenerator
+
+    script_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Compare dns-zones.yaml with the saved BIND zone state")
+    parser.add_argument('--state', type=Path, default=script_dir / 'bind_zones.state.json')
+    parser.add_argument('--nsupdate', action='store_true', help="Print the nsupdate delta script")
+    args = parser.parse_args()
+
+    generator = DNSConfigGenerator(script_dir.parent / 'contracts')
+    dns_data = generator.load_dns_zones()
+    zones = generator.planned_zones(dns_data, generator.load_reverse_zones(dns_data))
+    plans = plan_zones(zones, load_state(args.state))
+    print(f"Zone state against {args.state}:")
+    print_plans(plans)
+    if args.nsupdate:
+        print("\n".join(iter_nsupdate(plans)), end='')
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,31 +4,161 @@ Generate network configuration from contracts.
 Supports ER605 router config, firewall rules, and network policies.
 """
 
-import yaml
+import ipaddress
+import re
 import sys
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Tuple, Any
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'scripts' / 'validation'))
+
+from access_matrix import MAX_PORT, AccessMatrix, format_ports  # noqa: E402
+from acl_compiler import compile_acl  # noqa: E402
+from ansible_inventory import Inventory  # noqa: E402
+from contract_model import (INVALID, dns_model, ipam_model, normalize_name, qualify_name,  # noqa: E402
+                            reservation_table, vlan_table)
+from contract_store import ContractStore  # noqa: E402
+from dns_index import iter_fqdns, record_value  # noqa: E402
+from output_pipeline import REMOVED, Artifact, Rendered, generate_artifacts  # noqa: E402
+
+
+# Label that places a workload in a VLAN for NetworkPolicy selection
+POLICY_VLAN_LABEL = 'homelab.io/vlan'
+POLICY_NAMESPACE = 'default'
+
+# Access-matrix ports carry no protocol, so port-restricted rules cover both
+POLICY_PROTOCOLS = ('TCP', 'UDP')
+
+# Inventory the Ansible vars shards are written next to
+INVENTORY_FILE = 'hosts.yml'
+
+# First line of every vars shard; only files carrying it are pruned as stale
+ANSIBLE_VARS_MARKER = "# Generated by infra/network/generate_network_config.py from contracts; do not edit"
+ANSIBLE_VARS_DIRS = ('host_vars', 'group_vars')
+
+# Merged allowed port ranges for one VLAN pair
+PortKey = Tuple[Tuple[int, int], ...]
+
+
+def _collapse(cidrs: Iterable[str]) -> List[str]:
+    """Merge CIDRs into the fewest covering networks, per address family."""
+    by_version: Dict[int, list] = {}
+    for cidr in cidrs:
+        network = ipaddress.ip_network(cidr, strict=False)
+        by_version.setdefault(network.version, []).append(network)
+    return [str(network) for version in sorted(by_version)
+            for network in ipaddress.collapse_addresses(by_version[version])]
+
+
+def _internet_blocks(internal: List[str], allowed: List[str]) -> List[Dict[str, Any]]:
+    """ipBlock peers for "internet" plus the ``allowed`` VLAN CIDRs.
+    
+    Internet is everything outside the homelab VLANs, so allowed VLAN CIDRs
+    are folded in by carving them out of the ``except`` list instead of being
+    emitted as separate peers.
+    """
+    remaining = [ipaddress.ip_network(cidr) for cidr in internal]
+    for cidr in allowed:
+        carve = ipaddress.ip_network(cidr)
+        kept = []
+        for network in remaining:
+            if network.version != carve.version or not network.overlaps(carve):
+                kept.append(network)
+            elif network.subnet_of(carve):
+                continue
+            else:
+                kept.extend(network.address_exclude(carve))
+        remaining = kept
+    
+    blocks = []
+    for version, everything in ((4, '0.0.0.0/0'), (6, '::/0')):
+        excluded = _collapse(str(network) for network in remaining if network.version == version)
+        if version == 6 and not any(ipaddress.ip_network(cidr).version == 6 for cidr in internal):
+            continue
+        block = {'cidr': everything}
+        if excluded:
+            block['except'] = excluded
+        blocks.append({'ipBlock': block})
+    return blocks
+
+
+def _policy_ports(ports: PortKey) -> List[Dict[str, Any]]:
+    """NetworkPolicy ports for merged ranges; an empty list means all ports."""
+    if ports == ((0, MAX_PORT),):
+        return []
+    entries = []
+    for protocol in POLICY_PROTOCOLS:
+        for low, high in ports:
+            # NetworkPolicy ports start at 1; port 0 alone cannot be expressed
+            low = max(low, 1)
+            if high < low:
+                continue
+            entry = {'protocol': protocol, 'port': low}
+            if high > low:
+                entry['endPort'] = high
+            entries.append(entry)
+    return entries
+
+
+def _network_policy(direction: str, vlans: List[str], rules: Tuple, internal: List[str]) -> Dict[str, Any]:
+    """One NetworkPolicy selecting ``vlans`` with aggregated ``rules``."""
+    if len(vlans) == 1:
+        selector = {'matchLabels': {POLICY_VLAN_LABEL: vlans[0]}}
+    else:
+        selector = {'matchExpressions': [{'key': POLICY_VLAN_LABEL, 'operator': 'In', 'values': list(vlans)}]}
+    
+    peer_key = 'from' if direction == 'ingress' else 'to'
+    spec_rules = []
+    for ports, cidrs, to_internet in rules:
+        if to_internet:
+            peers = _internet_blocks(internal, list(cidrs))
+        else:
+            peers = [{'ipBlock': {'cidr': cidr}} for cidr in cidrs]
+        rule = {peer_key: peers}
+        policy_ports = _policy_ports(ports)
+        if policy_ports:
+            rule['ports'] = policy_ports
+        spec_rules.append(rule)
+    
+    return {
+        'apiVersion': 'networking.k8s.io/v1',
+        'kind': 'NetworkPolicy',
+        'metadata': {
+            'name': f"allow-{direction}-{'-'.join(vlans)}",
+            'namespace': POLICY_NAMESPACE,
+        },
+        'spec': {
+            'podSelector': selector,
+            'policyTypes': [direction.title()],
+            direction: spec_rules,
+        },
+    }
 
 
 class NetworkConfigGenerator:
-    def __init__(self, contracts_dir: Path):
+    def __init__(self, contracts_dir: Path, store: ContractStore = None, inventory_dir: Path = None):
         self.contracts_dir = contracts_dir
+        self.store = store or ContractStore.shared(contracts_dir)
+        self.inventory_dir = inventory_dir or contracts_dir.parent / 'ansible' / 'inventory'
+        self._matrix = None
+        self._matrix_source = None
         
     def load_contracts(self) -> Dict[str, Any]:
-        """Load all network-related contracts."""
+        """Load all network-related contracts, plus the DNS zones for the Ansible vars."""
         contracts = {}
         
         files = {
             'vlans': 'vlans.yaml',
             'ipam': 'ipam.yaml',
-            'access': 'access-matrix.yaml'
+            'access': 'access-matrix.yaml',
+            'dns': 'dns-zones.yaml'
         }
         
         for key, filename in files.items():
-            filepath = self.contracts_dir / filename
-            if filepath.exists():
-                with open(filepath, 'r') as f:
-                    contracts[key] = yaml.safe_load(f) or {}
+            if self.store.exists(filename):
+                contracts[key] = self.store.load(filename)
             else:
                 print(f"Warning: Contract file not found: {filename}")
                 contracts[key] = {}
@@ -49,22 +179,16 @@ class NetworkConfigGenerator:
         lines.append("|---------|------|----------|---------|")
         
         vlans = contracts.get('vlans', {}).get('vlans', {})
-        ipam = contracts.get('ipam', {}).get('networks', {})
-        
-        # Build VLAN ID to network mapping
-        vlan_to_network = {}
-        for net_name, net_config in ipam.items():
-            vlan_id = net_config.get('vlan_id')
-            if vlan_id:
-                vlan_to_network[vlan_id] = net_config
+        ipam = ipam_model(contracts.get('ipam', {}))
         
         for vlan_name, vlan_config in vlans.items():
             vlan_id = vlan_config.get('id')
-            network = vlan_to_network.get(vlan_id, {})
-            cidr = network.get('cidr', 'N/A')
-            gateway = network.get('gateway', 'N/A')
-            
-            lines.append(f"| {vlan_id} | {vlan_name.title()} | {cidr} | {gateway} |")
+            # One row per network, so dual-stack VLANs list both prefixes
+            for network in ipam.networks_for_vlan_id(vlan_id) or [None]:
+                cidr = network.cidr if network else 'N/A'
+                gateway = (network.gateway_ip if network else None) or 'N/A'
+                
+                lines.append(f"| {vlan_id} | {vlan_name.title()} | {cidr} | {gateway} |")
         
         lines.append("")
         lines.append("## DHCP Configuration")
@@ -82,8 +206,32 @@ class NetworkConfigGenerator:
         
         return "\n".join(lines)
     
-    def generate_firewall_rules(self, contracts: Dict[str, Any]) -> str:
-        """Generate firewall rules from access matrix."""
+    def compile_access_matrix(self, contracts: Dict[str, Any]) -> AccessMatrix:
+        """Compile the access matrix once per contracts mapping."""
+        if self._matrix is None or self._matrix_source is not contracts:
+            vlans = contracts.get('vlans', {}).get('vlans', {})
+            rules = contracts.get('access', {}).get('access_matrix', [])
+            self._matrix = AccessMatrix.compile(rules, vlans)
+            self._matrix_source = contracts
+        return self._matrix
+    
+    def vlan_cidrs(self, contracts: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Map VLAN names to every IPAM CIDR sharing their VLAN ID."""
+        ipam = ipam_model(contracts.get('ipam', {}))
+        
+        cidrs = {}
+        for name, vlan in vlan_table(contracts.get('vlans', {})).items():
+            networks = ipam.networks_for_vlan_id(vlan.id)
+            if networks:
+                cidrs[name] = [network.cidr for network in networks]
+        return cidrs
+    
+    def ipam_cidrs(self, contracts: Dict[str, Any]) -> List[str]:
+        """Every IPAM network CIDR, whether or not its VLAN ID is in vlans.yaml."""
+        return [network.cidr for network in ipam_model(contracts.get('ipam', {})).networks.values()]
+    
+    def generate_firewall_rules(self, contracts: Dict[str, Any]) -> Rendered:
+        """Generate firewall rules from access matrix, noting the compiled entry counts."""
         lines = []
         lines.append("# Firewall Rules Configuration")
         lines.append("# Generated from contracts/access-matrix.yaml")
@@ -91,60 +239,103 @@ class NetworkConfigGenerator:
         lines.append("Navigate to **Security → Firewall → ACL Rules**")
         lines.append("")
         
-        access_matrix = contracts.get('access', {}).get('access_matrix', [])
-        ipam = contracts.get('ipam', {}).get('networks', {})
-        
-        # Build VLAN name to CIDR mapping
-        vlan_to_cidr = {}
-        for net_name, net_config in ipam.items():
-            vlan_id = net_config.get('vlan_id')
-            cidr = net_config.get('cidr', '')
-            # Try to match VLAN name from network name
-            vlan_name = net_name.replace('vlan', '').replace('_', '').split('_')[0]
-            vlan_to_cidr[vlan_name] = cidr
-        
-        rule_num = 1
-        for rule in access_matrix:
-            from_vlan = rule.get('from', '')
-            to_vlan = rule.get('to', '')
-            action = rule.get('action', 'deny')
-            ports = rule.get('ports', [])
-            
-            if from_vlan == '*' or to_vlan == '*':
-                continue  # Skip wildcard rules for now
-            
-            from_cidr = vlan_to_cidr.get(from_vlan, '')
-            to_cidr = vlan_to_cidr.get(to_vlan, '')
-            
-            if not from_cidr:
-                continue
-            
-            lines.append(f"### Rule {rule_num}: {from_vlan.title()} -> {to_vlan.title()}")
-            lines.append("")
-            lines.append(f"- **Source**: {from_cidr}")
-            
-            if to_vlan == 'internet':
-                lines.append("- **Destination**: Any")
-            else:
-                lines.append(f"- **Destination**: {to_cidr}")
-            
-            if ports:
-                lines.append(f"- **Service**: {', '.join(map(str, ports))}")
+        matrix = self.compile_access_matrix(contracts)
+        vlan_to_cidr = self.vlan_cidrs(contracts)
+        entries, stats = compile_acl(matrix, vlan_to_cidr)
+        
+        lines.append(f"Rules are evaluated top to bottom and the first match wins. "
+                     f"{stats['after']} entries (compiled from {stats['before']} expanded rules).")
+        lines.append("")
+        
+        for rule_num, entry in enumerate(entries, 1):
+            sources = ', '.join(vlan.title() for vlan in entry['sources'])
+            if entry['destinations'] == ['internet']:
+                destinations, to_cidr = 'Any', 'Any'
             else:
-                lines.append("- **Service**: Any")
+                destinations = ', '.join(vlan.title() for vlan in entry['destinations'])
+                to_cidr = ', '.join(_collapse(cidr for vlan in entry['destinations'] for cidr in vlan_to_cidr[vlan]))
             
-            lines.append(f"- **Action**: {action.title()}")
+            lines.append(f"### Rule {rule_num}: {sources} -> {destinations}")
             lines.append("")
+            sources_cidr = ', '.join(_collapse(cidr for vlan in entry['sources'] for cidr in vlan_to_cidr[vlan]))
+            lines.append(f"- **Source**: {sources_cidr}")
+            lines.append(f"- **Destination**: {to_cidr}")
             
-            rule_num += 1
+            service = format_ports(entry['ports'])
+            lines.append(f"- **Service**: {'Any' if service == 'any' else service}")
+            lines.append(f"- **Action**: {entry['action'].title()}")
+            lines.append("")
         
-        return "\n".join(lines)
+        note = f"Firewall ACL: {stats['before']} expanded rules compiled to {stats['after']} ordered entries"
+        return Rendered("\n".join(lines), [note])
+    
+    def build_network_policies(self, contracts: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Build aggregated NetworkPolicy objects from the compiled access matrix.
+        
+        Workloads are selected by their ``homelab.io/vlan`` label. Allowed
+        sources are grouped per destination and port set and their CIDRs
+        collapsed into as few ipBlocks as possible; destinations (ingress)
+        or sources (egress) with identical rule sets share one policy.
+        Pod-to-pod traffic inside a VLAN is subject to NetworkPolicy too, so
+        a VLAN the matrix lets reach itself gets its own CIDRs as peers.
+        Internet egress excludes every IPAM network, including networks
+        without a VLAN in vlans.yaml. Port-restricted rules are emitted for
+        TCP and UDP; SCTP is not covered.
+        Returns the policies and before/after object and peer counts.
+        """
+        matrix = self.compile_access_matrix(contracts)
+        cidrs = self.vlan_cidrs(contracts)
+        internal = _collapse(self.ipam_cidrs(contracts))
+        
+        ingress: Dict[str, Dict[PortKey, List[str]]] = {}
+        egress: Dict[str, Dict[PortKey, List[str]]] = {}
+        naive = 0
+        for from_vlan in matrix.sources:
+            for to_vlan in matrix.destinations:
+                ports = matrix.allowed_ports(from_vlan, to_vlan)
+                if ports == [(0, 0)] or not ports or from_vlan not in cidrs:
+                    continue
+                key = tuple(ports)
+                if to_vlan == 'internet':
+                    egress.setdefault(from_vlan, {}).setdefault(key, []).append('internet')
+                    naive += 1
+                elif to_vlan in cidrs:
+                    ingress.setdefault(to_vlan, {}).setdefault(key, []).extend(cidrs[from_vlan])
+                    egress.setdefault(from_vlan, {}).setdefault(key, []).extend(cidrs[to_vlan])
+                    naive += 2
+        
+        policies = []
+        for direction, table in (('ingress', ingress), ('egress', egress)):
+            grouped: Dict[Tuple, List[str]] = {}
+            for vlan, by_ports in table.items():
+                rules = tuple(
+                    (ports, tuple(_collapse([peer for peer in peers if peer != 'internet'])), 'internet' in peers)
+                    for ports, peers in sorted(by_ports.items())
+                )
+                grouped.setdefault(rules, []).append(vlan)
+            for rules, vlans in grouped.items():
+                policies.append(_network_policy(direction, vlans, rules, internal))
+        
+        peers = sum(len(rule.get('from', rule.get('to', [])))
+                    for policy in policies for rule in policy['spec'].get('ingress', policy['spec'].get('egress', [])))
+        stats = {
+            'objects_before': naive,
+            'peers_before': naive,
+            'objects_after': len(policies),
+            'peers_after': peers,
+        }
+        return policies, stats
     
-    def generate_kubernetes_network_policies(self, contracts: Dict[str, Any]) -> str:
-        """Generate Kubernetes NetworkPolicy manifests."""
+    def generate_kubernetes_network_policies(self, contracts: Dict[str, Any]) -> Rendered:
+        """Generate Kubernetes NetworkPolicy manifests, noting the aggregation stats."""
+        policies, stats = self.build_network_policies(contracts)
+        summary = (f"{stats['objects_before']} policies/{stats['peers_before']} peers before aggregation, "
+                   f"{stats['objects_after']} policies/{stats['peers_after']} peers after")
+        
         lines = []
         lines.append("# Kubernetes Network Policies")
         lines.append("# Generated from contracts/access-matrix.yaml")
+        lines.append(f"# {summary}")
         lines.append("")
         lines.append("apiVersion: networking.k8s.io/v1")
         lines.append("kind: NetworkPolicy")
@@ -156,76 +347,173 @@ class NetworkConfigGenerator:
         lines.append("  policyTypes:")
         lines.append("  - Ingress")
         lines.append("  - Egress")
-        lines.append("---")
+        
+        for policy in policies:
+            lines.append("---")
+            lines.append(yaml.safe_dump(policy, sort_keys=False, default_flow_style=False).rstrip("\n"))
+        
         lines.append("")
+        return Rendered("\n".join(lines), [f"Network policies: {summary}"])
+    
+    def load_inventory(self) -> Inventory:
+        """Load the Ansible inventory the vars shards are written for."""
+        return Inventory.load(self.inventory_dir / INVENTORY_FILE)
+    
+    def generate_ansible_vars(self, contracts: Dict[str, Any], inventory: Inventory = None) -> Dict[str, Dict[str, Any]]:
+        """Generate Ansible variables sharded per inventory host and group.
         
-        # Generate policies based on access matrix
-        access_matrix = contracts.get('access', {}).get('access_matrix', [])
+        Returns documents keyed by their path relative to the inventory,
+        ``host_vars/<host>.yml`` and ``group_vars/<group>.yml``. A host gets
+        its reservations, their networks and VLANs, the access-matrix rules
+        with one of those VLANs (or ``*``) on either side, and the DNS records
+        naming or pointing at its reservations; a group gets the union over
+        its hosts. Hosts without a reservation get no shard.
         
-        for rule in access_matrix:
-            from_vlan = rule.get('from', '')
-            to_vlan = rule.get('to', '')
-            action = rule.get('action', 'deny')
-            
-            if action == 'deny' or from_vlan == '*' or to_vlan == '*':
-                continue
-            
-            # This is a simplified example - real implementation would be more complex
-            lines.append(f"# Policy: Allow {from_vlan} -> {to_vlan}")
-            lines.append("")
+        Host vars override group vars in Ansible, so each key is emitted at
+        one level only: hosts get ``vlans``, ``networks``, ``reservations``,
+        ``firewall_rules`` and ``dns_records``, a group gets them under
+        ``<group>_network``.
+        """
+        if inventory is None:
+            inventory = self.load_inventory()
+        vlans = contracts.get('vlans', {}).get('vlans', {}) or {}
+        networks = contracts.get('ipam', {}).get('networks', {}) or {}
+        reservations = contracts.get('ipam', {}).get('reservations', {}) or {}
+        rules = contracts.get('access', {}).get('access_matrix', []) or []
+        table = reservation_table(reservations)
+        vlan_names = {vlan.id: name for name, vlan in vlan_table(contracts.get('vlans', {})).items()}
+        records = self.dns_records(contracts.get('dns', {}))
+        default_zone = next((normalize_name(zone.name) for zone in dns_model(contracts.get('dns', {})).zones
+                             if zone.name), '')
         
-        return "\n".join(lines)
+        def host_records(rows: List[int]) -> List[Dict[str, str]]:
+            names = set()
+            addresses = {(table.versions[row], table.ips[row]) for row in rows if table.ips[row] != INVALID}
+            for row in rows:
+                if table.hostnames[row]:
+                    name = normalize_name(table.hostnames[row])
+                    names.add(qualify_name(name, default_zone) if '.' not in name and default_zone else name)
+            matched = {index for index, (record, address) in enumerate(records)
+                       if record['name'] in names or address in addresses}
+            # CNAMEs pointing at the host's names belong to it too
+            names |= {records[index][0]['name'] for index in matched}
+            return [record for index, (record, _) in enumerate(records)
+                    if index in matched or (record['type'] == 'CNAME' and record['value'] in names)]
+        
+        def shard(rows: List[int]) -> Dict[str, Any]:
+            network_names = [name for name in dict.fromkeys(table.vlans[row] for row in rows) if name in networks]
+            vlan_ids = [(networks[name] or {}).get('vlan_id') for name in network_names]
+            host_vlans = [vlan_names[vlan_id] for vlan_id in dict.fromkeys(vlan_ids) if vlan_id in vlan_names]
+            selected = set(host_vlans) | {'*'}
+            return {
+                'vlans': {name: vlans[name] for name in host_vlans},
+                'networks': {name: networks[name] for name in network_names},
+                'reservations': {table.names[row]: reservations[table.names[row]] for row in rows},
+                'firewall_rules': [rule for rule in rules
+                                   if rule.get('from') in selected or rule.get('to') in selected],
+                'dns_records': host_records(rows),
+            }
+        
+        matches = inventory.match_reservations(table)
+        shards = {}
+        for host in sorted(matches):
+            shards[f"host_vars/{host}.yml"] = shard(matches[host])
+        for group in sorted(inventory.groups):
+            rows = sorted({row for host in inventory.groups[group] for row in matches.get(host, ())})
+            if rows:
+                key = re.sub(r'\W', '_', group) + '_network'
+                shards[f"group_vars/{group}.yml"] = {key: shard(rows)}
+        return shards
     
-    def generate_ansible_vars(self, contracts: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate Ansible variables for network configuration."""
-        vars_dict = {
-            'vlans': contracts.get('vlans', {}).get('vlans', {}),
-            'networks': contracts.get('ipam', {}).get('networks', {}),
-            'reservations': contracts.get('ipam', {}).get('reservations', {}),
-            'firewall_rules': contracts.get('access', {}).get('access_matrix', [])
-        }
+    @staticmethod
+    def dns_records(dns_data: Dict[str, Any]) -> List[Tuple[Dict[str, str], Tuple[int, int]]]:
+        """Forward DNS records as ({name, type, value}, (version, address)) in contract order.
         
-        return vars_dict
+        Names are qualified and values normalized as in the zone files, and
+        untyped records are written as A. Records without an address carry
+        ``INVALID`` as their address.
+        """
+        records = []
+        for zone in dns_model(dns_data or {}).zones:
+            if not zone.name:
+                continue
+            for (fqdn, record_type), value, version, address in zip(iter_fqdns(zone), zone.values,
+                                                                   zone.versions, zone.ips):
+                if fqdn and value:
+                    records.append(({'name': fqdn, 'type': record_type, 'value': record_value(record_type, value)},
+                                    (version, address)))
+        return records
+    
+    def render_ansible_vars(self, document: Dict[str, Any]) -> str:
+        """Render one vars shard as YAML under the generated-file marker."""
+        return ANSIBLE_VARS_MARKER + "\n" + yaml.safe_dump(document, sort_keys=False, default_flow_style=False)
+    
+    def stale_ansible_vars(self, shards: Iterable[str]) -> List[str]:
+        """Generated shards in the inventory that are not among ``shards``.
+        
+        Only files starting with ``ANSIBLE_VARS_MARKER`` count, so hand-written
+        vars and the DNS generator's ``group_vars/all/dns.yml`` are never touched.
+        """
+        produced = set(shards)
+        stale = []
+        for directory in ANSIBLE_VARS_DIRS:
+            for path in sorted((self.inventory_dir / directory).glob('*.yml')):
+                relative = f"{directory}/{path.name}"
+                if relative in produced:
+                    continue
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        generated = f.readline().rstrip("\n") == ANSIBLE_VARS_MARKER
+                except (OSError, UnicodeDecodeError):
+                    continue
+                if generated:
+                    stale.append(relative)
+        return stale
+
+
+def artifacts(contracts_dir: Path, output_dir: Path, store: ContractStore = None,
+              inventory_dir: Path = None) -> List[Artifact]:
+    """Return the network artifacts as (label, path, render) pipeline entries.
+    
+    Ansible vars are written as one shard per host and group into
+    ``inventory_dir``, by default the inventory next to the contracts;
+    generated shards no longer produced are removed.
+    """
+    generator = NetworkConfigGenerator(contracts_dir, store, inventory_dir)
+    contracts = generator.load_contracts()
+    # Compile up front so concurrent renderers share one table
+    generator.compile_access_matrix(contracts)
+    
+    entries = [
+        ("ER605 VLAN config", output_dir / 'ER605_VLAN_CONFIG.md',
+         lambda: generator.generate_er605_vlan_config(contracts)),
+        ("Firewall rules", output_dir / 'FIREWALL_RULES.md',
+         lambda: generator.generate_firewall_rules(contracts)),
+        ("Kubernetes network policies", output_dir / 'network-policies.yaml',
+         lambda: generator.generate_kubernetes_network_policies(contracts)),
+    ]
+    shards = generator.generate_ansible_vars(contracts)
+    for relative, document in shards.items():
+        entries.append((f"Ansible vars {relative}", generator.inventory_dir / relative,
+                        lambda document=document: generator.render_ansible_vars(document)))
+    for relative in generator.stale_ansible_vars(shards):
+        entries.append((f"Stale Ansible vars {relative}", generator.inventory_dir / relative, REMOVED))
+    return entries
+
+
+def generate(contracts_dir: Path, output_dir: Path, store: ContractStore = None) -> List[Dict[str, Any]]:
+    """Generate every network artifact into ``output_dir``."""
+    return generate_artifacts(artifacts(contracts_dir, output_dir, store))
 
 
 def main():
     """Main entry point."""
     script_dir = Path(__file__).parent
-    contracts_dir = script_dir.parent.parent / 'contracts'
-    
-    generator = NetworkConfigGenerator(contracts_dir)
-    contracts = generator.load_contracts()
+    contracts_dir = script_dir.parent / 'contracts'
     
-    # Generate ER605 config guide
-    er605_config = generator.generate_er605_vlan_config(contracts)
-    output_file = script_dir / 'ER605_VLAN_CONFIG.md'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(er605_config)
-    print(f"[SUCCESS] Generated ER605 VLAN config: {output_file}")
-    
-    # Generate firewall rules
-    firewall_rules = generator.generate_firewall_rules(contracts)
-    output_file = script_dir / 'FIREWALL_RULES.md'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(firewall_rules)
-    print(f"[SUCCESS] Generated firewall rules: {output_file}")
-    
-    # Generate Kubernetes network policies
-    k8s_policies = generator.generate_kubernetes_network_policies(contracts)
-    output_file = script_dir / 'network-policies.yaml'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(k8s_policies)
-    print(f"[SUCCESS] Generated Kubernetes network policies: {output_file}")
-    
-    # Generate Ansible vars
-    import json
-    ansible_vars = generator.generate_ansible_vars(contracts)
-    output_file = script_dir / 'ansible_vars.json'
-    with open(output_file, 'w') as f:
-        json.dump(ansible_vars, f, indent=2)
-    print(f"[SUCCESS] Generated Ansible vars: {output_file}")
+    results = generate(contracts_dir, script_dir)
+    sys.exit(1 if any(result['error'] for result in results) else 0)
 
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of the DNS zone writers.
+Compares building each zone file as one joined string (``join``) against
+streaming records straight to a buffered file handle (``stream``).
+
+Each mode runs in its own interpreter so ru_maxrss reflects only that mode.
+
+Usage:
+    bench_dns_writers.py --records 200000
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / 'infra' / 'dns'))
+
+
+def synthetic_zone(records: int) -> dict:
+    """Build an in-memory dns-zones.yaml with ``records`` A records."""
+    return {
+        'zones': [{
+            'name': 'bench.internal',
+            'type': 'authoritative',
+            'records': [
+                {'name': f"host-{i}", 'type': 'A', 'value': f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"}
+                for i in range(records)
+            ],
+        }],
+    }
+
+
+def max_rss_kb() -> int:
+    """Peak resident set size of this process in KiB."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+def run_child(mode: str, records: int) -> dict:
+    """Generate both zone formats in ``mode`` and report memory and time."""
+    from generate_dns_config import DNSConfigGenerator
+
+    generator = DNSConfigGenerator(REPO_ROOT / 'infra' / 'contracts')
+    dns_data = synthetic_zone(records)
+    baseline = max_rss_kb()
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, render, write in (
+            ('bind', generator.generate_bind_config, generator.write_bind_config),
+            ('adguard', generator.generate_adguard_config, generator.write_adguard_config),
+        ):
+            with open(Path(tmp) / name, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                if mode == 'join':
+                    f.write(render(dns_data))
+                else:
+                    write(dns_data, f)
+
+    return {
+        'mode': mode,
+        'records': records,
+        'seconds': time.perf_counter() - started,
+        'baseline_kb': baseline,
+        'peak_kb': max_rss_kb(),
+    }
+
+
+def main() -> int:
+    """Run both modes in subprocesses and print a comparison."""
+    parser = argparse.ArgumentParser(description="Benchmark DNS zone writer memory")
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--child', choices=['join', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.records)))
+        return 0
+
+    print(f"DNS writer benchmark: {args.records} records")
+    print(f"{'mode':<8} {'time':>9} {'baseline RSS':>14} {'peak RSS':>12} {'writer delta':>14}")
+    for mode in ('join', 'stream'):
+        output = subprocess.run([sys.executable, __file__, '--child', mode, '--records', str(args.records)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        delta = result['peak_kb'] - result['baseline_kb']
+        print(f"{mode:<8} {result['seconds']:>8.2f}s {result['baseline_kb'] / 1024:>11.1f} MB "
+              f"{result['peak_kb'] / 1024:>9.1f} MB {delta / 1024:>11.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for contract validation and the generators.
+Generates seeded synthetic contracts at several sizes (see
+synthetic_contracts.py) and times contract loading,
+``ContractValidator.validate_all`` and every ``NetworkConfigGenerator`` and
+``DNSConfigGenerator`` method, plus peak memory, at each size.
+
+Each size runs in its own interpreter so ru_maxrss reflects only that size.
+Results are compared with baseline.json in two ways:
+
+- a metric slower (or a peak larger) than the baseline by more than the
+  threshold is a regression
+- a metric whose time grows faster than ``max_exponent`` between two sizes
+  (e.g. quadratic in the record count) is a scaling failure, which does not
+  depend on the machine the baseline was recorded on
+
+Usage:
+    bench_scaling.py
+    bench_scaling.py --sizes 10,100,1000,10000,100000 --repeat 1
+    bench_scaling.py --update-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Any
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+BASELINE_VERSION = 1
+
+# Defaults recorded into a new baseline; an existing baseline's values win
+DEFAULT_THRESHOLD = 0.5         # fail when 50% slower than the baseline...
+DEFAULT_MIN_DELTA_MS = 5.0      # ...and at least this much slower in absolute terms
+DEFAULT_MAX_EXPONENT = 1.6      # fail when time grows like records^1.6 or worse
+MIN_SCALING_MS = 20.0           # ignore scaling of metrics faster than this at the larger size
+MIN_PEAK_DELTA_KB = 8 * 1024
+
+NETWORK_METHODS = [
+    'load_contracts',
+    'compile_access_matrix',
+    'vlan_cidrs',
+    'generate_er605_vlan_config',
+    'generate_firewall_rules',
+    'build_network_policies',
+    'generate_kubernetes_network_policies',
+    'generate_ansible_vars',
+]
+
+DNS_METHODS = [
+    'load_dns_zones',
+    'generate_adguard_config',
+    'write_adguard_config',
+    'generate_bind_config',
+    'write_bind_config',
+    'generate_ansible_vars',
+]
+
+
+def max_rss_kb() -> int:
+    """Peak resident set size of this process in KiB."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+def _timed(timings: Dict[str, float], name: str, call: Callable[[], Any]) -> Any:
+    started = time.perf_counter()
+    result = call()
+    timings[name] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def run_child(contracts_dir: Path) -> Dict[str, Any]:
+    """Time every benchmarked operation once against ``contracts_dir``."""
+    for path in (REPO_ROOT / 'scripts' / 'validation', REPO_ROOT / 'infra' / 'network', REPO_ROOT / 'infra' / 'dns'):
+        sys.path.insert(0, str(path))
+    from contract_store import ContractStore
+    from generate_dns_config import DNSConfigGenerator
+    from generate_network_config import NetworkConfigGenerator
+    from validate_contracts import STAGES, ContractValidator
+
+    baseline = max_rss_kb()
+    timings: Dict[str, float] = {}
+    # No on-disk parse cache: loading is measured cold every run
+    store = ContractStore(contracts_dir, cache_dir=None)
+    _timed(timings, 'load', lambda: [store.load(filename) for _, filename, _, _ in STAGES])
+
+    validator = ContractValidator(contracts_dir, store)
+    validator.hooks = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        _timed(timings, 'validate_all', lambda: validator.validate_all())
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        network = NetworkConfigGenerator(contracts_dir, store)
+        contracts = _timed(timings, 'network.load_contracts', network.load_contracts)
+        for method in NETWORK_METHODS[1:]:
+            _timed(timings, f"network.{method}", lambda: getattr(network, method)(contracts))
+
+        dns = DNSConfigGenerator(contracts_dir, store)
+        dns_data = _timed(timings, 'dns.load_dns_zones', dns.load_dns_zones)
+        with open(os.devnull, 'w', encoding='utf-8') as sink:
+            for method in DNS_METHODS[1:]:
+                if method.startswith('write_'):
+                    _timed(timings, f"dns.{method}", lambda: getattr(dns, method)(dns_data, sink))
+                else:
+                    _timed(timings, f"dns.{method}", lambda: getattr(dns, method)(dns_data))
+
+    return {
+        'timings_ms': timings,
+        'peak_kb': max_rss_kb(),
+        'peak_delta_kb': max_rss_kb() - baseline,
+        'errors': len(validator.errors),
+        'warnings': len(validator.warnings),
+    }
+
+
+def run_size(size: int, seed: int, repeat: int) -> Dict[str, Any]:
+    """Generate contracts for ``size`` and benchmark them ``repeat`` times, keeping the best run."""
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from synthetic_contracts import generate, write
+
+    with tempfile.TemporaryDirectory(prefix='bench-contracts-') as tmp:
+        contracts = generate(size, seed)
+        write(contracts, Path(tmp))
+        counts = {
+            'vlans': len(contracts['vlans.yaml']['vlans']),
+            'reservations': len(contracts['ipam.yaml']['reservations']),
+            'dns_records': len(contracts['dns-zones.yaml']['zones'][0]['records']),
+            'access_rules': len(contracts['access-matrix.yaml']['access_matrix']),
+        }
+        del contracts
+
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, __file__, '--child', tmp],
+                                    capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(output))
+
+    best = runs[0]
+    for run in runs[1:]:
+        for metric, value in run['timings_ms'].items():
+            best['timings_ms'][metric] = min(best['timings_ms'][metric], value)
+        best['peak_kb'] = min(best['peak_kb'], run['peak_kb'])
+        best['peak_delta_kb'] = min(best['peak_delta_kb'], run['peak_delta_kb'])
+    best['counts'] = counts
+    return best
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]],
+            settings: Dict[str, float]) -> List[str]:
+    """Return regression and scaling failures of ``results``."""
+    failures = []
+
+    if baseline:
+        for size, result in results.items():
+            base = baseline['results'].get(size)
+            if base is None:
+                continue
+            for metric, value in result['timings_ms'].items():
+                old = base['timings_ms'].get(metric)
+                if old is None:
+                    continue
+                if value > old * (1 + settings['threshold']) and value - old > settings['min_delta_ms']:
+                    failures.append(f"{metric} at {size} records: {value:.1f} ms vs baseline {old:.1f} ms "
+                                    f"(+{(value / old - 1) * 100 if old else math.inf:.0f}%)")
+            old_peak = base.get('peak_delta_kb')
+            peak = result['peak_delta_kb']
+            if old_peak is not None and peak > old_peak * (1 + settings['threshold']) and \
+                    peak - old_peak > MIN_PEAK_DELTA_KB:
+                failures.append(f"peak memory at {size} records: {peak / 1024:.1f} MB vs baseline "
+                                f"{old_peak / 1024:.1f} MB")
+
+    sizes = sorted(results, key=int)
+    for smaller, larger in zip(sizes, sizes[1:]):
+        ratio = math.log(int(larger) / int(smaller))
+        for metric, value in results[larger]['timings_ms'].items():
+            previous = results[smaller]['timings_ms'].get(metric)
+            if previous is None or value < MIN_SCALING_MS or previous <= 0:
+                continue
+            # Floor the small-size time at 1 ms so timer noise cannot fake a steep curve
+            exponent = math.log(value / max(previous, 1.0)) / ratio
+            if exponent > settings['max_exponent']:
+                failures.append(f"{metric} grows as records^{exponent:.2f} from {smaller} to {larger} records "
+                                f"({previous:.1f} ms -> {value:.1f} ms)")
+    return failures
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    """Print one column per size, one row per metric."""
+    sizes = sorted(results, key=int)
+    metrics = list(results[sizes[0]]['timings_ms'])
+    print(f"{'metric (ms)':<46}" + ''.join(f"{size:>12}" for size in sizes))
+    for metric in metrics:
+        print(f"{metric:<46}" + ''.join(f"{results[size]['timings_ms'].get(metric, 0):>12.2f}" for size in sizes))
+    print(f"{'peak memory delta (MB)':<46}" + ''.join(f"{results[size]['peak_delta_kb'] / 1024:>12.1f}"
+                                                    for size in sizes))
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark validation and generation at several contract sizes")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated record counts (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per size; the fastest is kept")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help="Record this run as the new baseline")
+    parser.add_argument('--threshold', type=float, help="Allowed slowdown vs the baseline (0.5 = 50%%)")
+    parser.add_argument('--output', type=Path, help="Also write this run's results as JSON")
+    parser.add_argument('--child', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child)))
+        return 0
+
+    baseline = None
+    if args.baseline.exists() and not args.update_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('version') != BASELINE_VERSION or baseline.get('seed') != args.seed:
+            print(f"Warning: ignoring baseline {args.baseline} (different version or seed)")
+            baseline = None
+
+    settings = {
+        'threshold': DEFAULT_THRESHOLD,
+        'min_delta_ms': DEFAULT_MIN_DELTA_MS,
+        'max_exponent': DEFAULT_MAX_EXPONENT,
+    }
+    if baseline:
+        settings.update({key: baseline[key] for key in settings if key in baseline})
+    if args.threshold is not None:
+        settings['threshold'] = args.threshold
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in (int(value) for value in args.sizes.split(',')):
+        started = time.perf_counter()
+        results[str(size)] = run_size(size, args.seed, args.repeat)
+        counts = results[str(size)]['counts']
+        print(f"Benchmarked {size} records ({counts['vlans']} VLANs, {counts['reservations']} reservations, "
+              f"{counts['dns_records']} DNS records, {counts['access_rules']} rules) "
+              f"in {time.perf_counter() - started:.1f}s")
+    print()
+    print_results(results)
+
+    document = dict(settings, version=BASELINE_VERSION, seed=args.seed, results=results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+
+    failures = compare(results, baseline, settings)
+
+    print("\n" + "="*60)
+    if failures:
+        print(f"[ERROR] Found {len(failures)} performance regression(s):")
+        for failure in failures:
+            print(f"  - {failure}")
+    elif baseline:
+        print(f"[SUCCESS] No regressions against {args.baseline.name} "
+              f"(threshold {settings['threshold'] * 100:.0f}%, max exponent {settings['max_exponent']})")
+    else:
+        print(f"[SUCCESS] No superlinear scaling (max exponent {settings['max_exponent']}); no baseline compared")
+    print("="*60)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
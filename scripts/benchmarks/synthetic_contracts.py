@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic contract generator.
+Writes a consistent vlans/ipam/dns-zones/access-matrix/platform set of a
+given size: every network has a VLAN, every reservation sits inside its
+network, DNS A records match their reservations (a few reservations are
+left without one), and access rules only reference defined VLANs without
+shadowing each other. The same seed and size always
+produce the same files.
+
+Usage:
+    synthetic_contracts.py --records 10000 --out /tmp/contracts
+    synthetic_contracts.py --records 100000 --vlans 200 --seed 7 --out /tmp/big
+"""
+
+import argparse
+import ipaddress
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # libyaml not installed
+    from yaml import SafeDumper
+
+
+DOMAIN = 'home.internal'
+BASE_NETWORK = int(ipaddress.ip_address('10.0.0.0'))
+
+# VLAN IDs are 12-bit; 1 is management, and the dense access matrix grows
+# with the square of the VLAN count, so scale caps it well below 4094
+MAX_VLANS = 250
+
+# Common service ports used for port-restricted allow rules
+SERVICE_PORTS = [22, 53, 80, 123, 443, 445, 1883, 3000, 5432, 6443, 8080, 8443, 9090, 9100]
+
+TRUST_LEVELS = ['admin', 'user', 'untrusted', 'none']
+
+# Share of reservations that get a DNS record, and of records that are CNAMEs
+DNS_COVERAGE = 0.95
+CNAME_SHARE = 0.05
+
+
+def default_vlans(records: int) -> int:
+    """VLAN count for a given record count: grows with the square root, capped."""
+    return max(3, min(MAX_VLANS, int(records ** 0.5) // 2))
+
+
+def generate(records: int, seed: int = 0, vlans: Optional[int] = None) -> Dict[str, Any]:
+    """Return {filename: parsed contract} for roughly ``records`` records.
+
+    About 45% of the records are IPAM reservations, a matching share are
+    DNS records, and the remaining 10% are access rules (at most one per
+    VLAN pair).
+    """
+    rng = random.Random(seed)
+    vlan_count = vlans or default_vlans(records)
+    if not 1 <= vlan_count <= 4094:
+        raise ValueError("VLAN count must be between 1 and 4094")
+
+    reservation_count = max(vlan_count, records * 9 // 20)
+    per_vlan = -(-reservation_count // vlan_count)
+    # Room for network, gateway, reservations and broadcast
+    host_bits = max(8, (per_vlan + 3 - 1).bit_length())
+    if vlan_count << host_bits > 1 << 24:
+        raise ValueError(f"{reservation_count} reservations in {vlan_count} VLANs do not fit in 10.0.0.0/8")
+
+    vlan_data: Dict[str, Any] = {}
+    networks: Dict[str, Any] = {}
+    names: List[str] = []
+    for index in range(vlan_count):
+        name = 'management' if index == 0 else f"vlan{index + 1}"
+        vlan_id = index + 1
+        names.append(name)
+        vlan_data[name] = {
+            'id': vlan_id,
+            'trust': 'admin' if index == 0 else rng.choice(TRUST_LEVELS[1:]),
+            'default_policy': 'deny' if index == 0 or rng.random() < 0.8 else 'allow',
+        }
+        start = BASE_NETWORK + (index << host_bits)
+        networks[f"net_{name}"] = {
+            'vlan_id': vlan_id,
+            'cidr': f"{ipaddress.ip_address(start)}/{32 - host_bits}",
+            'gateway': str(ipaddress.ip_address(start + 1)),
+        }
+
+    reservations: Dict[str, Any] = {}
+    dns_records: List[Dict[str, Any]] = []
+    for index in range(reservation_count):
+        vlan_index, slot = index % vlan_count, index // vlan_count
+        name = names[vlan_index]
+        host = f"host-{vlan_index + 1}-{slot}"
+        ip = str(ipaddress.ip_address(BASE_NETWORK + (vlan_index << host_bits) + 2 + slot))
+        reservations[f"{name}_{slot}"] = {
+            'hostname': f"{host}.{DOMAIN}",
+            'ip': ip,
+            'vlan': f"net_{name}",
+            'mac': ':'.join(f"{rng.randrange(256):02x}" for _ in range(6)),
+        }
+        if rng.random() < DNS_COVERAGE:
+            dns_records.append({'name': host, 'type': 'A', 'value': ip})
+            if rng.random() < CNAME_SHARE:
+                dns_records.append({'name': f"alias-{host}", 'type': 'CNAME', 'value': f"{host}.{DOMAIN}"})
+
+    return {
+        'vlans.yaml': {'vlans': vlan_data},
+        'ipam.yaml': {
+            'site': 'bench',
+            'domain': {'internal': DOMAIN, 'external': 'bench.example'},
+            'networks': networks,
+            'reservations': reservations,
+        },
+        'dns-zones.yaml': {
+            'zones': [{'name': DOMAIN, 'type': 'authoritative', 'records': dns_records}],
+            'dns_policy': {'ad_blocking': 'mandatory', 'malware_protection': 'enabled', 'dnssec': 'enabled'},
+        },
+        'access-matrix.yaml': {'access_matrix': _access_rules(rng, names, max(1, records // 10))},
+        'platform.yaml': {
+            'platform': {
+                'virtualization': 'synology_vmm',
+                'kubernetes': {'distribution': 'k3s', 'primary_node': f"k3s-master-01.{DOMAIN}"},
+                'containers': {'allowed': True, 'scope': ['infra', 'non-cluster']},
+            },
+        },
+    }
+
+
+def _access_rules(rng: random.Random, names: List[str], budget: int) -> List[Dict[str, Any]]:
+    """Rules over distinct VLAN pairs, so no rule shadows another.
+
+    Management reaches everything; other VLANs get internet access plus a
+    mix of denies and port-restricted allows towards random VLANs, up to
+    roughly ``budget`` rules.
+    """
+    rules: List[Dict[str, Any]] = [{'from': names[0], 'to': '*', 'action': 'allow'}]
+    others = names[1:]
+    if not others:
+        return rules
+    per_source = max(1, min(len(names), budget // len(others)))
+    for source in others:
+        rules.append({'from': source, 'to': 'internet', 'action': 'allow'})
+        targets = rng.sample([name for name in names if name != source], min(per_source - 1, len(names) - 1))
+        for target in targets:
+            if rng.random() < 0.5:
+                rules.append({'from': source, 'to': target, 'action': 'deny'})
+            else:
+                ports = sorted(rng.sample(SERVICE_PORTS, rng.randint(1, 3)))
+                rules.append({'from': source, 'to': target, 'action': 'allow', 'ports': ports})
+    return rules
+
+
+def write(contracts: Dict[str, Any], out_dir: Path):
+    """Write a generated contract set to ``out_dir``."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for filename, data in contracts.items():
+        with open(out_dir / filename, 'w', encoding='utf-8') as f:
+            yaml.dump(data, f, Dumper=SafeDumper, sort_keys=False, default_flow_style=False)
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic contract set")
+    parser.add_argument('--records', type=int, default=1000, help="Approximate total record count")
+    parser.add_argument('--vlans', type=int, help="VLAN count (default: derived from --records)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, required=True, help="Output contracts directory")
+    args = parser.parse_args()
+
+    try:
+        contracts = generate(args.records, args.seed, args.vlans)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    write(contracts, args.out)
+
+    ipam = contracts['ipam.yaml']
+    print(f"Wrote {len(contracts['vlans.yaml']['vlans'])} VLANs, {len(ipam['reservations'])} reservations, "
+          f"{len(contracts['dns-zones.yaml']['zones'][0]['records'])} DNS records and "
+          f"{len(contracts['access-matrix.yaml']['access_matrix'])} access rules to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
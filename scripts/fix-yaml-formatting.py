@@ -3,57 +3,172 @@
 Fix common yamllint errors in YAML files.
 - Adds missing newline at end of files
 - Removes extra blank lines at end of files
+
+Only the last bytes of each file are read to decide whether it needs fixing,
+files are checked on a thread pool, and files already seen clean with the
+same mtime and size are skipped via a small index in .cache/.
+
+Usage:
+    fix-yaml-formatting.py                 # fix everything under k8s/ and infra/
+    fix-yaml-formatting.py --check         # report only, exit 1 if anything needs fixing
+    fix-yaml-formatting.py --check a.yaml  # limit to the given files (pre-commit)
 """
 
+import argparse
+import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
-def fix_yaml_file(filepath):
-    """Fix common yamllint issues in a YAML file."""
+BASE_DIRS = ['k8s', 'infra']
+YAML_SUFFIXES = ('.yaml', '.yml')
+INDEX_FILE = Path('.cache') / 'yaml-formatting.json'
+
+# Enough to see the end of the file; anything unusual falls back to a full read
+TAIL_BYTES = 64
+
+# A clean file ends in exactly one newline after a printable ASCII character
+_CLEAN_LAST = frozenset(range(0x21, 0x7f))
+
+
+def needs_fix(filepath):
+    """Return True if the file does not end in exactly one newline.
+
+    Reads only the tail of the file. When the tail is not conclusive (empty
+    file, CRLF endings, trailing non-ASCII characters) the full content is
+    compared with its fixed form, exactly as a fix would.
+    """
+    with open(filepath, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return False
+        f.seek(max(0, size - TAIL_BYTES))
+        tail = f.read()
+    if len(tail) >= 2 and tail[-1] == 0x0a and tail[-2] in _CLEAN_LAST:
+        return False
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return content.rstrip() + '\n' != content
+
+
+def fix_yaml_file(filepath, check=False):
+    """Fix common yamllint issues in a YAML file.
+
+    Returns True if the file needed fixing (and, unless ``check``, was fixed),
+    False if it was already clean, and None on error.
+    """
     try:
+        if not needs_fix(filepath):
+            return False
+
+        if check:
+            print(f"❌ Needs fixing: {filepath}")
+            return True
+
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
-        
-        if not content:
-            return False
-        
-        original_content = content
-        
+
         # Remove trailing blank lines (keep only one newline at end)
-        content = content.rstrip() + '\n'
-        
-        if content != original_content:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            print(f"✅ Fixed: {filepath}")
-            return True
-        
-        return False
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(content.rstrip() + '\n')
+        print(f"✅ Fixed: {filepath}")
+        return True
     except Exception as e:
         print(f"❌ Error fixing {filepath}: {e}")
-        return False
+        return None
 
 
-def main():
-    """Find and fix all YAML files."""
-    base_dirs = ['k8s', 'infra']
-    fixed_count = 0
-    
+def find_yaml_files(base_dirs):
+    """Walk each base directory once and return its YAML files."""
+    files = []
     for base_dir in base_dirs:
         if not os.path.exists(base_dir):
             continue
-        
-        for yaml_file in Path(base_dir).rglob('*.yaml'):
-            if fix_yaml_file(yaml_file):
-                fixed_count += 1
-        
-        for yml_file in Path(base_dir).rglob('*.yml'):
-            if fix_yaml_file(yml_file):
-                fixed_count += 1
-    
-    print(f"\n✅ Fixed {fixed_count} files")
+        for dirpath, dirnames, filenames in os.walk(base_dir):
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            files += [os.path.join(dirpath, name) for name in filenames if name.endswith(YAML_SUFFIXES)]
+    return files
+
+
+def load_index(path):
+    """Load the mtime/size index of files last seen clean."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(path, index):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'), sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _stat_key(filepath):
+    stat = os.stat(filepath)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def main():
+    """Find and fix all YAML files."""
+    parser = argparse.ArgumentParser(description="Fix trailing newlines in YAML files")
+    parser.add_argument('files', nargs='*', help="Files to check (default: every YAML file under k8s/ and infra/)")
+    parser.add_argument('--check', action='store_true', help="Report files needing fixes and exit 1; write nothing")
+    parser.add_argument('--no-index', action='store_true', help="Ignore the mtime/size index")
+    parser.add_argument('-j', '--jobs', type=int, help="Worker threads (default: auto)")
+    args = parser.parse_args()
+
+    if args.files:
+        files = [path for path in args.files if path.endswith(YAML_SUFFIXES)]
+    else:
+        files = find_yaml_files(BASE_DIRS)
+
+    index = {} if args.no_index else load_index(INDEX_FILE)
+    pending = []
+    for path in files:
+        try:
+            if index.get(path) != _stat_key(path):
+                pending.append(path)
+        except OSError:
+            pending.append(path)
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(lambda path: fix_yaml_file(path, args.check), pending))
+
+    flagged = 0
+    errors = 0
+    for path, result in zip(pending, results):
+        if result is None:
+            errors += 1
+            continue
+        if result:
+            flagged += 1
+            if args.check:
+                index.pop(path, None)
+                continue
+        try:
+            index[path] = _stat_key(path)
+        except OSError:
+            index.pop(path, None)
+
+    if not args.no_index:
+        try:
+            save_index(INDEX_FILE, index)
+        except OSError as e:
+            print(f"⚠️  Could not save index {INDEX_FILE}: {e}")
+
+    skipped = len(files) - len(pending)
+    if args.check:
+        print(f"\n{'❌' if flagged else '✅'} {flagged} of {len(files)} files need fixing ({skipped} unchanged, skipped)")
+        return 1 if flagged or errors else 0
+
+    print(f"\n✅ Fixed {flagged} files ({skipped} unchanged, skipped)")
     return 0
 
 
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Single entry point for homelab contract tooling.
+Runs validation and the network/DNS generators in one process, parsing
+each contract once and importing heavy modules only when a command needs them.
+
+Usage:
+    homelab.py validate
+    homelab.py validate --profile --report validation.sarif
+    homelab.py validate --batch sites/ -j 4
+    homelab.py gen network
+    homelab.py gen dns
+    homelab.py all
+    homelab.py all --watch
+    homelab.py verify
+    homelab.py verify --random 500 --seed 7
+    homelab.py k8s
+    homelab.py dns-sync --url http://10.0.1.53:3000 --dry-run
+    homelab.py ipam usage
+    homelab.py ipam next vlan10_iot --count 200
+    homelab.py startup-check --budget-ms 50
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CONTRACTS_DIR = REPO_ROOT / 'infra' / 'contracts'
+NETWORK_OUTPUT_DIR = REPO_ROOT / 'infra' / 'network'
+DNS_OUTPUT_DIR = REPO_ROOT / 'infra' / 'dns'
+
+# Budget for this module's own imports on top of a bare interpreter
+DEFAULT_STARTUP_BUDGET_MS = 50.0
+
+
+def _setup_paths():
+    """Make the validation library and generator scripts importable."""
+    for path in (REPO_ROOT / 'scripts' / 'validation', NETWORK_OUTPUT_DIR, DNS_OUTPUT_DIR):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+
+
+class _SubcommandParser(argparse.ArgumentParser):
+    """Subcommand parser that can take its options from the module running it.
+
+    ``add_arguments`` is called only when the subcommand is actually parsed,
+    so the module that defines the options is imported lazily like the rest.
+    """
+
+    def __init__(self, *args, add_arguments=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._add_arguments = add_arguments
+
+    def parse_known_args(self, args=None, namespace=None):
+        if self._add_arguments is not None:
+            add_arguments, self._add_arguments = self._add_arguments, None
+            add_arguments(self)
+        return super().parse_known_args(args, namespace)
+
+
+def _adguard_sync_arguments(parser: argparse.ArgumentParser):
+    """Options of ``dns-sync``, as defined by adguard_sync."""
+    _setup_paths()
+    from adguard_sync import add_arguments
+
+    add_arguments(parser)
+
+
+def _ip_allocator_arguments(parser: argparse.ArgumentParser):
+    """Commands of ``ipam``, as defined by ip_allocator."""
+    _setup_paths()
+    from ip_allocator import add_arguments
+
+    add_arguments(parser)
+
+
+def _store(args):
+    """Return the process-wide contract store for this run."""
+    _setup_paths()
+    from contract_store import ContractStore
+
+    return ContractStore.shared(args.contracts_dir)
+
+
+def _run_validation(args, cache) -> bool:
+    """Run one validation pass with the reporting options in ``args``."""
+    from validate_contracts import ContractValidator
+    from validation_report import jsonl_hook, write_report
+
+    validator = ContractValidator(args.contracts_dir, _store(args))
+    if args.metrics:
+        validator.add_hook(jsonl_hook(args.metrics))
+    success = validator.validate_all(cache, args.profile)
+    if args.report:
+        write_report(args.report, validator.build_report(), args.report_format)
+    return success
+
+
+def cmd_validate(args) -> int:
+    """Validate contracts."""
+    _setup_paths()
+    from validate_contracts import DEFAULT_CACHE_FILE
+    from validation_cache import ValidationCache
+
+    if args.watch:
+        return _watch(args, generate=False)
+    if getattr(args, 'batch', None):
+        from batch_validate import DEFAULT_CACHE_DIR as BATCH_CACHE_DIR, run_batch
+        return 0 if run_batch(args.batch, args.jobs, None if args.no_cache else BATCH_CACHE_DIR) else 1
+    cache = None if args.no_cache else ValidationCache(args.cache or DEFAULT_CACHE_FILE)
+    return 0 if _run_validation(args, cache) else 1
+
+
+def cmd_gen(args) -> int:
+    """Run one or more generators through a single output pipeline."""
+    _setup_paths()
+    from output_pipeline import generate_artifacts
+
+    targets = ['network', 'dns'] if args.target == 'all' else [args.target]
+    results = generate_artifacts(_artifacts(args, targets), args.jobs)
+    return 1 if any(result['error'] for result in results) else 0
+
+
+def _artifacts(args, targets):
+    """Collect pipeline entries for the ``network`` and/or ``dns`` generators."""
+    pending = []
+    for target in targets:
+        if target == 'network':
+            import generate_network_config
+            pending += generate_network_config.artifacts(args.contracts_dir, NETWORK_OUTPUT_DIR, _store(args))
+        else:
+            import generate_dns_config
+            pending += generate_dns_config.artifacts(args.contracts_dir, DNS_OUTPUT_DIR, _store(args),
+                                                     split_zones=args.split_zones)
+    return pending
+
+
+def cmd_all(args) -> int:
+    """Validate, then regenerate every artifact if validation passed."""
+    if args.watch:
+        _setup_paths()
+        return _watch(args, generate=True)
+    status = cmd_validate(args)
+    if status != 0:
+        print("[ERROR] Validation failed; skipping generation")
+        return status
+    args.target = 'all'
+    return cmd_gen(args)
+
+
+def _watch(args, generate: bool) -> int:
+    """Revalidate (and regenerate) on every contract change until interrupted.
+
+    The contract store, parsed contracts, compiled models and the stage
+    result cache stay in memory between edits, so each change only reruns
+    the validation stages and generators that read the changed files.
+    """
+    import time
+    from contract_watcher import ContractWatcher, affected_generators
+    from output_pipeline import generate_artifacts
+    from validate_contracts import DEFAULT_CACHE_FILE
+    from validation_cache import ValidationCache
+
+    cache = ValidationCache(args.cache or DEFAULT_CACHE_FILE)
+    if args.no_cache:
+        cache.stages = {}
+    watcher = ContractWatcher(args.contracts_dir, args.debounce_ms / 1000)
+
+    def run(targets):
+        cache.hits.clear()
+        cache.misses.clear()
+        success = _run_validation(args, cache)
+        if generate and not success:
+            print("[ERROR] Validation failed; skipping generation")
+        elif generate and targets:
+            generate_artifacts(_artifacts(args, targets), args.jobs)
+        return success
+
+    run(['network', 'dns'])
+    print(f"Watching {args.contracts_dir} ({watcher.backend}); press Ctrl+C to stop")
+    try:
+        for changed, first_event in watcher.batches():
+            started = time.monotonic()
+            print(f"\n--- {', '.join(sorted(changed))} changed ---")
+            targets = affected_generators(changed) if generate else []
+            run(targets)
+            rerun = ', '.join(cache.misses) or 'none'
+            print(f"[watch] Reran stages: {rerun}; regenerated: {', '.join(targets) or 'none'}; "
+                  f"done in {(time.monotonic() - started) * 1000:.1f} ms "
+                  f"(+{(started - first_event) * 1000:.1f} ms debounce)")
+    except KeyboardInterrupt:
+        print()
+    finally:
+        watcher.close()
+    return 0
+
+
+def cmd_verify(args) -> int:
+    """Check generated network artifacts and the ACL compiler against the access matrix."""
+    _setup_paths()
+    from policy_equivalence import check, format_finding
+    import acl_roundtrip
+
+    try:
+        findings, elapsed = check(args.contracts_dir, NETWORK_OUTPUT_DIR, _store(args))
+    except (KeyError, ValueError) as e:
+        print(f"[ERROR] Could not parse generated artifacts: {e}")
+        return 2
+
+    for finding in findings:
+        print(f"[ERROR] {format_finding(finding)}")
+    if findings:
+        print(f"[ERROR] {len(findings)} flow disagreement(s) found in {elapsed * 1000:.1f} ms")
+    else:
+        print(f"[SUCCESS] Generated network policies match the access matrix ({elapsed * 1000:.1f} ms)")
+
+    roundtrip_ok = acl_roundtrip.report(*acl_roundtrip.check(args.contracts_dir, args.random, args.seed, _store(args)))
+    return 0 if not findings and roundtrip_ok else 1
+
+
+def cmd_k8s(args) -> int:
+    """Validate cross-references in the k8s manifest tree."""
+    _setup_paths()
+    from validate_k8s import K8sValidator, DEFAULT_CACHE_DIR
+
+    validator = K8sValidator(args.k8s_dir, args.paths, None if args.no_cache else DEFAULT_CACHE_DIR, args.jobs)
+    return 0 if validator.validate_all() else 1
+
+
+def cmd_dns_sync(args) -> int:
+    """Sync AdGuard Home DNS rewrites with the DNS zones contract."""
+    _setup_paths()
+    from adguard_sync import run
+
+    return run(args.contracts_dir, args, _store(args))
+
+
+def cmd_ipam(args) -> int:
+    """Report IPAM utilization or propose free addresses."""
+    _setup_paths()
+    from ip_allocator import run
+
+    return run(_store(args), args)
+
+
+def cmd_startup_check(args) -> int:
+    """Measure this CLI's import cost with -X importtime and enforce a budget."""
+    import subprocess
+
+    def import_times(command):
+        result = subprocess.run([sys.executable, '-X', 'importtime'] + command,
+                                capture_output=True, text=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            times[name.strip()] = (int(self_us), int(cumulative_us))
+        return times
+
+    baseline = import_times(['-c', 'pass'])
+    measured = import_times([str(Path(__file__).resolve()), '--help'])
+    extra = {name: times for name, times in measured.items() if name not in baseline}
+    total_ms = sum(self_us for self_us, _ in extra.values()) / 1000
+
+    print(f"CLI import time: {total_ms:.1f} ms over {len(extra)} module(s) (budget {args.budget_ms:.1f} ms)")
+    for name, (self_us, cumulative_us) in sorted(extra.items(), key=lambda item: -item[1][1])[:5]:
+        print(f"  {cumulative_us / 1000:7.1f} ms  {name}")
+
+    if total_ms > args.budget_ms:
+        print("[ERROR] CLI startup exceeds its import budget")
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(prog='homelab', description="Homelab contract tooling")
+    parser.add_argument('--contracts-dir', type=Path, default=DEFAULT_CONTRACTS_DIR,
+                        help="Directory containing the contract files")
+    subparsers = parser.add_subparsers(dest='command', required=True, parser_class=_SubcommandParser)
+
+    validate = subparsers.add_parser('validate', help="Validate contracts")
+    validate.add_argument('--batch', type=Path, nargs='+', metavar='ROOT',
+                          help="Validate every contract directory under these roots and compare them")
+    validate.add_argument('-j', '--jobs', type=int, help="Validator processes in --batch mode (default: auto)")
+    validate.set_defaults(func=cmd_validate)
+
+    gen = subparsers.add_parser('gen', help="Generate configuration from contracts")
+    gen.add_argument('target', choices=['network', 'dns', 'all'])
+    gen.set_defaults(func=cmd_gen)
+
+    run_all = subparsers.add_parser('all', help="Validate and regenerate everything")
+    run_all.set_defaults(func=cmd_all)
+
+    verify = subparsers.add_parser('verify', help="Check generated network policies against the access matrix")
+    verify.add_argument('--random', type=int, default=100, help="Random matrices for the ACL round-trip")
+    verify.add_argument('--seed', type=int, default=0, help="Seed for the random matrices")
+    verify.set_defaults(func=cmd_verify)
+
+    k8s = subparsers.add_parser('k8s', help="Validate k8s manifest cross-references")
+    k8s.add_argument('paths', nargs='*', type=Path, help="Extra directories to syntax-check only")
+    k8s.add_argument('--k8s-dir', type=Path, default=REPO_ROOT / 'k8s', help="Root of the k8s manifest tree")
+    k8s.add_argument('-j', '--jobs', type=int, help="Parser processes (default: auto)")
+    k8s.add_argument('--no-cache', action='store_true', help="Reparse every manifest")
+    k8s.set_defaults(func=cmd_k8s)
+
+    dns_sync = subparsers.add_parser('dns-sync', help="Apply DNS rewrite changes to AdGuard Home",
+                                     add_arguments=_adguard_sync_arguments)
+    dns_sync.set_defaults(func=cmd_dns_sync)
+
+    ipam = subparsers.add_parser('ipam', help="IP allocation and utilization", add_arguments=_ip_allocator_arguments)
+    ipam.set_defaults(func=cmd_ipam)
+
+    for subparser in (validate, run_all):
+        subparser.add_argument('--cache', type=Path, help="Validation result cache file")
+        subparser.add_argument('--no-cache', action='store_true', help="Revalidate every contract")
+        subparser.add_argument('--profile', action='store_true', help="Print per-stage wall time and record counts")
+        subparser.add_argument('--report', type=Path, help="Write findings and stage metrics to a JSON or .sarif file")
+        subparser.add_argument('--report-format', choices=['json', 'sarif'], help="Report format (default: from suffix)")
+        subparser.add_argument('--metrics', type=Path, help="Append this run's stage metrics as a JSON line")
+        subparser.add_argument('--watch', action='store_true',
+                               help="Keep running and revalidate whenever a contract changes")
+        subparser.add_argument('--debounce-ms', type=float, default=30.0,
+                               help="Quiet period that ends a burst of saves in --watch mode")
+
+    for subparser in (gen, run_all):
+        subparser.add_argument('-j', '--jobs', type=int, help="Generator worker threads (default: auto)")
+        subparser.add_argument('--split-zones', action='store_true', help="Also write one file per DNS zone")
+
+    startup = subparsers.add_parser('startup-check', help="Check CLI import time against a budget")
+    startup.add_argument('--budget-ms', type=float, default=DEFAULT_STARTUP_BUDGET_MS)
+    startup.set_defaults(func=cmd_startup_check)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """Main entry point."""
+    args = build_parser().parse_args(argv)
+    args.contracts_dir = args.contracts_dir.resolve()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
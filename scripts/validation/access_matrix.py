@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Compiled access matrix for homelab infrastructure contracts.
+Compiles the ordered rule list in access-matrix.yaml into a dense
+VLAN x destination x port-class decision table with first-match semantics.
+
+Usage:
+    access_matrix.py iot management 6443
+    access_matrix.py dmz management
+    access_matrix.py --analyze
+"""
+
+import argparse
+import bisect
+import sys
+import time
+from array import array
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+
+WILDCARD = '*'
+INTERNET = 'internet'
+MAX_PORT = 65535
+
+PortRange = Tuple[int, int]
+
+
+def parse_ports(ports: Any) -> List[PortRange]:
+    """Parse a rule's ``ports`` list into inclusive (low, high) ranges.
+
+    Accepts integers and ``"low-high"`` strings; an empty or missing list
+    means every port. Raises ValueError on anything else.
+    """
+    if not ports:
+        return [(0, MAX_PORT)]
+    if not isinstance(ports, list):
+        ports = [ports]
+
+    ranges = []
+    for port in ports:
+        if isinstance(port, bool):
+            raise ValueError(f"invalid port {port!r}")
+        if isinstance(port, int):
+            low = high = port
+        elif isinstance(port, str):
+            low_text, _, high_text = port.strip().partition('-')
+            try:
+                low = int(low_text)
+                high = int(high_text) if high_text else low
+            except ValueError:
+                raise ValueError(f"invalid port {port!r}")
+        else:
+            raise ValueError(f"invalid port {port!r}")
+        if not 0 <= low <= high <= MAX_PORT:
+            raise ValueError(f"invalid port {port!r}")
+        ranges.append((low, high))
+    return ranges
+
+
+def format_ports(ranges: List[PortRange]) -> str:
+    """Format port ranges for display, e.g. ``22, 80-443`` or ``any``."""
+    if ranges == [(0, MAX_PORT)]:
+        return 'any'
+    return ', '.join(str(low) if low == high else f"{low}-{high}" for low, high in ranges)
+
+
+class AccessMatrix:
+    """Dense decision table compiled from an ordered access rule list.
+
+    Sources are VLAN names; destinations are VLAN names plus ``internet``.
+    Ports are collapsed into classes bounded by every port mentioned in a
+    rule, so the table holds one cell per (source, destination, class) and
+    a query is two dict lookups, one bisect and one array read. Each cell
+    stores the index of the first matching rule, or -1 when the source
+    VLAN's ``default_policy`` applies.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], sources: List[str], destinations: List[str],
+                 default_policies: Dict[str, str], port_bounds: List[int]):
+        self.rules = rules
+        self.sources = sources
+        self.destinations = destinations
+        self.default_policies = default_policies
+        self.port_bounds = port_bounds
+        self.skipped: List[int] = []
+        self._parsed: List[Optional[Tuple[List[str], List[str], List[PortRange]]]] = []
+
+        self._src_index = {name: i for i, name in enumerate(sources)}
+        self._dst_index = {name: i for i, name in enumerate(destinations)}
+        self._classes = len(port_bounds) - 1
+        size = len(sources) * len(destinations) * self._classes
+        self._rule_ids = array('i', [-1]) * size
+        self._allow = bytearray(size)
+
+    @classmethod
+    def compile(cls, rules: List[Dict[str, Any]], vlans: Dict[str, Dict[str, Any]]) -> 'AccessMatrix':
+        """Compile ``access_matrix`` rules against the ``vlans`` mapping.
+
+        Rules referencing unknown VLANs or carrying invalid ports are
+        skipped and listed in ``skipped``; the validator reports them.
+        """
+        rules = list(rules or [])
+        sources = list(vlans)
+        destinations = sources + [INTERNET]
+        default_policies = {name: (config or {}).get('default_policy', 'deny') for name, config in vlans.items()}
+
+        parsed = []
+        skipped = []
+        bounds = {0, MAX_PORT + 1}
+        for i, rule in enumerate(rules):
+            try:
+                ranges = parse_ports(rule.get('ports'))
+            except ValueError:
+                skipped.append(i)
+                parsed.append(None)
+                continue
+            srcs = cls._expand(rule.get('from'), sources)
+            dsts = cls._expand(rule.get('to'), destinations)
+            if srcs is None or dsts is None or rule.get('action') not in ('allow', 'deny'):
+                skipped.append(i)
+                parsed.append(None)
+                continue
+            for low, high in ranges:
+                bounds.add(low)
+                bounds.add(high + 1)
+            parsed.append((srcs, dsts, ranges))
+
+        matrix = cls(rules, sources, destinations, default_policies, sorted(bounds))
+        matrix.skipped = skipped
+        matrix._parsed = parsed
+        matrix._fill(parsed)
+        return matrix
+
+    @staticmethod
+    def _expand(name: Any, names: List[str]) -> Optional[List[str]]:
+        if name == WILDCARD:
+            return names
+        if name in names:
+            return [name]
+        return None
+
+    def _fill(self, parsed: List[Optional[Tuple[List[str], List[str], List[PortRange]]]]):
+        """Write rules into the table last-to-first so the first match wins."""
+        classes = self._classes
+        width = len(self.destinations) * classes
+        bounds = self.port_bounds
+
+        for rule_id in range(len(parsed) - 1, -1, -1):
+            entry = parsed[rule_id]
+            if entry is None:
+                continue
+            srcs, dsts, ranges = entry
+            spans = [(bisect.bisect_left(bounds, low), bisect.bisect_left(bounds, high + 1)) for low, high in ranges]
+            for src in srcs:
+                row = self._src_index[src] * width
+                for dst in dsts:
+                    base = row + self._dst_index[dst] * classes
+                    for first, last in spans:
+                        self._rule_ids[base + first:base + last] = array('i', [rule_id]) * (last - first)
+
+        for i, rule_id in enumerate(self._rule_ids):
+            if rule_id >= 0:
+                self._allow[i] = self.rules[rule_id]['action'] == 'allow'
+        for src, s in self._src_index.items():
+            if self.default_policies.get(src) == 'allow':
+                row = s * width
+                for i in range(row, row + width):
+                    if self._rule_ids[i] < 0:
+                        self._allow[i] = 1
+
+    def _cells(self, entry: Tuple[List[str], List[str], List[PortRange]]):
+        """Yield the table cell indices matched by a parsed rule."""
+        srcs, dsts, ranges = entry
+        classes = self._classes
+        width = len(self.destinations) * classes
+        bounds = self.port_bounds
+        spans = [(bisect.bisect_left(bounds, low), bisect.bisect_left(bounds, high + 1)) for low, high in ranges]
+        for src in srcs:
+            row = self._src_index[src] * width
+            for dst in dsts:
+                base = row + self._dst_index[dst] * classes
+                for first, last in spans:
+                    yield from range(base + first, base + last)
+
+    def _cell(self, src: str, dst: str, port: int) -> int:
+        if not 0 <= port <= MAX_PORT:
+            raise ValueError(f"invalid port {port}")
+        try:
+            s = self._src_index[src]
+            d = self._dst_index[dst]
+        except KeyError as e:
+            raise KeyError(f"unknown VLAN {e.args[0]!r}")
+        k = bisect.bisect_right(self.port_bounds, port) - 1
+        return (s * len(self.destinations) + d) * self._classes + k
+
+    def decide(self, src: str, dst: str, port: int) -> Tuple[str, Optional[int]]:
+        """Return (action, rule index) for traffic src -> dst on ``port``.
+
+        The rule index is None when the source VLAN's default policy applied.
+        """
+        i = self._cell(src, dst, port)
+        rule_id = self._rule_ids[i]
+        return ('allow' if self._allow[i] else 'deny'), (rule_id if rule_id >= 0 else None)
+
+    def is_allowed(self, src: str, dst: str, port: int) -> bool:
+        """Check whether src may reach dst on ``port``."""
+        return bool(self._allow[self._cell(src, dst, port)])
+
+    def port_decisions(self, src: str, dst: str) -> List[Tuple[PortRange, str, Optional[int]]]:
+        """Return merged ((low, high), action, rule index) spans for src -> dst."""
+        base = self._cell(src, dst, 0)
+        end = base + self._classes
+        spans = []
+        k = 0
+        # Runs of equal cells are grouped at C speed; only run boundaries reach Python
+        for (rule_id, allowed), run in groupby(zip(self._rule_ids[base:end], self._allow[base:end])):
+            first = k
+            k += sum(1 for _ in run)
+            spans.append(((self.port_bounds[first], self.port_bounds[k] - 1),
+                          'allow' if allowed else 'deny', rule_id if rule_id >= 0 else None))
+        return spans
+
+    def allowed_ports(self, src: str, dst: str, allowed: bool = True) -> List[PortRange]:
+        """Return the merged port ranges on which src may reach dst.
+
+        With ``allowed=False``, return the denied ranges instead. Runs are
+        located with bytes searches over the allow column, so the cost is
+        proportional to the number of ranges, not the number of port classes.
+        """
+        base = self._cell(src, dst, 0)
+        cells = bytes(self._allow[base:base + self._classes])
+        want, other = (b'\x01', b'\x00') if allowed else (b'\x00', b'\x01')
+        bounds = self.port_bounds
+        ranges: List[PortRange] = []
+        start = cells.find(want)
+        while start >= 0:
+            stop = cells.find(other, start)
+            if stop < 0:
+                stop = len(cells)
+            ranges.append((bounds[start], bounds[stop] - 1))
+            start = cells.find(want, stop)
+        return ranges
+
+    def decided_pairs(self) -> int:
+        """Count distinct (source, destination, deciding rule) triples."""
+        classes = self._classes
+        total = 0
+        for base in range(0, len(self._rule_ids), classes):
+            rule_ids = set(self._rule_ids[base:base + classes])
+            total += len(rule_ids) - (-1 in rule_ids)
+        return total
+
+    def effective_rules(self) -> Dict[int, List[Tuple[str, str, List[PortRange]]]]:
+        """Map each winning rule index to the concrete (src, dst, ports) it decides.
+
+        Wildcard rules are expanded to the VLAN pairs on which they are the
+        first match; rules that never win a cell are absent.
+        """
+        effective: Dict[int, List[Tuple[str, str, List[PortRange]]]] = {}
+        for src in self.sources:
+            for dst in self.destinations:
+                per_rule: Dict[int, List[PortRange]] = {}
+                for (low, high), _, rule_id in self.port_decisions(src, dst):
+                    if rule_id is not None:
+                        per_rule.setdefault(rule_id, []).append((low, high))
+                for rule_id, ranges in per_rule.items():
+                    effective.setdefault(rule_id, []).append((src, dst, ranges))
+        return dict(sorted(effective.items()))
+
+    def describe(self, rule_id: Optional[int], src: str) -> str:
+        """Describe a decision source for humans."""
+        if rule_id is None:
+            return f"default policy of '{src}' ({self.default_policies.get(src, 'deny')})"
+        rule = self.rules[rule_id]
+        ports = format_ports(parse_ports(rule.get('ports')))
+        return f"rule {rule_id + 1}: {rule['from']} -> {rule['to']} {rule['action']} (ports: {ports})"
+
+    def analyze(self) -> Tuple[List[Dict[str, Any]], float]:
+        """Find shadowed and redundant rules from the cells each rule covers.
+
+        Each rule's match set is a set of (source, destination, port-class)
+        cells. Walking rules in order while recording the first and second
+        matching rule per cell answers every question without comparing rule
+        pairs; a second pass revisits only the cells each rule won. Cost is
+        linear in the total number of matched cells, not the table size:
+
+        - ``shadowed``: every cell is decided earlier, by at least one rule
+          with the opposite action
+        - ``partially_shadowed``: some cells are decided earlier with the
+          opposite action, but the rule still decides others
+        - ``redundant``: removing the rule changes no decision because an
+          earlier or later rule with the same action covers it
+        - ``default``: the rule only restates the source VLAN's default policy
+
+        Returns (findings, elapsed seconds).
+        """
+        started = time.perf_counter()
+        size = len(self._rule_ids)
+        first = array('i', [-1]) * size
+        second = array('i', [-1]) * size
+        actions = [rule.get('action') if isinstance(rule, dict) else None for rule in self.rules]
+        stats: Dict[int, Tuple[int, set, set]] = {}
+        owned: Dict[int, List[int]] = {}
+
+        for rule_id, entry in enumerate(self._parsed):
+            if entry is None:
+                continue
+            won: List[int] = []
+            conflicts = set()
+            same = set()
+            action = actions[rule_id]
+            for c in self._cells(entry):
+                owner = first[c]
+                if owner < 0:
+                    first[c] = rule_id
+                    won.append(c)
+                elif owner != rule_id:
+                    if second[c] < 0:
+                        second[c] = rule_id
+                    if actions[owner] != action:
+                        conflicts.add(owner)
+                    else:
+                        same.add(owner)
+            stats[rule_id] = (len(won), conflicts, same)
+            owned[rule_id] = won
+
+        # A winning rule is needed if removing it flips at least one of its cells
+        needed = set()
+        fallbacks: Dict[int, set] = {}
+        width = len(self.destinations) * self._classes
+        defaults = [self.default_policies.get(src, 'deny') for src in self.sources]
+        for owner, cells in owned.items():
+            for c in cells:
+                fallback = second[c]
+                if fallback >= 0:
+                    fallback_action = actions[fallback]
+                    fallbacks.setdefault(owner, set()).add(fallback)
+                else:
+                    fallback_action = defaults[c // width]
+                if fallback_action != actions[owner]:
+                    needed.add(owner)
+                    break
+
+        findings = []
+        for rule_id, (won, conflicts, same) in stats.items():
+            if won == 0 and conflicts:
+                kind, by = 'shadowed', conflicts
+            elif won == 0:
+                kind, by = 'redundant', same
+            elif conflicts:
+                kind, by = 'partially_shadowed', conflicts
+            elif rule_id not in needed:
+                later = fallbacks.get(rule_id, set())
+                if later and all(stats[other][0] == 0 for other in later):
+                    # The later rule never decides anything; report it instead
+                    continue
+                kind, by = ('redundant', later) if later else ('default', set())
+            else:
+                continue
+            findings.append({'kind': kind, 'rule': rule_id, 'by': sorted(by)})
+
+        return findings, time.perf_counter() - started
+
+    def format_finding(self, finding: Dict[str, Any]) -> str:
+        """Render an analysis finding as a one-line message."""
+        rule_id = finding['rule']
+        label = self.rule_label(rule_id)
+        by = ', '.join(self.rule_label(other) for other in finding['by'][:3])
+        if len(finding['by']) > 3:
+            by += f" and {len(finding['by']) - 3} more"
+
+        if finding['kind'] == 'shadowed':
+            return f"Access {label} is fully shadowed by {by} and never takes effect"
+        if finding['kind'] == 'partially_shadowed':
+            return f"Access {label} is partially shadowed by {by}"
+        if finding['kind'] == 'redundant':
+            return f"Access {label} is redundant" + (f" with {by}" if by else "")
+        return f"Access {label} only restates the default policy of its source VLAN"
+
+    def rule_label(self, rule_id: int) -> str:
+        """Short human label for a rule, numbered from 1."""
+        rule = self.rules[rule_id]
+        ports = rule.get('ports')
+        suffix = f" ports {format_ports(parse_ports(ports))}" if ports else ""
+        return f"rule {rule_id + 1} ({rule.get('from')} -> {rule.get('to')} {rule.get('action')}{suffix})"
+
+
+def load_matrix(contracts_dir: Path) -> AccessMatrix:
+    """Load vlans.yaml and access-matrix.yaml through the shared ContractStore and compile them."""
+    from contract_store import ContractStore
+
+    store = ContractStore.shared(contracts_dir)
+    vlans = store.load('vlans.yaml').get('vlans', {})
+    rules = store.load('access-matrix.yaml').get('access_matrix', [])
+    return AccessMatrix.compile(rules, vlans)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Answer a reachability query from the compiled access matrix."""
+    parser = argparse.ArgumentParser(description="Query the compiled access matrix")
+    parser.add_argument('source', nargs='?', help="Source VLAN name")
+    parser.add_argument('destination', nargs='?', help="Destination VLAN name or 'internet'")
+    parser.add_argument('port', nargs='?', type=int, help="Destination port (omit to list all port ranges)")
+    parser.add_argument('--analyze', action='store_true', help="Report shadowed and redundant rules")
+    parser.add_argument('--contracts-dir', type=Path,
+                        default=Path(__file__).parent.parent.parent / 'infra' / 'contracts',
+                        help="Directory containing the contract files")
+    args = parser.parse_args(argv)
+
+    if not args.analyze and not (args.source and args.destination):
+        parser.error("source and destination are required unless --analyze is given")
+
+    matrix = load_matrix(args.contracts_dir)
+
+    if args.analyze:
+        findings, elapsed = matrix.analyze()
+        for finding in findings:
+            print(f"[{finding['kind'].upper()}] {matrix.format_finding(finding)}")
+        print(f"Analyzed {len(matrix.rules)} rules in {elapsed * 1000:.1f} ms: {len(findings)} finding(s)")
+        return 1 if any(finding['kind'] == 'shadowed' for finding in findings) else 0
+
+    try:
+        if args.port is None:
+            spans = matrix.port_decisions(args.source, args.destination)
+            for (low, high), action, rule_id in spans:
+                print(f"{args.source} -> {args.destination} ports {format_ports([(low, high)])}: "
+                      f"{action.upper()} ({matrix.describe(rule_id, args.source)})")
+            return 0 if any(action == 'allow' for _, action, _ in spans) else 1
+
+        action, rule_id = matrix.decide(args.source, args.destination, args.port)
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0]}")
+        return 2
+
+    print(f"{args.source} -> {args.destination} port {args.port}: "
+          f"{action.upper()} ({matrix.describe(rule_id, args.source)})")
+    return 0 if action == 'allow' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Ordered ACL compiler for the ER605 firewall.
+Turns the compiled access matrix into a short first-match ACL list over
+VLAN CIDRs, merging sources, destinations and ports wherever the
+semantics allow it.
+
+The router evaluates ACL entries top to bottom and permits traffic that
+matches none of them, so VLANs whose default policy differs from that
+end with an explicit catch-all entry.
+"""
+
+from collections import Counter
+from typing import Dict, List, Tuple, Any
+
+from access_matrix import INTERNET, MAX_PORT, AccessMatrix, PortRange
+
+
+ROUTER_DEFAULT = 'allow'
+
+ALL_PORTS: Tuple[PortRange, ...] = ((0, MAX_PORT),)
+
+# Entries are emitted in tiers; only the relative order of tiers matters:
+# 0: exceptions to a VLAN's default towards a specific VLAN
+# 1: entries that shield VLANs from the following "any destination" entry
+# 2: exceptions towards "any destination" (the internet)
+# 3: catch-all entries restating a default the router does not apply
+
+
+def merge_ranges(ranges) -> Tuple[PortRange, ...]:
+    """Sort and merge overlapping or adjacent port ranges."""
+    merged: List[PortRange] = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return tuple(merged)
+
+
+def subtract_ranges(ranges: Tuple[PortRange, ...], remove: Tuple[PortRange, ...]) -> Tuple[PortRange, ...]:
+    """Return the parts of ``ranges`` not covered by ``remove``."""
+    result = []
+    for low, high in ranges:
+        for cut_low, cut_high in remove:
+            if cut_high < low or cut_low > high:
+                continue
+            if cut_low > low:
+                result.append((low, cut_low - 1))
+            low = cut_high + 1
+            if low > high:
+                break
+        if low <= high:
+            result.append((low, high))
+    return tuple(result)
+
+
+class ACLCompiler:
+    """Compile an ``AccessMatrix`` into a minimal ordered ACL list.
+
+    For each source VLAN only the flows that differ from its default
+    policy are emitted (rules restating the default are dropped). When
+    the source may reach the internet, one "any destination" entry is used
+    and VLANs that must not be reached that way are shielded by earlier
+    entries. Entries are then merged across sources, destinations and
+    ports, and destination CIDRs are collapsed.
+    """
+
+    def __init__(self, matrix: AccessMatrix, vlan_cidrs: Dict[str, List[str]], router_default: str = ROUTER_DEFAULT):
+        self.matrix = matrix
+        self.vlan_cidrs = vlan_cidrs
+        self.router_default = router_default
+
+    def exceptions(self, src: str, dst: str) -> Tuple[PortRange, ...]:
+        """Port ranges on which src -> dst differs from the source VLAN's default."""
+        default = self.matrix.default_policies.get(src, 'deny')
+        return tuple(self.matrix.allowed_ports(src, dst, allowed=default != 'allow'))
+
+    def compile(self) -> List[Dict[str, Any]]:
+        """Return ordered ACL entries.
+
+        Each entry has ``action``, ``sources`` and ``destinations`` (VLAN
+        names, ``internet`` meaning any destination) and merged ``ports``.
+        """
+        # (tier, action, ports, source) -> destinations
+        cells: Dict[Tuple[int, str, Tuple[PortRange, ...], str], List[str]] = {}
+        vlan_dsts = [dst for dst in self.matrix.destinations if dst != INTERNET and dst in self.vlan_cidrs]
+        shields: Dict[str, Tuple[str, Tuple[PortRange, ...], List[str]]] = {}
+
+        for src in self.matrix.sources:
+            if src not in self.vlan_cidrs:
+                continue
+            default = self.matrix.default_policies.get(src, 'deny')
+            other = 'allow' if default == 'deny' else 'deny'
+            internet = self.exceptions(src, INTERNET) if INTERNET in self.matrix.destinations else ()
+
+            shielded = []
+            for dst in vlan_dsts:
+                if dst == src:
+                    # Intra-VLAN traffic is switched, never routed through the ACL
+                    continue
+                ports = self.exceptions(src, dst)
+                if ports == internet:
+                    continue
+                if ports:
+                    cells.setdefault((0, other, ports, src), []).append(dst)
+                if subtract_ranges(internet, ports):
+                    shielded.append(dst)
+            if shielded:
+                shields[src] = (default, internet, shielded)
+
+            if internet:
+                cells.setdefault((2, other, internet, src), []).append(INTERNET)
+            if default != self.router_default and internet != ALL_PORTS:
+                cells.setdefault((3, default, ALL_PORTS, src), []).append(INTERNET)
+
+        # A source's own VLAN is a don't-care; include it in a shield entry
+        # when that lets VLANs shielding "everything else" share one entry
+        widened = {src: (default, internet, tuple(dst for dst in vlan_dsts if dst in shielded or dst == src))
+                   for src, (default, internet, shielded) in shields.items()}
+        counts = Counter(widened.values())
+        for src, (default, internet, shielded) in shields.items():
+            dsts = widened[src][2] if counts[widened[src]] > 1 else shielded
+            cells[(1, default, internet, src)] = list(dsts)
+
+        # Merge sources that share tier, action, ports and destinations
+        by_destinations: Dict[Tuple, List[str]] = {}
+        for (tier, action, ports, src), dsts in cells.items():
+            by_destinations.setdefault((tier, action, ports, tuple(dsts)), []).append(src)
+
+        # Then merge ports of entries that share tier, action, sources and destinations
+        by_flows: Dict[Tuple, List[PortRange]] = {}
+        for (tier, action, ports, dsts), srcs in by_destinations.items():
+            by_flows.setdefault((tier, action, tuple(srcs), dsts), []).extend(ports)
+
+        entries = []
+        for (tier, action, srcs, dsts), ports in sorted(by_flows.items(), key=lambda item: item[0][0]):
+            entries.append({
+                'tier': tier,
+                'action': action,
+                'sources': list(srcs),
+                'destinations': list(dsts),
+                'ports': list(merge_ranges(ports)),
+            })
+        return entries
+
+    def expanded_count(self) -> int:
+        """Number of ACL entries in the naive expansion: one per VLAN pair and winning rule."""
+        return self.matrix.decided_pairs()
+
+    def evaluate(self, entries: List[Dict[str, Any]], src: str, dst: str, port: int) -> str:
+        """First-match decision of ``entries`` for src -> dst on ``port``."""
+        for entry in entries:
+            if src not in entry['sources']:
+                continue
+            if INTERNET not in entry['destinations'] and dst not in entry['destinations']:
+                continue
+            if any(low <= port <= high for low, high in entry['ports']):
+                return entry['action']
+        return self.router_default
+
+    def verify(self, entries: List[Dict[str, Any]]) -> List[Tuple[str, str, PortRange, str]]:
+        """Compare ``entries`` with the matrix on every routed port class.
+
+        Returns (src, dst, port range, matrix action) for each disagreement.
+        """
+        mismatches = []
+        for src in self.matrix.sources:
+            if src not in self.vlan_cidrs:
+                continue
+            for dst in self.matrix.destinations:
+                if dst == src or (dst != INTERNET and dst not in self.vlan_cidrs):
+                    continue
+                for span, action, _ in self.matrix.port_decisions(src, dst):
+                    bounds = {span[0], span[1]}
+                    for entry in entries:
+                        for low, high in entry['ports']:
+                            for edge in (low, high, low - 1, high + 1):
+                                if span[0] <= edge <= span[1]:
+                                    bounds.add(edge)
+                    if any(self.evaluate(entries, src, dst, port) != action for port in bounds):
+                        mismatches.append((src, dst, span, action))
+        return mismatches
+
+
+def compile_acl(matrix: AccessMatrix, vlan_cidrs: Dict[str, List[str]],
+                router_default: str = ROUTER_DEFAULT) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Compile an ordered ACL list and return it with before/after entry counts."""
+    compiler = ACLCompiler(matrix, vlan_cidrs, router_default)
+    entries = compiler.compile()
+    return entries, {'before': compiler.expanded_count(), 'after': len(entries)}
+
+
+def verify_acl(matrix: AccessMatrix, vlan_cidrs: Dict[str, List[str]], entries: List[Dict[str, Any]],
+               router_default: str = ROUTER_DEFAULT) -> List[Tuple[str, str, PortRange, str]]:
+    """Check that ``entries`` implement ``matrix``; returns disagreements."""
+    return ACLCompiler(matrix, vlan_cidrs, router_default).verify(entries)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Round-trip check for the ER605 ACL compiler.
+Compiles an access matrix to an ordered ACL, replays it against every port
+class of the matrix (``acl_compiler.verify``), then renders it through the
+network generator to FIREWALL_RULES.md form, parses that back and compares
+it address by address with the matrix (``policy_equivalence``). Runs on the
+real contracts and on seeded random matrices whose VLANs carry several
+networks (a second IPv4 prefix, an IPv6 prefix), so a lossy VLAN to CIDR
+mapping shows up as a disagreement.
+
+Usage:
+    acl_roundtrip.py
+    acl_roundtrip.py --random 500 --seed 7
+"""
+
+import argparse
+import ipaddress
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+from access_matrix import AccessMatrix, format_ports
+from acl_compiler import compile_acl, verify_acl
+from contract_store import ContractStore
+from policy_equivalence import (GENERATOR_DIR, REPO_ROOT, EquivalenceChecker, _load_contract, contract_cidrs,
+                                format_finding, parse_firewall_rules)
+
+
+DEFAULT_RANDOM = 100
+
+# Ports random rules pick from; neighbours exercise range merging
+RANDOM_PORTS = [22, 53, 80, 81, 443, 444, 6443, 8080]
+
+
+def roundtrip(contracts: Dict[str, Any]) -> List[str]:
+    """Disagreements between ``contracts``' access matrix and its compiled, rendered ACL."""
+    if str(GENERATOR_DIR) not in sys.path:
+        sys.path.insert(0, str(GENERATOR_DIR))
+    from generate_network_config import NetworkConfigGenerator
+
+    vlans_data = contracts.get('vlans', {})
+    vlan_cidrs, unassigned = contract_cidrs(vlans_data, contracts.get('ipam', {}))
+    matrix = AccessMatrix.compile(contracts.get('access', {}).get('access_matrix') or [],
+                                  vlans_data.get('vlans') or {})
+
+    problems = []
+    entries, _ = compile_acl(matrix, vlan_cidrs)
+    for src, dst, span, action in verify_acl(matrix, vlan_cidrs, entries):
+        problems.append(f"ACL: {src} -> {dst} ports {format_ports([span])}: matrix says {action}")
+
+    generator = NetworkConfigGenerator(GENERATOR_DIR, ContractStore(GENERATOR_DIR, cache_dir=None))
+    rendered = generator.generate_firewall_rules(contracts).content
+    checker = EquivalenceChecker(matrix, vlan_cidrs, unassigned)
+    problems += [format_finding(finding) for finding in checker.check_firewall(parse_firewall_rules(rendered))]
+    return problems
+
+
+def random_contracts(rng: random.Random, vlan_count: int, rule_count: int) -> Dict[str, Any]:
+    """A random vlans/ipam/access mapping where some VLANs carry a second IPv4 and/or an IPv6 network."""
+    names = [f"vlan{index + 1}" for index in range(vlan_count)]
+    vlans = {name: {'id': index + 1, 'default_policy': rng.choice(['deny', 'deny', 'allow'])}
+             for index, name in enumerate(names)}
+
+    networks: Dict[str, Any] = {}
+    for index, name in enumerate(names):
+        vlan_id = index + 1
+        networks[f"{name}_v4"] = {'vlan_id': vlan_id, 'cidr': f"10.{index}.0.0/24"}
+        if rng.random() < 0.3:
+            networks[f"{name}_v4b"] = {'vlan_id': vlan_id, 'cidr': f"10.{index}.128.0/25"}
+        if rng.random() < 0.3:
+            networks[f"{name}_v6"] = {'vlan_id': vlan_id, 'cidr': str(ipaddress.ip_network(f"fd00:{index:x}::/64"))}
+
+    rules = []
+    for _ in range(rule_count):
+        rule = {
+            'from': rng.choice(names + ['*']),
+            'to': rng.choice(names + ['*', 'internet']),
+            'action': rng.choice(['allow', 'deny']),
+        }
+        if rng.random() < 0.4:
+            low = rng.choice(RANDOM_PORTS)
+            rule['ports'] = [low] if rng.random() < 0.5 else [f"{low}-{low + rng.randrange(1, 100)}"]
+        rules.append(rule)
+    return {'vlans': {'vlans': vlans}, 'ipam': {'networks': networks}, 'access': {'access_matrix': rules}}
+
+
+def dual_stack_case(contracts: Dict[str, Any]) -> Dict[str, Any]:
+    """``contracts`` with an extra IPv4 and IPv6 network on the first VLAN that has one."""
+    vlans = (contracts.get('vlans', {}).get('vlans') or {})
+    networks = dict(contracts.get('ipam', {}).get('networks') or {})
+    vlan_id = next((config['id'] for config in vlans.values() if config and 'id' in config), None)
+    if vlan_id is None:
+        return contracts
+    networks['roundtrip_v4'] = {'vlan_id': vlan_id, 'cidr': '192.168.250.0/24'}
+    networks['roundtrip_v6'] = {'vlan_id': vlan_id, 'cidr': 'fd00:ffff::/64'}
+    return dict(contracts, ipam=dict(contracts.get('ipam', {}), networks=networks))
+
+
+def check(contracts_dir: Path, count: int = DEFAULT_RANDOM, seed: int = 0,
+          store: Optional[ContractStore] = None) -> Tuple[List[Tuple[str, List[str]]], int, float]:
+    """Round-trip the contracts, a dual-stack variant of them and ``count`` random matrices.
+
+    Returns the failing cases as (case, problems), the number of cases
+    checked and the elapsed seconds.
+    """
+    started = time.perf_counter()
+    store = store or ContractStore.shared(contracts_dir)
+    contracts = {key: _load_contract(store, filename)
+                 for key, filename in (('vlans', 'vlans.yaml'), ('ipam', 'ipam.yaml'), ('access', 'access-matrix.yaml'))}
+
+    cases = [('contracts', contracts), ('contracts + dual-stack VLAN', dual_stack_case(contracts))]
+    rng = random.Random(seed)
+    for index in range(count):
+        cases.append((f"random #{index} (seed {seed})",
+                      random_contracts(rng, rng.randrange(2, 9), rng.randrange(1, 25))))
+
+    failures = []
+    for name, case in cases:
+        problems = roundtrip(case)
+        if problems:
+            failures.append((name, problems))
+    return failures, len(cases), time.perf_counter() - started
+
+
+def report(failures: List[Tuple[str, List[str]]], cases: int, elapsed: float) -> bool:
+    """Print the outcome of ``check``; returns True when every case round-tripped."""
+    for name, problems in failures:
+        print(f"[ERROR] ACL round-trip failed for {name}:")
+        for problem in problems[:10]:
+            print(f"  - {problem}")
+        if len(problems) > 10:
+            print(f"  - ... and {len(problems) - 10} more")
+    if failures:
+        print(f"[ERROR] {len(failures)} of {cases} ACL round-trip case(s) failed ({elapsed * 1000:.1f} ms)")
+        return False
+    print(f"[SUCCESS] Compiled ACL matches the access matrix in {cases} case(s) ({elapsed * 1000:.1f} ms)")
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Round-trip the ACL compiler on the contracts and random matrices."""
+    parser = argparse.ArgumentParser(description="Check that compiled ACLs implement the access matrix")
+    parser.add_argument('--contracts-dir', type=Path,
+                        default=REPO_ROOT / 'infra' / 'contracts',
+                        help="Directory containing the contract files")
+    parser.add_argument('--random', type=int, default=DEFAULT_RANDOM, help="Number of random matrices")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the random matrices")
+    args = parser.parse_args(argv)
+
+    return 0 if report(*check(args.contracts_dir.resolve(), args.random, args.seed)) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Ansible inventory view for sharded host and group vars.
+Reads a YAML inventory (infra/ansible/inventory/hosts.yml), resolves every
+host's groups including parent groups, and matches hosts to IPAM
+reservations by hostname, falling back to ``ansible_host``.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from contract_model import ReservationTable, normalize_name, parse_ip
+
+
+class Inventory:
+    """Hosts and groups of a YAML inventory.
+
+    ``groups`` maps every group to its hosts, including hosts of child
+    groups; ``host_groups`` is the reverse. The implicit ``all`` group is
+    left out of both, since its vars apply to every host anyway.
+    """
+
+    __slots__ = ('hosts', 'groups', 'host_groups')
+
+    def __init__(self):
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+        self.groups: Dict[str, Set[str]] = {}
+        self.host_groups: Dict[str, Set[str]] = {}
+
+    @classmethod
+    def from_data(cls, data: Optional[Dict[str, Any]]) -> 'Inventory':
+        inventory = cls()
+        children: Dict[str, Set[str]] = {}
+        direct: Dict[str, Set[str]] = {}
+
+        def walk(name: str, group: Optional[Dict[str, Any]]):
+            group = group or {}
+            direct.setdefault(name, set())
+            children.setdefault(name, set())
+            for host, host_vars in (group.get('hosts') or {}).items():
+                host = str(host)
+                direct[name].add(host)
+                inventory.hosts.setdefault(host, {}).update(host_vars or {})
+            for child, child_group in (group.get('children') or {}).items():
+                children[name].add(child)
+                walk(child, child_group)
+
+        for name, group in (data or {}).items():
+            walk(name, group)
+
+        def members(name: str, seen: Set[str]) -> Set[str]:
+            hosts = set(direct.get(name, ()))
+            for child in children.get(name, ()):
+                if child not in seen:
+                    seen.add(child)
+                    hosts |= members(child, seen)
+            return hosts
+
+        for name in direct:
+            if name == 'all':
+                continue
+            hosts = members(name, {name})
+            inventory.groups[name] = hosts
+            for host in hosts:
+                inventory.host_groups.setdefault(host, set()).add(name)
+        return inventory
+
+    @classmethod
+    def load(cls, path: Path, store=None) -> 'Inventory':
+        """Load ``path``; a missing inventory is empty."""
+        if store is None:
+            from contract_store import ContractStore
+            store = ContractStore.shared(path.parent)
+        if not store.exists(path.name):
+            return cls()
+        return cls.from_data(store.load(path.name))
+
+    def match_reservations(self, table: ReservationTable) -> Dict[str, List[int]]:
+        """Map each host to the reservation rows that belong to it.
+
+        A host matches reservations whose hostname is the host name or
+        starts with it as the first label; hosts without such a reservation
+        match by their ``ansible_host`` address or name.
+        """
+        by_name: Dict[str, List[int]] = {}
+        for row, hostname in enumerate(table.hostnames):
+            if not hostname:
+                continue
+            fqdn = normalize_name(hostname)
+            by_name.setdefault(fqdn, []).append(row)
+            short = fqdn.split('.', 1)[0]
+            if short != fqdn:
+                by_name.setdefault(short, []).append(row)
+
+        matches: Dict[str, List[int]] = {}
+        for host, host_vars in self.hosts.items():
+            rows = by_name.get(normalize_name(host))
+            address = host_vars.get('ansible_host')
+            if not rows and address:
+                version, value = parse_ip(str(address))
+                if version:
+                    rows = table.rows_for_ip(version, value)
+                else:
+                    rows = by_name.get(normalize_name(address))
+            if rows:
+                matches[host] = sorted(set(rows))
+        return matches
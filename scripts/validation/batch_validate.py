@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Batch validation of many contract directories (sites x environments).
+Discovers every directory holding contracts under the given roots,
+validates them on a process pool and checks across sites for overlapping
+network CIDRs and VLAN IDs that mean different VLANs. Prints one merged
+report with per-site timings.
+
+Workers are forked from a process that already imported and compiled the
+validator, so they share its code objects instead of starting a fresh
+interpreter per site. Each site keeps its own stage result cache, and all
+of them share the on-disk parsed-contract cache.
+
+Usage:
+    batch_validate.py sites/
+    batch_validate.py sites/home sites/office -j 4
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+from contract_model import ipam_model, vlan_table
+from contract_store import ContractStore
+from ipam_index import IPAMIndex
+from validate_contracts import STAGES, ContractValidator
+from validation_cache import ValidationCache
+
+
+# A directory holding any of these is a contract directory
+MARKER_FILES = ('vlans.yaml', 'ipam.yaml')
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / '.cache' / 'validate_contracts'
+
+# Result of validating one site; only picklable values, since it crosses the pool
+SiteResult = Dict[str, Any]
+
+
+def discover(roots: List[Path]) -> List[Tuple[str, Path]]:
+    """Find contract directories under ``roots`` as (site label, path).
+
+    A site is labelled by its path relative to its root, e.g.
+    ``home/production``; a root that is itself a contract directory is
+    labelled by its own name.
+    """
+    found: Dict[Path, str] = {}
+    for root in roots:
+        root = Path(root).resolve()
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+            if not any(name in filenames for name in MARKER_FILES):
+                continue
+            path = Path(dirpath)
+            relative = path.relative_to(root)
+            found.setdefault(path, relative.as_posix() if relative.parts else root.name)
+    return sorted(((label, path) for path, label in found.items()), key=lambda item: item[0])
+
+
+def cache_file(contracts_dir: Path, cache_dir: Path) -> Path:
+    """Stage result cache of one contract directory."""
+    key = hashlib.sha256(str(contracts_dir.resolve()).encode('utf-8')).hexdigest()[:16]
+    return cache_dir / f"{key}.json"
+
+
+def validate_site(label: str, contracts_dir: str, cache_dir: Optional[str]) -> SiteResult:
+    """Validate one contract directory and summarize it for the cross-site checks.
+
+    Runs in pool workers; the validator's own progress output is discarded.
+    """
+    path = Path(contracts_dir)
+    cache = ValidationCache(cache_file(path, Path(cache_dir))) if cache_dir else None
+    validator = ContractValidator(path)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        validator.validate_all(cache)
+    elapsed = time.perf_counter() - started
+
+    store = ContractStore.shared(path)
+    ipam_data = _load(store, 'ipam.yaml')
+    ipam = ipam_model(ipam_data)
+    return {
+        'label': label,
+        'path': contracts_dir,
+        'site': ipam.site,
+        'ms': round(elapsed * 1000, 3),
+        'cached': sum(1 for stage in validator.stages if stage['cached'] and stage['stage'] != 'load'),
+        'errors': list(validator.errors),
+        'warnings': list(validator.warnings),
+        'networks': [(name, network.version, network.start, network.prefixlen)
+                     for name, network in ipam.networks.items()],
+        'vlans': {name: vlan.id for name, vlan in vlan_table(_load(store, 'vlans.yaml')).items()},
+    }
+
+
+def _load(store: ContractStore, filename: str) -> Dict[str, Any]:
+    """Parsed contract, or {} if it is missing or invalid (the site validation reports why)."""
+    try:
+        data = store.load(filename)
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def cross_site_checks(results: List[SiteResult]) -> Tuple[List[str], List[str]]:
+    """Return (errors, warnings) that only show when sites are compared.
+
+    Overlapping CIDRs in different sites are errors, since the sites cannot
+    be routed to each other. A VLAN ID used for differently named VLANs is a
+    warning: harmless while sites stay separate L2 domains, wrong once they
+    are trunked together.
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    index = IPAMIndex()
+    for result in results:
+        for name, version, start, prefixlen in result['networks']:
+            bits = 32 if version == 4 else 128
+            end = start | ((1 << (bits - prefixlen)) - 1)
+            index.networks[f"{result['label']}:{name}"] = (version, start, end, prefixlen)
+    index.build()
+    for outer, inner in index.find_overlaps():
+        outer_site, outer_name = outer.split(':', 1)
+        inner_site, inner_name = inner.split(':', 1)
+        if outer_site != inner_site:
+            errors.append(f"Network {inner_site}:{inner_name} ({index.cidr(inner)}) overlaps "
+                          f"{outer_site}:{outer_name} ({index.cidr(outer)})")
+
+    by_id: Dict[Any, Dict[str, List[str]]] = {}
+    for result in results:
+        for name, vlan_id in result['vlans'].items():
+            by_id.setdefault(vlan_id, {}).setdefault(name, []).append(result['label'])
+    for vlan_id, names in sorted(by_id.items(), key=lambda item: str(item[0])):
+        if len(names) > 1:
+            uses = '; '.join(f"'{name}' in {', '.join(labels)}" for name, labels in sorted(names.items()))
+            warnings.append(f"VLAN ID {vlan_id} is reused for different VLANs: {uses}")
+
+    return errors, warnings
+
+
+def _pool_context():
+    """Fork where available, so workers inherit the already imported validator."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def validate_batch(sites: List[Tuple[str, Path]], jobs: Optional[int] = None,
+                   cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> Tuple[List[SiteResult], List[str], List[str]]:
+    """Validate ``sites`` and run the cross-site checks.
+
+    Returns per-site results in ``sites`` order plus the cross-site errors
+    and warnings. A single site, or ``jobs=1``, runs inline.
+    """
+    cache = str(cache_dir) if cache_dir else None
+    labels = [label for label, _ in sites]
+    paths = [str(path) for _, path in sites]
+    workers = jobs if jobs is not None else min(len(sites), os.cpu_count() or 1)
+
+    if workers <= 1 or len(sites) <= 1:
+        results = [validate_site(label, path, cache) for label, path in zip(labels, paths)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+            results = list(pool.map(validate_site, labels, paths, [cache] * len(sites)))
+
+    errors, warnings = cross_site_checks(results)
+    return results, errors, warnings
+
+
+def print_batch_report(results: List[SiteResult], errors: List[str], warnings: List[str], elapsed: float):
+    """Print per-site timings and every finding, prefixed with its site."""
+    width = max([len(result['label']) for result in results] + [4])
+    print("\n" + "="*60)
+    print(f"{'Site':<{width}}  {'ipam site':<12} {'ms':>9} {'cached':>7} {'errors':>7} {'warnings':>9}")
+    for result in results:
+        print(f"{result['label']:<{width}}  {str(result['site'] or '-'):<12} {result['ms']:>9.1f} "
+              f"{result['cached']:>5}/{len(STAGES)} {len(result['errors']):>7} {len(result['warnings']):>9}")
+    total = sum(result['ms'] for result in results)
+    print(f"{len(results)} site(s) in {elapsed * 1000:.1f} ms wall, {total:.1f} ms summed")
+
+    all_errors = [f"[{result['label']}] {error}" for result in results for error in result['errors']]
+    all_errors += [f"[cross-site] {error}" for error in errors]
+    all_warnings = [f"[{result['label']}] {warning}" for result in results for warning in result['warnings']]
+    all_warnings += [f"[cross-site] {warning}" for warning in warnings]
+
+    print("="*60)
+    if all_errors:
+        print(f"[ERROR] Found {len(all_errors)} error(s):")
+        for error in all_errors:
+            print(f"  - {error}")
+
+    if all_warnings:
+        print(f"\n[WARNING] Found {len(all_warnings)} warning(s):")
+        for warning in all_warnings:
+            print(f"  - {warning}")
+
+    if not all_errors and not all_warnings:
+        print("[SUCCESS] All contracts are valid!")
+
+    print("="*60 + "\n")
+
+
+def run_batch(roots: List[Path], jobs: Optional[int] = None, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> bool:
+    """Discover, validate and report; returns True when no site or cross-site check failed."""
+    sites = discover(roots)
+    if not sites:
+        print(f"Error: No contract directories found under {', '.join(str(root) for root in roots)}")
+        return False
+
+    started = time.perf_counter()
+    print(f"Validating {len(sites)} contract director{'y' if len(sites) == 1 else 'ies'}...")
+    results, errors, warnings = validate_batch(sites, jobs, cache_dir)
+    print_batch_report(results, errors, warnings, time.perf_counter() - started)
+    return not errors and not any(result['errors'] for result in results)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Validate many contract directories and compare them")
+    parser.add_argument('roots', nargs='+', type=Path, help="Directories to search for contract directories")
+    parser.add_argument('-j', '--jobs', type=int, help="Validator processes (default: one per site, up to CPUs)")
+    parser.add_argument('--no-cache', action='store_true', help="Revalidate every contract")
+    args = parser.parse_args()
+
+    success = run_batch(args.roots, args.jobs, None if args.no_cache else DEFAULT_CACHE_DIR)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Argument types shared by the contract tools' command lines.
+"""
+
+import argparse
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
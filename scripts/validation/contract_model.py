@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Compact typed model of the homelab contracts.
+Built once per parsed contract: VLAN and network records use __slots__,
+names are interned, and addresses are kept as integers in array-backed
+columns so lookups never re-parse strings.
+"""
+
+import ipaddress
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+
+INVALID = -1
+
+# Models are memoized per raw contract object; the store hands out one
+# object per file version, so this bounds memory while edits come and go.
+_MODEL_CACHE_SIZE = 16
+_models: 'OrderedDict[Tuple[str, int], Tuple[Any, Any]]' = OrderedDict()
+
+
+def parse_ip(value: Any) -> Tuple[int, int]:
+    """Parse an address into (version, integer), or (0, INVALID) if invalid.
+
+    Plain dotted quads take a fast path; anything else goes through
+    ``ipaddress`` so edge cases (IPv6, leading zeros) follow stdlib rules.
+    """
+    if isinstance(value, str):
+        parts = value.split('.')
+        if len(parts) == 4:
+            result = 0
+            for part in parts:
+                if not part.isdigit() or (len(part) > 1 and part[0] == '0'):
+                    break
+                octet = int(part)
+                if octet > 255:
+                    break
+                result = (result << 8) | octet
+            else:
+                return 4, result
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return 0, INVALID
+    return address.version, int(address)
+
+
+def parse_range(value: Any) -> Tuple[int, int, int]:
+    """Parse a CIDR, a single address or ``first-last`` into (version, first, last).
+
+    Returns (0, INVALID, INVALID) if invalid, including ranges that mix
+    families or run backwards.
+    """
+    text = str(value).strip()
+    if '/' in text:
+        try:
+            network = ipaddress.ip_network(text, strict=False)
+        except ValueError:
+            return 0, INVALID, INVALID
+        return network.version, int(network.network_address), int(network.broadcast_address)
+    first_text, _, last_text = text.partition('-')
+    version, first = parse_ip(first_text.strip())
+    last_version, last = parse_ip(last_text.strip()) if last_text else (version, first)
+    if first == INVALID or last == INVALID or version != last_version or last < first:
+        return 0, INVALID, INVALID
+    return version, first, last
+
+
+def format_ip(version: int, value: int) -> str:
+    """Format an integer address back to its canonical string."""
+    if version == 4:
+        return f"{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
+    return str(ipaddress.IPv6Address(value))
+
+
+def intern_name(value: Any) -> Any:
+    """Intern string names so repeated VLAN/zone/type names share storage."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def normalize_name(name: Any) -> str:
+    """Lowercase a DNS name and drop surrounding whitespace and the trailing dot."""
+    return str(name).strip().lower().rstrip('.')
+
+
+def qualify_name(name: Any, zone: str) -> str:
+    """Return the normalized FQDN of record ``name`` in normalized ``zone``.
+
+    ``@`` and empty names mean the zone apex; names already inside the zone
+    are not suffixed again, so ``nas`` and ``nas.home.internal`` agree. A
+    name with a trailing dot is absolute and never suffixed, even when it
+    lies outside the zone.
+    """
+    if isinstance(name, str) and '.' not in name and name.islower() and name != '@':
+        return f"{name}.{zone}"
+    text = str(name).strip()
+    if text.endswith('.'):
+        return normalize_name(text)
+    fqdn = normalize_name(text)
+    if fqdn in ('', '@'):
+        return zone
+    if fqdn == zone or fqdn.endswith('.' + zone):
+        return fqdn
+    return f"{fqdn}.{zone}"
+
+
+class IntColumn:
+    """Signed 64-bit array column that promotes itself to a list for IPv6 values."""
+
+    __slots__ = ('_data',)
+
+    def __init__(self):
+        self._data = array('q')
+
+    def append(self, value: int):
+        if value > 0x7FFFFFFFFFFFFFFF and isinstance(self._data, array):
+            self._data = list(self._data)
+        self._data.append(value)
+
+    def __getitem__(self, index: int) -> int:
+        return self._data[index]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._data)
+
+
+class Vlan:
+    """A VLAN definition from vlans.yaml."""
+
+    __slots__ = ('name', 'id', 'trust', 'default_policy')
+
+    def __init__(self, name: str, vlan_id: Any, trust: str, default_policy: str):
+        self.name = intern_name(name)
+        self.id = vlan_id
+        self.trust = intern_name(trust)
+        self.default_policy = intern_name(default_policy)
+
+
+class Network:
+    """An IPAM network with its prefix and gateway as integers."""
+
+    __slots__ = ('name', 'vlan_id', 'version', 'start', 'end', 'prefixlen', 'gateway')
+
+    def __init__(self, name: str, vlan_id: Any, version: int, start: int, prefixlen: int, gateway: int):
+        bits = 32 if version == 4 else 128
+        self.name = intern_name(name)
+        self.vlan_id = vlan_id
+        self.version = version
+        self.start = start
+        self.end = start | ((1 << (bits - prefixlen)) - 1)
+        self.prefixlen = prefixlen
+        self.gateway = gateway
+
+    @property
+    def cidr(self) -> str:
+        return f"{format_ip(self.version, self.start)}/{self.prefixlen}"
+
+    @property
+    def gateway_ip(self) -> Optional[str]:
+        return format_ip(self.version, self.gateway) if self.gateway != INVALID else None
+
+    def contains(self, version: int, value: int) -> bool:
+        return version == self.version and self.start <= value <= self.end
+
+
+class ReservationTable:
+    """Column store of IPAM reservations, one row per ``reservations`` entry.
+
+    Rows keep the contract order. ``ips`` holds INVALID for a missing or
+    malformed address; ``versions`` is 0 in that case.
+    """
+
+    __slots__ = ('names', 'hostnames', 'vlans', 'versions', 'ips', '_by_ip', '_by_hostname')
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.hostnames: List[Any] = []
+        self.vlans: List[Any] = []
+        self.versions = array('B')
+        self.ips = IntColumn()
+        self._by_ip: Optional[Dict[Tuple[int, int], List[int]]] = None
+        self._by_hostname: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_mapping(cls, reservations: Dict[str, Dict[str, Any]]) -> 'ReservationTable':
+        table = cls()
+        for name, config in (reservations or {}).items():
+            config = config or {}
+            version, value = parse_ip(config.get('ip')) if 'ip' in config else (0, INVALID)
+            table.names.append(name)
+            table.hostnames.append(config.get('hostname'))
+            table.vlans.append(intern_name(config.get('vlan')))
+            table.versions.append(version)
+            table.ips.append(value)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def ip(self, row: int) -> Optional[str]:
+        """Canonical address string for ``row``, or None if invalid."""
+        value = self.ips[row]
+        return format_ip(self.versions[row], value) if value != INVALID else None
+
+    def rows_for_ip(self, version: int, value: int) -> List[int]:
+        """Rows reserving the given address (hash lookup)."""
+        if self._by_ip is None:
+            by_ip: Dict[Tuple[int, int], List[int]] = {}
+            for row, ip in enumerate(self.ips):
+                if ip != INVALID:
+                    by_ip.setdefault((self.versions[row], ip), []).append(row)
+            self._by_ip = by_ip
+        return self._by_ip.get((version, value), [])
+
+    def row_for_hostname(self, fqdn: str) -> Optional[int]:
+        """Row whose normalized hostname is ``fqdn`` (last one wins)."""
+        if self._by_hostname is None:
+            by_hostname = {}
+            for row, hostname in enumerate(self.hostnames):
+                if hostname and self.ips[row] != INVALID:
+                    by_hostname[str(hostname).strip().lower().rstrip('.')] = row
+            self._by_hostname = by_hostname
+        return self._by_hostname.get(fqdn)
+
+    def hostname_rows(self) -> Iterator[Tuple[str, int]]:
+        """Yield (normalized hostname, row) pairs for valid reservations."""
+        self.row_for_hostname('')
+        return iter(self._by_hostname.items())
+
+
+class ZoneRecords:
+    """Column store of one zone's records in contract order.
+
+    ``index`` holds the zone's ``dns_index.ZoneIndex`` once something asks for it.
+    """
+
+    __slots__ = ('name', 'has_records', 'names', 'types', 'values', 'versions', 'ips', 'index')
+
+    def __init__(self, name: Any, has_records: bool):
+        self.name = intern_name(name)
+        self.has_records = has_records
+        self.names: List[Any] = []
+        self.types: List[Any] = []
+        self.values: List[Any] = []
+        self.versions = array('B')
+        self.ips = IntColumn()
+        self.index = None
+
+    @classmethod
+    def from_zone(cls, zone: Dict[str, Any]) -> 'ZoneRecords':
+        table = cls(zone.get('name'), 'records' in zone)
+        names, types, values = table.names, table.types, table.values
+        versions, ips = table.versions, table.ips
+        for record in zone.get('records') or []:
+            record_type = record.get('type')
+            value = record.get('value')
+            names.append(record.get('name'))
+            types.append(intern_name(record_type))
+            values.append(value)
+            if record_type in (None, 'A', 'AAAA') and value:
+                version, ip = parse_ip(value)
+            else:
+                version, ip = 0, INVALID
+            versions.append(version)
+            ips.append(ip)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class IPAMModel:
+    """Typed view of ipam.yaml."""
+
+    __slots__ = ('site', 'networks', 'reservations', '_by_vlan_id')
+
+    def __init__(self, site: Any, networks: Dict[str, Network], reservations: ReservationTable):
+        self.site = site
+        self.networks = networks
+        self.reservations = reservations
+        self._by_vlan_id: Dict[Any, List[Network]] = {}
+        for network in networks.values():
+            if network.vlan_id is not None:
+                self._by_vlan_id.setdefault(network.vlan_id, []).append(network)
+
+    @classmethod
+    def from_contract(cls, ipam_data: Dict[str, Any]) -> 'IPAMModel':
+        """Build the model; networks with a missing or invalid CIDR are omitted."""
+        networks = {}
+        for name, config in (ipam_data.get('networks') or {}).items():
+            config = config or {}
+            try:
+                network = ipaddress.ip_network(config.get('cidr'), strict=False)
+            except (TypeError, ValueError):
+                continue
+            gateway_version, gateway = parse_ip(config.get('gateway')) if 'gateway' in config else (0, INVALID)
+            if gateway_version != network.version:
+                gateway = INVALID
+            networks[intern_name(name)] = Network(name, config.get('vlan_id'), network.version,
+                                                  int(network.network_address), network.prefixlen, gateway)
+        reservations = reservation_table(ipam_data.get('reservations') or {})
+        return cls(ipam_data.get('site'), networks, reservations)
+
+    def networks_for_vlan_id(self, vlan_id: Any) -> List[Network]:
+        """Every network assigned to ``vlan_id``, in contract order (e.g. an IPv4 and an IPv6 prefix)."""
+        return self._by_vlan_id.get(vlan_id, [])
+
+
+class DNSModel:
+    """Typed view of dns-zones.yaml."""
+
+    __slots__ = ('zones', 'policy')
+
+    def __init__(self, zones: List[ZoneRecords], policy: Dict[str, Any]):
+        self.zones = zones
+        self.policy = policy
+
+    @classmethod
+    def from_contract(cls, dns_data: Dict[str, Any]) -> 'DNSModel':
+        zones = [ZoneRecords.from_zone(zone) for zone in dns_data.get('zones') or []]
+        return cls(zones, dns_data.get('dns_policy', {}))
+
+
+def _memoized(kind: str, raw: Any, build):
+    key = (kind, id(raw))
+    entry = _models.get(key)
+    if entry is not None and entry[0] is raw:
+        _models.move_to_end(key)
+        return entry[1]
+    model = build(raw)
+    _models[key] = (raw, model)
+    while len(_models) > _MODEL_CACHE_SIZE:
+        _models.popitem(last=False)
+    return model
+
+
+def vlan_table(vlans_data: Dict[str, Any]) -> Dict[str, Vlan]:
+    """Typed VLANs from vlans.yaml, skipping entries without an ``id``."""
+    def build(raw):
+        return {
+            intern_name(name): Vlan(name, config['id'], config.get('trust', 'unknown'), config.get('default_policy', 'deny'))
+            for name, config in (raw.get('vlans') or {}).items() if config and 'id' in config
+        }
+    return _memoized('vlans', vlans_data, build)
+
+
+def ipam_model(ipam_data: Dict[str, Any]) -> IPAMModel:
+    """Typed IPAM model for a parsed ipam.yaml, built once per object."""
+    return _memoized('ipam', ipam_data, IPAMModel.from_contract)
+
+
+def reservation_table(reservations: Dict[str, Dict[str, Any]]) -> ReservationTable:
+    """Reservation columns for a parsed ``reservations`` mapping, built once per object."""
+    return _memoized('reservations', reservations, ReservationTable.from_mapping)
+
+
+def dns_model(dns_data: Dict[str, Any]) -> DNSModel:
+    """Typed DNS model for a parsed dns-zones.yaml, built once per object."""
+    return _memoized('dns', dns_data, DNSModel.from_contract)
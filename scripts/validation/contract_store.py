@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Shared contract loading layer for homelab infrastructure tools.
+Parses each contract once per process with the libyaml loader when
+available, and keeps a serialized parsed-contract cache on disk.
+"""
+
+import hashlib
+import marshal
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml not installed
+    from yaml import SafeLoader
+
+
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / '.cache' / 'contracts'
+
+
+class ContractStore:
+    """Loads contracts from one directory and hands out shared parsed objects.
+
+    Within a process a parsed contract is reused while the file's mtime and
+    size are unchanged. The on-disk cache is keyed by the SHA-256 of the
+    file's content and holds marshalled plain data, so an entry restored
+    from elsewhere (e.g. a CI cache) can neither run code nor stand in for
+    different content. Callers must treat returned objects as read-only,
+    since every tool in the process receives the same instance.
+    """
+
+    _shared: Dict[Path, 'ContractStore'] = {}
+
+    def __init__(self, contracts_dir: Path, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR):
+        self.contracts_dir = Path(contracts_dir)
+        self.cache_dir = cache_dir
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def shared(cls, contracts_dir: Path) -> 'ContractStore':
+        """Return the process-wide store for ``contracts_dir``."""
+        key = Path(contracts_dir).resolve()
+        store = cls._shared.get(key)
+        if store is None:
+            store = cls._shared[key] = cls(contracts_dir)
+        return store
+
+    @property
+    def loader_name(self) -> str:
+        """Name of the YAML loader in use (CSafeLoader when libyaml is present)."""
+        return SafeLoader.__name__
+
+    def exists(self, filename: str) -> bool:
+        """Check whether a contract file exists."""
+        return (self.contracts_dir / filename).is_file()
+
+    def load(self, filename: str) -> Any:
+        """Return the parsed contents of ``filename`` ({} for an empty file).
+
+        Raises FileNotFoundError if the file is missing and yaml.YAMLError if
+        it cannot be parsed.
+        """
+        return self._entry(filename)['data']
+
+    def digest(self, filename: str) -> Optional[str]:
+        """Return the SHA-256 of ``filename``'s content, or None if missing."""
+        try:
+            return self._entry(filename, parse=False)['sha256']
+        except FileNotFoundError:
+            return None
+
+    def _entry(self, filename: str, parse: bool = True) -> Dict[str, Any]:
+        filepath = self.contracts_dir / filename
+        stat = os.stat(filepath)
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._entries.get(filename)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            content = filepath.read_bytes()
+            sha256 = hashlib.sha256(content).hexdigest()
+            entry = {'fingerprint': fingerprint, 'sha256': sha256, 'content': content}
+            cached = self._read_cache(sha256)
+            if cached is not None:
+                entry['data'] = cached
+                del entry['content']
+            self._entries[filename] = entry
+
+        if parse and 'data' not in entry:
+            entry['data'] = yaml.load(entry['content'], Loader=SafeLoader) or {}
+            del entry['content']
+            self._write_cache(entry['sha256'], entry['data'])
+        return entry
+
+    def _cache_path(self, sha256: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{sha256}.marshal"
+
+    def _read_cache(self, sha256: str) -> Any:
+        """Cached parse of the content hashing to ``sha256``, or None."""
+        path = self._cache_path(sha256)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                version, digest, data = marshal.load(f)
+        except Exception:
+            # Missing, truncated, from another Python or not ours at all
+            return None
+        if version != CACHE_VERSION or digest != sha256:
+            return None
+        return data
+
+    def _write_cache(self, sha256: str, data: Any):
+        path = self._cache_path(sha256)
+        if path is None:
+            return
+        try:
+            payload = marshal.dumps((CACHE_VERSION, sha256, data))
+        except ValueError:
+            # YAML timestamps and other non-plain values are reparsed each run
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.contract-', suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The cache is an optimisation only; a read-only checkout still works
+            pass
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+File watching for contract watch mode.
+Waits for changes in the contracts directory with Linux inotify (through
+ctypes, no extra dependency), or by polling mtimes elsewhere. It debounces
+bursts of saves into one batch and maps changed files to the generators
+that read them. Validation stages need no mapping here: the stage result
+cache is keyed by content hashes and already reruns only affected stages.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+CONTRACT_SUFFIXES = ('.yaml', '.yml')
+
+# Generators and the contract files they read
+GENERATOR_INPUTS: Dict[str, Set[str]] = {
+    'network': {'vlans.yaml', 'ipam.yaml', 'access-matrix.yaml', 'dns-zones.yaml'},
+    'dns': {'dns-zones.yaml', 'ipam.yaml'},
+}
+
+DEFAULT_DEBOUNCE = 0.03
+DEFAULT_POLL_INTERVAL = 0.25
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct('iIII')
+
+
+def affected_generators(changed: Set[str]) -> List[str]:
+    """Generators whose inputs include a changed file."""
+    return [name for name, inputs in GENERATOR_INPUTS.items() if inputs & changed]
+
+
+class _Inotify:
+    """Minimal inotify wrapper: one directory watch, blocking waits with timeout."""
+
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        """Return names touched within ``timeout`` seconds (empty on timeout).
+
+        Returns None if the kernel queue overflowed and any file may have changed.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names: Set[str] = set()
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Poller:
+    """mtime/size polling fallback for platforms without inotify."""
+
+    def __init__(self, directory: Path, interval: float):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return snapshot
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {name for name in current.keys() | self.snapshot.keys()
+                       if current.get(name) != self.snapshot.get(name)}
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+class ContractWatcher:
+    """Yields debounced batches of changed contract files in one directory."""
+
+    def __init__(self, contracts_dir: Path, debounce: float = DEFAULT_DEBOUNCE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.contracts_dir = Path(contracts_dir)
+        self.debounce = debounce
+        try:
+            self._source = _Inotify(self.contracts_dir)
+            self.backend = 'inotify'
+        except (OSError, AttributeError):
+            self._source = _Poller(self.contracts_dir, poll_interval)
+            self.backend = 'polling'
+
+    def _contracts(self) -> Set[str]:
+        return {path.name for path in self.contracts_dir.iterdir() if path.suffix in CONTRACT_SUFFIXES}
+
+    def batches(self) -> Iterator[Tuple[Set[str], float]]:
+        """Yield (changed contract files, monotonic time of the first event) forever.
+
+        After the first event, events keep being collected until none arrive
+        for ``debounce`` seconds, so an editor's write-rename-chmod burst or a
+        ``git checkout`` touching several files becomes one batch. Editor
+        swap and temp files are ignored.
+        """
+        while True:
+            names = self._source.wait(None)
+            first_event = time.monotonic()
+            while names is not None:
+                more = self._source.wait(self.debounce)
+                if more is None:
+                    names = None
+                elif not more:
+                    break
+                else:
+                    names |= more
+            if names is None:
+                changed = self._contracts()
+            else:
+                changed = {name for name in names if name.endswith(CONTRACT_SUFFIXES) and not name.startswith('.')}
+            if changed:
+                yield changed, first_event
+
+    def close(self):
+        self._source.close()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+DNS record index for homelab infrastructure contracts.
+Normalizes every record of a zone to (FQDN, type) in a single pass and
+answers the structural checks on top of it: duplicate records, CNAMEs that
+share a name with other data, names that repeat the zone suffix, absolute
+names outside the zone and records that rely on the implicit A type. The
+index is for the validator; the DNS generators stream rows through
+``iter_fqdns``, which normalizes the same way without storing anything.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from contract_model import ZoneRecords, normalize_name, qualify_name
+
+
+# Record types whose value is a domain name
+NAME_TYPES = ('CNAME', 'NS', 'PTR')
+
+# Types where several values for one name are a mistake (CNAME) or usually one (A, AAAA)
+SINGLE_VALUE_TYPES = ('A', 'AAAA', 'CNAME')
+
+
+def record_value(record_type: str, value: Any) -> str:
+    """Normalized record value: names lowercased without trailing dot, others stripped."""
+    return normalize_name(value) if record_type in NAME_TYPES else str(value).strip()
+
+
+def normalize_type(record_type: Any) -> str:
+    """Uppercase record type; a missing type means A."""
+    if record_type is None:
+        return 'A'
+    if isinstance(record_type, str) and record_type.isupper():
+        return record_type
+    return str(record_type).strip().upper()
+
+
+def iter_fqdns(records: ZoneRecords) -> Iterator[Tuple[Optional[str], str]]:
+    """Yield (FQDN, type) for each row of ``records``, in row order.
+
+    Rows without a name yield a None FQDN. Nothing is kept, so writers can
+    stream zones of any size in constant memory.
+    """
+    zone = normalize_name(records.name) if records.name else ''
+    for name, record_type in zip(records.names, records.types):
+        yield (qualify_name(name, zone) if name else None), normalize_type(record_type)
+
+
+class ZoneIndex:
+    """Hash index over one zone's records, keyed by normalized (FQDN, type).
+
+    ``fqdns`` and ``types`` are columns aligned with the zone's rows; rows
+    without a name have a None FQDN and are not indexed. A missing type is
+    recorded as A and its row listed in ``untyped``; absolute names outside
+    the zone are listed in ``out_of_zone``.
+    """
+
+    __slots__ = ('zone', 'records', 'fqdns', 'types', 'by_key', 'untyped', 'double_suffixed', 'out_of_zone')
+
+    def __init__(self, records: ZoneRecords):
+        self.records = records
+        self.zone = normalize_name(records.name) if records.name else ''
+        self.fqdns: List[Optional[str]] = []
+        self.types: List[str] = []
+        self.by_key: Dict[Tuple[str, str], List[int]] = {}
+        self.untyped: List[int] = []
+        self.double_suffixed: List[int] = []
+        self.out_of_zone: List[int] = []
+
+        zone = self.zone
+        suffix = '.' + zone
+        doubled = f"{zone}.{zone}"
+        fqdns, types, by_key = self.fqdns, self.types, self.by_key
+        self.untyped = [row for row, record_type in enumerate(records.types) if record_type is None]
+        for row, (fqdn, record_type) in enumerate(iter_fqdns(records)):
+            types.append(record_type)
+            fqdns.append(fqdn)
+            if fqdn is None:
+                continue
+            if zone and (fqdn == doubled or fqdn.endswith('.' + doubled)):
+                self.double_suffixed.append(row)
+            elif zone and fqdn != zone and not fqdn.endswith(suffix):
+                self.out_of_zone.append(row)
+            rows = by_key.get((fqdn, record_type))
+            if rows is None:
+                by_key[(fqdn, record_type)] = [row]
+            else:
+                rows.append(row)
+
+    def __len__(self) -> int:
+        return len(self.fqdns)
+
+    def rows(self, fqdn: str, record_type: str) -> List[int]:
+        """Rows holding ``record_type`` records for ``fqdn``."""
+        return self.by_key.get((fqdn, record_type), [])
+
+    def value(self, row: int) -> str:
+        """Normalized value of ``row``."""
+        return record_value(self.types[row], self.records.values[row])
+
+    def duplicates(self) -> Iterator[Tuple[str, str, List[List[int]]]]:
+        """Yield (FQDN, type, row groups) for names holding a type more than once.
+
+        Each group lists the rows of one value, so a group longer than one is
+        an exact duplicate and several groups are different values. Only
+        exact duplicates and SINGLE_VALUE_TYPES with several values are reported.
+        """
+        for (fqdn, record_type), rows in self.by_key.items():
+            if len(rows) < 2:
+                continue
+            by_value: Dict[str, List[int]] = {}
+            for row in rows:
+                by_value.setdefault(self.value(row), []).append(row)
+            groups = list(by_value.values())
+            if len(groups) < len(rows) or record_type in SINGLE_VALUE_TYPES:
+                yield fqdn, record_type, groups
+
+    def cname_conflicts(self) -> Iterator[Tuple[str, List[str], List[int]]]:
+        """Yield (FQDN, other types, CNAME rows) for CNAMEs sharing a name with other data."""
+        cnames: Dict[str, List[int]] = {fqdn: rows for (fqdn, record_type), rows in self.by_key.items()
+                                        if record_type == 'CNAME'}
+        if not cnames:
+            return
+        others: Dict[str, Set[str]] = {}
+        for fqdn, record_type in self.by_key:
+            if record_type != 'CNAME' and fqdn in cnames:
+                others.setdefault(fqdn, set()).add(record_type)
+        for fqdn, types in others.items():
+            yield fqdn, sorted(types), cnames[fqdn]
+
+
+def zone_index(records: ZoneRecords) -> ZoneIndex:
+    """The index of ``records``, built on first use and kept on the zone table."""
+    if records.index is None:
+        records.index = ZoneIndex(records)
+    return records.index
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Bitmap-backed IP allocator for ipam.yaml.
+Keeps one bit per address for every network, marked from the gateway,
+existing reservations and any ``reserved_ranges``, and hands out the next
+free addresses or a contiguous block without touching the contract.
+
+Usage:
+    ip_allocator.py usage
+    ip_allocator.py next vlan10_iot --count 200
+    ip_allocator.py next vlan10_iot --count 16 --contiguous
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from cli_types import positive_int
+from contract_model import INVALID, Network, format_ip, ipam_model, parse_range
+from ipam_index import IPAMIndex
+
+
+# Largest network kept as a bitmap (a /8 is 2 MiB); bigger ones are rejected
+MAX_BITMAP_BITS = 1 << 24
+
+_NOT_FULL = re.compile(rb'[^\xff]')
+
+
+class SubnetBitmap:
+    """One bit per address of a network, set when the address is taken.
+
+    Bits are stored most significant first, so the bitmap read as a big
+    integer has the network's first address in its top bit. Single free
+    addresses are found with a C-level regex scan for a byte that is not
+    0xff; contiguous blocks with O(log n) big-integer shift-and-mask steps.
+    """
+
+    __slots__ = ('network', 'size', 'bits')
+
+    def __init__(self, network: Network):
+        self.network = network
+        self.size = network.end - network.start + 1
+        if self.size > MAX_BITMAP_BITS:
+            raise ValueError(f"network '{network.name}' ({network.cidr}) is too large for a bitmap")
+        self.bits = bytearray((self.size + 7) // 8)
+        # Padding bits past the end of the network are permanently taken
+        for offset in range(self.size, len(self.bits) * 8):
+            self._set(offset)
+
+        if network.version == 4 and network.prefixlen < 31:
+            self._set(0)
+            self._set(self.size - 1)
+        elif network.version == 6 and network.prefixlen < 127:
+            # Subnet-router anycast address
+            self._set(0)
+
+    @property
+    def capacity(self) -> int:
+        """Number of assignable addresses (excludes network/broadcast)."""
+        if self.network.version == 4 and self.network.prefixlen < 31:
+            return self.size - 2
+        if self.network.version == 6 and self.network.prefixlen < 127:
+            return self.size - 1
+        return self.size
+
+    @property
+    def used(self) -> int:
+        """Number of assignable addresses that are taken."""
+        taken = bin(int.from_bytes(self.bits, 'big')).count('1')
+        return taken - (len(self.bits) * 8 - self.size) - (self.size - self.capacity)
+
+    def _set(self, offset: int):
+        self.bits[offset >> 3] |= 0x80 >> (offset & 7)
+
+    def _offset(self, address: int) -> int:
+        offset = address - self.network.start
+        if not 0 <= offset < self.size:
+            raise ValueError(f"{format_ip(self.network.version, address)} is not in {self.network.cidr}")
+        return offset
+
+    def is_free(self, address: int) -> bool:
+        offset = self._offset(address)
+        return not self.bits[offset >> 3] & (0x80 >> (offset & 7))
+
+    def reserve(self, address: int):
+        """Mark ``address`` as taken."""
+        self._set(self._offset(address))
+
+    def reserve_range(self, first: int, last: int):
+        """Mark every address from ``first`` to ``last`` (inclusive) as taken."""
+        low, high = self._offset(first), self._offset(last)
+        while low <= high and low & 7:
+            self._set(low)
+            low += 1
+        while high >= low and (high + 1) & 7:
+            self._set(high)
+            high -= 1
+        if low <= high:
+            self.bits[low >> 3:(high >> 3) + 1] = b'\xff' * ((high - low + 1) >> 3)
+
+    def next_free(self, after: Optional[int] = None) -> Optional[int]:
+        """Lowest free address (greater than ``after`` if given), or None."""
+        offset = 0 if after is None else self._offset(after) + 1
+        byte = offset >> 3
+        while True:
+            match = _NOT_FULL.search(self.bits, byte)
+            if match is None:
+                return None
+            byte = match.start()
+            value = self.bits[byte]
+            for bit in range(8):
+                candidate = (byte << 3) | bit
+                if candidate >= offset and not value & (0x80 >> bit):
+                    return self.network.start + candidate
+            byte += 1
+
+    def allocate(self, count: int = 1) -> List[int]:
+        """Take the ``count`` lowest free addresses; all or nothing."""
+        if count < 1:
+            raise ValueError(f"cannot allocate {count} addresses; count must be at least 1")
+        found: List[int] = []
+        address = None
+        while len(found) < count:
+            address = self.next_free(address)
+            if address is None:
+                raise ValueError(f"network '{self.network.name}' has only {len(found)} free address(es), "
+                                 f"{count} requested")
+            found.append(address)
+        for address in found:
+            self.reserve(address)
+        return found
+
+    def find_block(self, count: int) -> Optional[int]:
+        """First address of the lowest run of ``count`` free addresses, or None."""
+        if count <= 0:
+            raise ValueError("block size must be positive")
+        total = len(self.bits) * 8
+        mask = (1 << total) - 1
+        # Bit j of ``runs`` is set when bits j..j-have+1 are all free
+        runs = ~int.from_bytes(self.bits, 'big') & mask
+        have = 1
+        while have < count and runs:
+            step = min(have, count - have)
+            runs &= (runs << step) & mask
+            have += step
+        if not runs:
+            return None
+        return self.network.start + (total - runs.bit_length())
+
+    def allocate_block(self, count: int) -> List[int]:
+        """Take the lowest contiguous run of ``count`` free addresses."""
+        first = self.find_block(count)
+        if first is None:
+            raise ValueError(f"network '{self.network.name}' has no block of {count} contiguous free addresses")
+        self.reserve_range(first, first + count - 1)
+        return list(range(first, first + count))
+
+
+class IPAllocator:
+    """Per-network bitmaps over a parsed ipam.yaml, built on first use.
+
+    Only the networks a command touches get a bitmap, so a network too
+    large for one (an IPv6 /64) or with a bad gateway or ``reserved_ranges``
+    entry does not stop work on the others. Bad entries are collected per
+    network in ``errors`` instead of raising.
+    """
+
+    def __init__(self, ipam_data: Dict[str, Any]):
+        self.ipam_data = ipam_data
+        self.model = ipam_model(ipam_data)
+        self.bitmaps: Dict[str, SubnetBitmap] = {}
+        self.errors: Dict[str, List[str]] = {}
+        self._owned: Optional[Dict[str, List[int]]] = None
+
+    @classmethod
+    def from_contract(cls, ipam_data: Dict[str, Any]) -> 'IPAllocator':
+        return cls(ipam_data)
+
+    def _reservations(self, network: str) -> List[int]:
+        """Reserved addresses that fall in ``network``.
+
+        Reservations are placed in the most specific network containing
+        them, whatever their ``vlan`` reference says; the validator reports
+        mismatches.
+        """
+        if self._owned is None:
+            self._owned = {}
+            index = IPAMIndex.from_model(self.model)
+            table = self.model.reservations
+            for row in range(len(table)):
+                if table.ips[row] == INVALID:
+                    continue
+                owner = index.lookup((table.versions[row], table.ips[row]))
+                if owner is not None:
+                    self._owned.setdefault(owner, []).append(table.ips[row])
+        return self._owned.get(network, [])
+
+    def bitmap(self, network: str) -> SubnetBitmap:
+        """Bitmap of ``network`` with its gateway, reservations and ``reserved_ranges`` marked.
+
+        Raises KeyError for an unknown network and ValueError for one too
+        large for a bitmap.
+        """
+        if network in self.bitmaps:
+            return self.bitmaps[network]
+        config = self.model.networks.get(network)
+        if config is None:
+            raise KeyError(f"unknown network {network!r}")
+        bitmap = SubnetBitmap(config)
+        errors = self.errors.setdefault(network, [])
+
+        if config.gateway != INVALID:
+            if config.contains(config.version, config.gateway):
+                bitmap.reserve(config.gateway)
+            else:
+                errors.append(f"network '{network}': gateway {config.gateway_ip} is not in {config.cidr}")
+        for address in self._reservations(network):
+            bitmap.reserve(address)
+        for entry in ((self.ipam_data.get('networks') or {}).get(network) or {}).get('reserved_ranges') or []:
+            version, first, last = parse_range(entry)
+            if first == INVALID:
+                errors.append(f"network '{network}': invalid reserved range {entry!r}")
+            elif not (config.contains(version, first) and config.contains(version, last)):
+                errors.append(f"network '{network}': reserved range {entry!r} is not in {config.cidr}")
+            else:
+                bitmap.reserve_range(first, last)
+
+        self.bitmaps[network] = bitmap
+        return bitmap
+
+    def next_free(self, network: str, count: int = 1, contiguous: bool = False) -> List[str]:
+        """Allocate ``count`` addresses in ``network`` and return them as strings."""
+        bitmap = self.bitmap(network)
+        addresses = bitmap.allocate_block(count) if contiguous else bitmap.allocate(count)
+        return [format_ip(bitmap.network.version, address) for address in addresses]
+
+    def utilization(self) -> List[Dict[str, Any]]:
+        """Per-network usage rows in contract order.
+
+        A network too large for a bitmap gets a row with a ``note`` instead
+        of counts.
+        """
+        rows = []
+        for name, network in self.model.networks.items():
+            row = {'network': name, 'vlan_id': network.vlan_id, 'cidr': network.cidr}
+            try:
+                bitmap = self.bitmap(name)
+            except ValueError as e:
+                row['note'] = e.args[0]
+                rows.append(row)
+                continue
+            used, capacity = bitmap.used, bitmap.capacity
+            row.update({
+                'used': used,
+                'free': capacity - used,
+                'capacity': capacity,
+                'percent': 100.0 * used / capacity if capacity else 100.0,
+            })
+            rows.append(row)
+        return rows
+
+
+def print_utilization(rows: List[Dict[str, Any]]):
+    """Print a per-VLAN utilization table."""
+    print(f"{'Network':<20} {'VLAN':>5} {'CIDR':<18} {'Used':>8} {'Free':>8} {'Util':>7}")
+    for row in rows:
+        if 'note' in row:
+            print(f"{row['network']:<20} {str(row['vlan_id']):>5} {row['cidr']:<18} {'-':>8} {'-':>8} {'-':>7}"
+                  f"  ({row['note']})")
+            continue
+        print(f"{row['network']:<20} {str(row['vlan_id']):>5} {row['cidr']:<18} "
+              f"{row['used']:>8} {row['free']:>8} {row['percent']:>6.1f}%")
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Register the ``usage`` and ``next`` commands on ``parser``."""
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('usage', help="Show per-VLAN utilization")
+    next_free = subparsers.add_parser('next', help="Propose the next free addresses in a network")
+    next_free.add_argument('network', help="Network name from ipam.yaml, e.g. vlan10_iot")
+    next_free.add_argument('-n', '--count', type=positive_int, default=1, help="Addresses to propose")
+    next_free.add_argument('--contiguous', action='store_true', help="Return one contiguous block")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Report utilization or propose free addresses."""
+    parser = argparse.ArgumentParser(description="IP allocation and utilization for ipam.yaml")
+    parser.add_argument('--contracts-dir', type=Path,
+                        default=Path(__file__).parent.parent.parent / 'infra' / 'contracts',
+                        help="Directory containing the contract files")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from contract_store import ContractStore
+
+    return run(ContractStore.shared(args.contracts_dir), args)
+
+
+def run(store, args) -> int:
+    """Execute a parsed ``usage`` or ``next`` command against ``store``'s ipam.yaml.
+
+    Bad gateways and ``reserved_ranges`` entries in the networks involved
+    are printed and make the command exit 1; ``next`` then proposes nothing.
+    """
+    if not store.exists('ipam.yaml'):
+        print(f"Error: ipam.yaml not found in {store.contracts_dir}")
+        return 1
+    allocator = IPAllocator.from_contract(store.load('ipam.yaml') or {})
+
+    if args.command == 'usage':
+        print_utilization(allocator.utilization())
+        errors = [error for network_errors in allocator.errors.values() for error in network_errors]
+    else:
+        try:
+            allocator.bitmap(args.network)
+        except (KeyError, ValueError) as e:
+            print(f"Error: {e.args[0]}")
+            return 1
+        errors = allocator.errors[args.network]
+        if not errors:
+            try:
+                addresses = allocator.next_free(args.network, args.count, args.contiguous)
+            except ValueError as e:
+                print(f"Error: {e.args[0]}")
+                return 1
+            for address in addresses:
+                print(address)
+
+    for error in errors:
+        print(f"Error: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
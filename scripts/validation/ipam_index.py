@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+IPAM index for homelab infrastructure contracts.
+Parses ipam.yaml networks once into integer intervals and answers
+overlap and longest-prefix ("which network owns IP X") queries.
+"""
+
+import bisect
+import ipaddress
+from typing import Dict, Iterable, List, Optional, Tuple, Any, Union
+
+
+# A string, an integer, an ipaddress object or a (version, integer) pair
+Address = Union[str, int, Tuple[int, int], ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+class IPAMIndex:
+    """Sorted interval index over IPAM networks.
+
+    CIDR blocks are either disjoint or nested, so a single sort by
+    (start, -end) plus a stack sweep yields both the overlap report and a
+    parent pointer per network. Lookups bisect to the last network starting
+    at or before the address and walk parent pointers (at most one hop per
+    prefix length) until a containing network is found.
+    """
+
+    def __init__(self):
+        # name -> (version, start, end, prefixlen)
+        self.networks: Dict[str, Tuple[int, int, int, int]] = {}
+        self._starts: Dict[int, List[int]] = {}
+        self._entries: Dict[int, List[Tuple[int, int, int, str]]] = {}
+        self._parents: Dict[int, List[int]] = {}
+        self._overlaps: List[Tuple[str, str]] = []
+        self._built = False
+
+    @classmethod
+    def from_networks(cls, networks: Dict[str, Dict[str, Any]]) -> 'IPAMIndex':
+        """Build an index from an ipam.yaml style ``networks`` mapping.
+
+        Networks with a missing or unparsable ``cidr`` are skipped; the
+        validator reports those separately.
+        """
+        index = cls()
+        for name, config in (networks or {}).items():
+            cidr = (config or {}).get('cidr')
+            if not cidr:
+                continue
+            try:
+                index.add(name, cidr)
+            except ValueError:
+                continue
+        index.build()
+        return index
+
+    @classmethod
+    def from_model(cls, ipam: Any, names: Optional[Iterable[str]] = None) -> 'IPAMIndex':
+        """Build an index from a ``contract_model.IPAMModel`` without re-parsing CIDRs.
+
+        With ``names``, only those networks are indexed.
+        """
+        index = cls()
+        for name in (ipam.networks if names is None else names):
+            network = ipam.networks.get(name)
+            if network is not None:
+                index.networks[name] = (network.version, network.start, network.end, network.prefixlen)
+        index.build()
+        return index
+
+    def add(self, name: str, cidr: str):
+        """Add a network to the index. Raises ValueError on a bad CIDR."""
+        network = ipaddress.ip_network(cidr, strict=False)
+        self.networks[name] = (
+            network.version,
+            int(network.network_address),
+            int(network.broadcast_address),
+            network.prefixlen,
+        )
+        self._built = False
+
+    def build(self):
+        """Sort intervals and compute parent pointers and overlaps."""
+        by_version: Dict[int, List[Tuple[int, int, int, str]]] = {}
+        for name, (version, start, end, prefixlen) in self.networks.items():
+            by_version.setdefault(version, []).append((start, -end, prefixlen, name))
+
+        self._starts = {}
+        self._entries = {}
+        self._parents = {}
+        self._overlaps = []
+
+        for version, items in by_version.items():
+            items.sort()
+            entries = [(start, -neg_end, prefixlen, name) for start, neg_end, prefixlen, name in items]
+            parents = [-1] * len(entries)
+            stack: List[int] = []
+
+            for i, (start, end, _, name) in enumerate(entries):
+                while stack and entries[stack[-1]][1] < start:
+                    stack.pop()
+                if stack:
+                    parent = stack[-1]
+                    parents[i] = parent
+                    self._overlaps.append((entries[parent][3], name))
+                stack.append(i)
+
+            self._starts[version] = [entry[0] for entry in entries]
+            self._entries[version] = entries
+            self._parents[version] = parents
+
+        self._built = True
+
+    def find_overlaps(self) -> List[Tuple[str, str]]:
+        """Return (enclosing, enclosed) network name pairs that overlap."""
+        if not self._built:
+            self.build()
+        return list(self._overlaps)
+
+    def lookup(self, address: Address) -> Optional[str]:
+        """Return the most specific network containing ``address``, if any."""
+        if not self._built:
+            self.build()
+
+        try:
+            version, value = self._to_int(address)
+        except ValueError:
+            return None
+
+        starts = self._starts.get(version)
+        if not starts:
+            return None
+
+        entries = self._entries[version]
+        parents = self._parents[version]
+        i = bisect.bisect_right(starts, value) - 1
+        while i >= 0:
+            start, end, _, name = entries[i]
+            if start <= value <= end:
+                return name
+            i = parents[i]
+        return None
+
+    def contains(self, name: str, address: Address) -> bool:
+        """Check whether network ``name`` contains ``address``."""
+        network = self.networks.get(name)
+        if network is None:
+            return False
+        try:
+            version, value = self._to_int(address)
+        except ValueError:
+            return False
+        return network[0] == version and network[1] <= value <= network[2]
+
+    def cidr(self, name: str) -> Optional[str]:
+        """Return the normalized CIDR string for network ``name``."""
+        network = self.networks.get(name)
+        if network is None:
+            return None
+        version, start, _, prefixlen = network
+        address_cls = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+        return f"{address_cls(start)}/{prefixlen}"
+
+    @staticmethod
+    def _to_int(address: Address) -> Tuple[int, int]:
+        if isinstance(address, tuple):
+            return address
+        if isinstance(address, int):
+            return 4 if address <= 0xFFFFFFFF else 6, address
+        if isinstance(address, str):
+            address = ipaddress.ip_address(address)
+        return address.version, int(address)
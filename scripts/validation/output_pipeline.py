@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Output pipeline for generated homelab artifacts.
+Renders independent artifacts concurrently on a worker pool and writes each
+one atomically, skipping the write when its content is unchanged. Renderers
+never print; anything they report is printed after the pool has joined, in
+artifact order.
+"""
+
+import filecmp
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO, Tuple, Union, Any
+
+
+Content = Union[str, bytes]
+
+STREAM_BUFFER_SIZE = 1 << 20
+
+
+class Streamed:
+    """Marks a renderer that writes into a text file handle instead of returning content.
+
+    Streamed artifacts never hold their full output in memory, which keeps
+    memory flat for very large zones.
+    """
+
+    def __init__(self, writer: Callable[[TextIO], None]):
+        self.writer = writer
+
+
+class Rendered:
+    """Content returned by a renderer together with notes to report, e.g. stats.
+
+    Renderers run on pool threads, so printing from them would interleave;
+    the notes are printed under the artifact's summary line instead.
+    """
+
+    __slots__ = ('content', 'notes')
+
+    def __init__(self, content: Content, notes: List[str]):
+        self.content = content
+        self.notes = notes
+
+
+class Removed:
+    """Marks an artifact that is no longer produced; its file is deleted if present.
+
+    Generators that shard output over a directory use it for the shards of
+    hosts or groups that have gone away.
+    """
+
+    __slots__ = ()
+
+
+REMOVED = Removed()
+
+# (label, output path, render function, Streamed writer or REMOVED)
+Artifact = Tuple[str, Path, Union[Callable[[], Union[Content, Rendered]], Streamed, Removed]]
+
+
+def write_if_changed(path: Path, content: Content) -> bool:
+    """Atomically write ``content`` to ``path`` unless it already matches.
+
+    Returns True if the file was written. Unchanged files keep their mtime,
+    so git, ArgoCD and file watchers see no churn.
+    """
+    data = content.encode('utf-8') if isinstance(content, str) else content
+
+    try:
+        if path.stat().st_size == len(data):
+            with open(path, 'rb') as f:
+                if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                    return False
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if path.exists():
+            os.chmod(tmp_path, path.stat().st_mode & 0o777)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def stream_if_changed(path: Path, writer: Callable[[TextIO], None]) -> bool:
+    """Stream ``writer``'s output to a temp file and swap it in if it differs.
+
+    The comparison with the existing file is done chunk by chunk on disk, so
+    neither side is ever loaded into memory. Returns True if ``path`` changed.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='', buffering=STREAM_BUFFER_SIZE) as f:
+            writer(f)
+        if path.exists() and filecmp.cmp(tmp_path, path, shallow=False):
+            os.unlink(tmp_path)
+            return False
+        os.chmod(tmp_path, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def remove_if_present(path: Path) -> bool:
+    """Delete ``path``; returns whether it existed."""
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _run_artifact(artifact: Artifact) -> Dict[str, Any]:
+    label, path, render = artifact
+    started = time.perf_counter()
+    result = {'label': label, 'path': path, 'changed': False, 'error': None, 'notes': [],
+              'removed': isinstance(render, Removed)}
+    try:
+        if result['removed']:
+            result['changed'] = remove_if_present(path)
+        elif isinstance(render, Streamed):
+            result['changed'] = stream_if_changed(path, render.writer)
+        else:
+            content = render()
+            if isinstance(content, Rendered):
+                result['notes'] = content.notes
+                content = content.content
+            result['changed'] = write_if_changed(path, content)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def run_pipeline(artifacts: List[Artifact], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Render and write ``artifacts`` concurrently; results keep input order."""
+    if not artifacts:
+        return []
+    workers = max_workers or min(len(artifacts), (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_run_artifact, artifacts))
+
+
+def print_summary(results: List[Dict[str, Any]], elapsed: Optional[float] = None):
+    """Print one line per artifact, with its renderer's notes, plus a changed/unchanged total."""
+    for result in results:
+        if result['error']:
+            print(f"[ERROR] {result['label']}: {result['path']} ({result['error']})")
+            continue
+        if result.get('removed'):
+            status = 'removed' if result['changed'] else 'already gone'
+        else:
+            status = 'changed' if result['changed'] else 'unchanged'
+        print(f"[SUCCESS] {result['label']}: {result['path']} ({status}, {result['seconds'] * 1000:.1f} ms)")
+        for note in result.get('notes') or ():
+            print(f"  {note}")
+
+    changed = sum(1 for result in results if result['changed'])
+    failed = sum(1 for result in results if result['error'])
+    summary = f"{len(results)} artifact(s): {changed} changed, {len(results) - changed - failed} unchanged"
+    if failed:
+        summary += f", {failed} failed"
+    if elapsed is not None:
+        summary += f" in {elapsed * 1000:.1f} ms"
+    print(summary)
+
+
+def generate_artifacts(artifacts: List[Artifact], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run the pipeline over ``artifacts`` and print its summary."""
+    started = time.perf_counter()
+    results = run_pipeline(artifacts, max_workers)
+    print_summary(results, time.perf_counter() - started)
+    return results
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Differential equivalence checker for generated network policy artifacts.
+Parses FIREWALL_RULES.md and network-policies.yaml back and compares the
+flows they allow with the compiled access matrix.
+
+The reference side is built from the contracts alone: VLAN address sets
+come straight from ipam.yaml and vlans.yaml, never from the generator
+under test, so a generator bug cannot hide itself.
+
+Addresses and ports are handled symbolically: every CIDR and port range
+seen on either side contributes its boundaries, which split the address
+and port spaces into atoms on which both sides are constant. Each side is
+evaluated once per atom, so cost depends on the number of distinct
+prefixes and ports, never on the size of the address space.
+
+Usage:
+    policy_equivalence.py
+    policy_equivalence.py --network-dir infra/network --contracts-dir infra/contracts
+"""
+
+import argparse
+import bisect
+import ipaddress
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+
+from access_matrix import INTERNET, MAX_PORT, AccessMatrix, PortRange, format_ports
+from acl_compiler import ROUTER_DEFAULT, merge_ranges, subtract_ranges
+from contract_store import ContractStore
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# The generator lives here regardless of where its artifacts were written
+GENERATOR_DIR = REPO_ROOT / 'infra' / 'network'
+
+
+# Interval over a combined address space: IPv4 and IPv6 are kept apart by
+# prefixing each value with its version above bit 128.
+Interval = Tuple[int, int]
+
+ALL_PORTS = [(0, MAX_PORT)]
+
+# Access-matrix ports carry no protocol, so they must hold for each of these
+PROTOCOLS = ('TCP', 'UDP')
+
+# Owner of atoms in IPAM networks whose VLAN ID is not in vlans.yaml; the matrix says nothing about them
+UNASSIGNED = '(unassigned)'
+
+_RULE_HEADER = re.compile(r'^###\s+Rule\s+\d+')
+_RULE_FIELD = re.compile(r'^-\s+\*\*(\w+)\*\*:\s*(.*)$')
+
+
+def _cidr_interval(cidr: str) -> Interval:
+    network = ipaddress.ip_network(cidr, strict=False)
+    offset = network.version << 128
+    return offset + int(network.network_address), offset + int(network.broadcast_address)
+
+
+def _family_interval(version: int) -> Interval:
+    bits = 32 if version == 4 else 128
+    return version << 128, (version << 128) + (1 << bits) - 1
+
+
+def _format_interval(interval: Interval) -> str:
+    """Format an interval as its covering CIDRs."""
+    start, end = interval
+    version = start >> 128
+    address_cls = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+    offset = version << 128
+    networks = ipaddress.summarize_address_range(address_cls(start - offset), address_cls(end - offset))
+    return ', '.join(str(network) for network in networks)
+
+
+class AddressSet:
+    """Sorted disjoint address intervals."""
+
+    __slots__ = ('intervals',)
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        merged: List[Interval] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.intervals = merged
+
+    @classmethod
+    def from_cidrs(cls, cidrs: Iterable[str]) -> 'AddressSet':
+        return cls(_cidr_interval(cidr) for cidr in cidrs)
+
+    def subtract(self, other: 'AddressSet') -> 'AddressSet':
+        result = []
+        for start, end in self.intervals:
+            for cut_start, cut_end in other.intervals:
+                if cut_end < start or cut_start > end:
+                    continue
+                if cut_start > start:
+                    result.append((start, cut_start - 1))
+                start = cut_end + 1
+                if start > end:
+                    break
+            if start <= end:
+                result.append((start, end))
+        return AddressSet(result)
+
+    def contains(self, address: int) -> bool:
+        i = bisect.bisect_right(self.intervals, (address, float('inf'))) - 1
+        return i >= 0 and self.intervals[i][0] <= address <= self.intervals[i][1]
+
+    def boundaries(self) -> Iterable[int]:
+        for start, end in self.intervals:
+            yield start
+            yield end + 1
+
+
+def _first_match(entries: List[Tuple[AddressSet, AddressSet, List[PortRange], str]],
+                 src: int, dst: int, default: str) -> List[PortRange]:
+    """Allowed ports for one (src, dst) atom under first-match ``entries``."""
+    undecided: Tuple[PortRange, ...] = tuple(ALL_PORTS)
+    allowed: List[PortRange] = []
+    for sources, destinations, ports, action in entries:
+        if not undecided:
+            break
+        if not sources.contains(src) or not destinations.contains(dst):
+            continue
+        ports = merge_ranges(ports)
+        hit = subtract_ranges(undecided, subtract_ranges(undecided, ports))
+        if action == 'allow':
+            allowed.extend(hit)
+        undecided = subtract_ranges(undecided, ports)
+    if default == 'allow':
+        allowed.extend(undecided)
+    return list(merge_ranges(allowed))
+
+
+def parse_firewall_rules(text: str) -> List[Tuple[AddressSet, AddressSet, List[PortRange], str]]:
+    """Parse FIREWALL_RULES.md into ordered (sources, destinations, ports, action) entries."""
+    entries = []
+    fields: Optional[Dict[str, str]] = None
+
+    def finish():
+        if fields is None:
+            return
+        missing = [name for name in ('source', 'destination', 'service', 'action') if name not in fields]
+        if missing:
+            raise ValueError(f"firewall rule is missing {', '.join(missing)}")
+        destination = fields['destination']
+        destinations = (AddressSet([_family_interval(4), _family_interval(6)]) if destination.lower() == 'any'
+                        else AddressSet.from_cidrs(part.strip() for part in destination.split(',')))
+        service = fields['service']
+        ports = ALL_PORTS if service.lower() == 'any' else _parse_service(service)
+        entries.append((AddressSet.from_cidrs(part.strip() for part in fields['source'].split(',')),
+                        destinations, ports, fields['action'].lower()))
+
+    for line in text.splitlines():
+        if _RULE_HEADER.match(line):
+            finish()
+            fields = {}
+            continue
+        match = _RULE_FIELD.match(line.strip())
+        if match and fields is not None:
+            fields[match.group(1).lower()] = match.group(2).strip()
+    finish()
+    return entries
+
+
+def _parse_service(service: str) -> List[PortRange]:
+    ranges = []
+    for part in service.split(','):
+        low, _, high = part.strip().partition('-')
+        ranges.append((int(low), int(high or low)))
+    return ranges
+
+
+def _policy_peers(peers: Optional[List[Dict[str, Any]]]) -> Optional[AddressSet]:
+    """Addresses matched by a rule's from/to list; None means any peer."""
+    if peers is None:
+        return None
+    intervals = []
+    for peer in peers:
+        block = (peer or {}).get('ipBlock')
+        if block is None:
+            raise ValueError("only ipBlock peers can be compared with the access matrix")
+        allowed = AddressSet.from_cidrs([block['cidr']]).subtract(AddressSet.from_cidrs(block.get('except') or []))
+        intervals.extend(allowed.intervals)
+    return AddressSet(intervals)
+
+
+def _policy_ports(ports: Optional[List[Dict[str, Any]]], protocol: str = 'TCP') -> List[PortRange]:
+    if not ports:
+        return ALL_PORTS
+    ranges = []
+    for entry in ports:
+        if entry.get('protocol', 'TCP') != protocol or 'port' not in entry:
+            continue
+        low = int(entry['port'])
+        ranges.append((low, int(entry.get('endPort', low))))
+    return ranges
+
+
+def _selected_vlans(selector: Dict[str, Any], label: str, vlans: List[str]) -> List[str]:
+    """VLANs whose workloads a podSelector selects via ``label``."""
+    if not selector:
+        return list(vlans)
+    selected = list(vlans)
+    for key, value in (selector.get('matchLabels') or {}).items():
+        if key != label:
+            return []
+        selected = [vlan for vlan in selected if vlan == value]
+    for expression in selector.get('matchExpressions') or []:
+        if expression.get('key') != label or expression.get('operator') != 'In':
+            return []
+        selected = [vlan for vlan in selected if vlan in expression.get('values', [])]
+    return selected
+
+
+def parse_network_policies(documents: List[Dict[str, Any]], label: str, vlans: List[str], protocol: str = 'TCP'):
+    """Collect ingress and egress allow lists per VLAN label value for one protocol.
+
+    Returns ({vlan: [(peers, ports)]} for ingress, the same for egress,
+    and the VLANs isolated per direction by some policy).
+    """
+    ingress: Dict[str, List[Tuple[Optional[AddressSet], List[PortRange]]]] = {}
+    egress: Dict[str, List[Tuple[Optional[AddressSet], List[PortRange]]]] = {}
+    isolated = {'Ingress': set(), 'Egress': set()}
+
+    for document in documents:
+        if not document or document.get('kind') != 'NetworkPolicy':
+            continue
+        spec = document.get('spec') or {}
+        selected = _selected_vlans(spec.get('podSelector') or {}, label, vlans)
+        types = spec.get('policyTypes') or ['Ingress'] + (['Egress'] if 'egress' in spec else [])
+        for policy_type in types:
+            isolated[policy_type].update(selected)
+        for direction, table, peer_key in (('ingress', ingress, 'from'), ('egress', egress, 'to')):
+            for rule in spec.get(direction) or []:
+                peers = _policy_peers(rule.get(peer_key))
+                ports = _policy_ports(rule.get('ports'), protocol)
+                for vlan in selected:
+                    table.setdefault(vlan, []).append((peers, ports))
+    return ingress, egress, isolated
+
+
+def _allowed_by_policies(rules: List[Tuple[Optional[AddressSet], List[PortRange]]], peer: int) -> List[PortRange]:
+    ports: List[PortRange] = []
+    for peers, rule_ports in rules:
+        if peers is None or peers.contains(peer):
+            ports.extend(rule_ports)
+    return list(merge_ranges(ports))
+
+
+class EquivalenceChecker:
+    """Compare generated artifacts with a compiled ``AccessMatrix``.
+
+    Source addresses are the VLAN CIDRs; destination addresses cover every
+    address family IPAM uses, and anything outside the IPAM networks is
+    ``internet``. Networks whose VLAN ID has no VLAN are not compared.
+    Intra-VLAN flows are compared for NetworkPolicies, which apply to
+    pod-to-pod traffic, but not for the firewall, which never sees
+    switched traffic.
+    """
+
+    def __init__(self, matrix: AccessMatrix, vlan_cidrs: Dict[str, List[str]], unassigned: Iterable[str] = ()):
+        self.matrix = matrix
+        self.vlan_cidrs = vlan_cidrs
+        self.vlan_sets = {vlan: AddressSet.from_cidrs(cidrs) for vlan, cidrs in vlan_cidrs.items()}
+        self.unassigned = AddressSet.from_cidrs(unassigned)
+        all_cidrs = [cidr for cidrs in vlan_cidrs.values() for cidr in cidrs] + list(unassigned)
+        versions = sorted({ipaddress.ip_network(cidr, strict=False).version for cidr in all_cidrs})
+        self.universe = AddressSet(_family_interval(version) for version in versions)
+
+    def _atoms(self, extra: Iterable[AddressSet]) -> List[Tuple[Interval, str]]:
+        """Split the address universe at every boundary; label each atom with its VLAN."""
+        bounds = set(self.universe.boundaries())
+        for address_set in list(self.vlan_sets.values()) + list(extra):
+            bounds.update(address_set.boundaries())
+        points = sorted(bounds)
+        atoms = []
+        for start, stop in zip(points, points[1:]):
+            if not self.universe.contains(start):
+                continue
+            owner = next((vlan for vlan, vlan_set in self.vlan_sets.items() if vlan_set.contains(start)), None)
+            if owner is None:
+                owner = UNASSIGNED if self.unassigned.contains(start) else INTERNET
+            atoms.append(((start, stop - 1), owner))
+        return atoms
+
+    def _compare(self, artifact: str, src_atom, dst_atom, expected: List[PortRange],
+                 actual: List[PortRange], findings: List[Dict[str, Any]]):
+        expected = list(merge_ranges(expected))
+        if actual == expected:
+            return
+        (src_interval, src_vlan), (dst_interval, dst_vlan) = src_atom, dst_atom
+        for ports, matrix_action in ((subtract_ranges(tuple(actual), tuple(expected)), 'deny'),
+                                     (subtract_ranges(tuple(expected), tuple(actual)), 'allow')):
+            if ports:
+                findings.append({
+                    'artifact': artifact,
+                    'source': src_vlan,
+                    'destination': dst_vlan,
+                    'source_cidrs': _format_interval(src_interval),
+                    'destination_cidrs': _format_interval(dst_interval),
+                    'ports': list(ports),
+                    'matrix': matrix_action,
+                })
+
+    def check_firewall(self, entries: List[Tuple[AddressSet, AddressSet, List[PortRange], str]],
+                       default: str = ROUTER_DEFAULT) -> List[Dict[str, Any]]:
+        """Disagreements between an ordered ACL and the matrix."""
+        findings: List[Dict[str, Any]] = []
+        atoms = self._atoms(address_set for entry in entries for address_set in entry[:2])
+        for src_atom in atoms:
+            if src_atom[1] in (INTERNET, UNASSIGNED):
+                continue
+            # Entries that can never match this source are dropped once per atom
+            candidates = [entry for entry in entries if entry[0].contains(src_atom[0][0])]
+            for dst_atom in atoms:
+                # Intra-VLAN traffic is switched and never reaches the router's ACL
+                if dst_atom[1] in (src_atom[1], UNASSIGNED):
+                    continue
+                expected = self.matrix.allowed_ports(src_atom[1], dst_atom[1])
+                actual = _first_match(candidates, src_atom[0][0], dst_atom[0][0], default)
+                self._compare('FIREWALL_RULES.md', src_atom, dst_atom, expected, actual, findings)
+        return findings
+
+    def check_network_policies(self, documents: List[Dict[str, Any]], label: str) -> List[Dict[str, Any]]:
+        """Disagreements between NetworkPolicies and the matrix, per direction.
+
+        A VLAN's workloads must be able to send exactly what the matrix
+        allows from that VLAN (egress), including to its own VLAN, and
+        receive exactly what it allows into that VLAN (ingress), for every
+        protocol in PROTOCOLS.
+        """
+        findings: List[Dict[str, Any]] = []
+        for protocol in PROTOCOLS:
+            findings += self._check_protocol(documents, label, protocol)
+        return findings
+
+    def _check_protocol(self, documents: List[Dict[str, Any]], label: str, protocol: str) -> List[Dict[str, Any]]:
+        findings: List[Dict[str, Any]] = []
+        vlans = list(self.vlan_cidrs)
+        ingress, egress, isolated = parse_network_policies(documents, label, vlans, protocol)
+        peer_sets = [peers for table in (ingress, egress) for rules in table.values()
+                     for peers, _ in rules if peers is not None]
+        atoms = self._atoms(peer_sets)
+
+        # NetworkPolicy ports start at 1, so port 0 is not compared
+        no_port_zero = ((0, 0),)
+
+        def allowed(ports):
+            return list(subtract_ranges(merge_ranges(ports), no_port_zero))
+
+        for src_atom in atoms:
+            for dst_atom in atoms:
+                src_vlan, dst_vlan = src_atom[1], dst_atom[1]
+                if UNASSIGNED in (src_vlan, dst_vlan):
+                    continue
+                if src_vlan != INTERNET:
+                    expected = self.matrix.allowed_ports(src_vlan, dst_vlan)
+                    actual = (_allowed_by_policies(egress.get(src_vlan, []), dst_atom[0][0])
+                              if src_vlan in isolated['Egress'] else ALL_PORTS)
+                    self._compare(f'network-policies.yaml (egress, {protocol})', src_atom, dst_atom,
+                                  allowed(expected), allowed(actual), findings)
+                if dst_vlan != INTERNET and src_vlan != INTERNET:
+                    expected = self.matrix.allowed_ports(src_vlan, dst_vlan)
+                    actual = (_allowed_by_policies(ingress.get(dst_vlan, []), src_atom[0][0])
+                              if dst_vlan in isolated['Ingress'] else ALL_PORTS)
+                    self._compare(f'network-policies.yaml (ingress, {protocol})', src_atom, dst_atom,
+                                  allowed(expected), allowed(actual), findings)
+        return findings
+
+
+def format_finding(finding: Dict[str, Any]) -> str:
+    """Render a disagreement as a one-line message."""
+    artifact_action = 'allows' if finding['matrix'] == 'deny' else 'denies'
+    return (f"{finding['artifact']}: {finding['source']} ({finding['source_cidrs']}) -> "
+            f"{finding['destination']} ({finding['destination_cidrs']}) ports {format_ports(finding['ports'])}: "
+            f"artifact {artifact_action}, access matrix says {finding['matrix']}")
+
+
+def contract_cidrs(vlans_data: Dict[str, Any], ipam_data: Dict[str, Any]) -> Tuple[Dict[str, List[str]], List[str]]:
+    """Map each VLAN to every IPAM CIDR with its VLAN ID, straight from the contracts.
+
+    Returns the mapping and the CIDRs of networks whose VLAN ID has no VLAN.
+    Networks with an invalid CIDR are skipped; the validator reports them.
+    """
+    names_by_id: Dict[Any, List[str]] = {}
+    for name, config in ((vlans_data or {}).get('vlans') or {}).items():
+        if config and 'id' in config:
+            names_by_id.setdefault(config['id'], []).append(name)
+    vlan_cidrs: Dict[str, List[str]] = {}
+    unassigned: List[str] = []
+    for config in ((ipam_data or {}).get('networks') or {}).values():
+        config = config or {}
+        try:
+            cidr = str(ipaddress.ip_network(config.get('cidr'), strict=False))
+        except (TypeError, ValueError):
+            continue
+        names = names_by_id.get(config.get('vlan_id'))
+        if not names:
+            unassigned.append(cidr)
+        for name in names or ():
+            vlan_cidrs.setdefault(name, []).append(cidr)
+    return vlan_cidrs, unassigned
+
+
+def _load_contract(store: ContractStore, filename: str) -> Dict[str, Any]:
+    return store.load(filename) if store.exists(filename) else {}
+
+
+def check(contracts_dir: Path, network_dir: Path, store=None) -> Tuple[List[Dict[str, Any]], float]:
+    """Check both generated artifacts in ``network_dir``; returns (findings, elapsed seconds)."""
+    import yaml
+    if str(GENERATOR_DIR) not in sys.path:
+        sys.path.insert(0, str(GENERATOR_DIR))
+    from generate_network_config import POLICY_VLAN_LABEL
+
+    started = time.perf_counter()
+    store = store or ContractStore.shared(contracts_dir)
+    vlans_data = _load_contract(store, 'vlans.yaml')
+    vlan_cidrs, unassigned = contract_cidrs(vlans_data, _load_contract(store, 'ipam.yaml'))
+    matrix = AccessMatrix.compile(_load_contract(store, 'access-matrix.yaml').get('access_matrix') or [],
+                                  vlans_data.get('vlans') or {})
+    checker = EquivalenceChecker(matrix, vlan_cidrs, unassigned)
+
+    findings = []
+    firewall_path = network_dir / 'FIREWALL_RULES.md'
+    policies_path = network_dir / 'network-policies.yaml'
+    if not firewall_path.exists() and not policies_path.exists():
+        raise ValueError(f"no FIREWALL_RULES.md or network-policies.yaml in {network_dir}")
+    if firewall_path.exists():
+        findings += checker.check_firewall(parse_firewall_rules(firewall_path.read_text(encoding='utf-8')))
+    if policies_path.exists():
+        with open(policies_path, 'r', encoding='utf-8') as f:
+            documents = list(yaml.load_all(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)))
+        findings += checker.check_network_policies(documents, POLICY_VLAN_LABEL)
+    return findings, time.perf_counter() - started
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Compare generated network artifacts with the access matrix."""
+    parser = argparse.ArgumentParser(description="Check generated network policies against the access matrix")
+    parser.add_argument('--contracts-dir', type=Path, default=REPO_ROOT / 'infra' / 'contracts',
+                        help="Directory containing the contract files")
+    parser.add_argument('--network-dir', type=Path, default=REPO_ROOT / 'infra' / 'network',
+                        help="Directory containing the generated network artifacts")
+    args = parser.parse_args(argv)
+
+    try:
+        findings, elapsed = check(args.contracts_dir.resolve(), args.network_dir.resolve())
+    except (KeyError, ValueError) as e:
+        print(f"[ERROR] Could not parse generated artifacts: {e}")
+        return 2
+
+    for finding in findings:
+        print(f"[ERROR] {format_finding(finding)}")
+    if findings:
+        print(f"\n[ERROR] {len(findings)} flow disagreement(s) found in {elapsed * 1000:.1f} ms")
+        return 1
+    print(f"[SUCCESS] Generated network policies match the access matrix ({elapsed * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,48 +5,116 @@ Validates consistency across VLAN, IPAM, DNS, and access matrix contracts.
 """
 
 import yaml
+import argparse
 import ipaddress
 import sys
+import time
 from pathlib import Path
-from typing import Dict, List, Set, Any
+from typing import Dict, List, Set, Any, Optional
+
+from access_matrix import AccessMatrix, parse_ports
+from contract_model import (INVALID, dns_model, format_ip, ipam_model, normalize_name, parse_ip, parse_range,
+                            qualify_name, reservation_table)
+from contract_store import ContractStore
+from dns_index import ZoneIndex, zone_index
+from ipam_index import IPAMIndex
+from validation_cache import ValidationCache, hash_files, stage_key
+from validation_report import (Key, MetricsHook, build_report, count_records, default_hooks, jsonl_hook,
+                               make_finding, metrics_record, print_profile, write_report)
+
+
+# Validation stages in run order: (stage, owned contract file, upstream stages, progress label).
+# A stage reruns only when its own file, an upstream stage or the validator code changes.
+STAGES = [
+    ('vlans', 'vlans.yaml', [], "Validating VLANs..."),
+    ('ipam', 'ipam.yaml', ['vlans'], "Validating IPAM..."),
+    ('dns', 'dns-zones.yaml', ['ipam'], "Validating DNS zones..."),
+    ('access', 'access-matrix.yaml', ['vlans'], "Validating access matrix..."),
+    ('platform', 'platform.yaml', [], "Validating platform configuration..."),
+]
+
+# Source files whose changes invalidate every cached result
+CODE_FILES = ['validate_contracts.py', 'ipam_index.py', 'access_matrix.py', 'validation_cache.py', 'contract_store.py',
+              'contract_model.py', 'validation_report.py', 'dns_index.py']
+
+DEFAULT_CACHE_FILE = Path(__file__).parent.parent.parent / '.cache' / 'validate_contracts.json'
+
+
+def normalize_fqdn(name: str, zone: str = '') -> str:
+    """Normalize a record or host name to a lowercase FQDN without trailing dot."""
+    zone = normalize_name(zone)
+    return qualify_name(name, zone) if zone else normalize_name(name)
+
+
+def _in_zones(fqdn: str, zones: Set[str]) -> bool:
+    """Check whether an FQDN falls under any of the given zones."""
+    labels = fqdn.split('.')
+    return any('.'.join(labels[i:]) in zones for i in range(len(labels)))
 
 
 class ContractValidator:
-    def __init__(self, contracts_dir: Path):
+    def __init__(self, contracts_dir: Path, store: Optional[ContractStore] = None):
         self.contracts_dir = contracts_dir
+        self.store = store or ContractStore.shared(contracts_dir)
         self.errors = []
         self.warnings = []
+        self.findings: List[Dict[str, Any]] = []
+        self.stages: List[Dict[str, Any]] = []
+        self.hooks: List[MetricsHook] = default_hooks()
+        self.elapsed = 0.0
+        self.ipam_index = IPAMIndex()
+        self.access_matrix = None
+        self._current_file: Optional[str] = None
+        self._load_seconds = 0.0
+        self._records = 0
+    
+    def error(self, message: str, key: Key = (), file: Optional[str] = None):
+        """Record an error against ``key`` in the current stage's contract (or ``file``)."""
+        self.errors.append(message)
+        self.findings.append(make_finding('error', message, file or self._current_file, key))
+    
+    def warning(self, message: str, key: Key = (), file: Optional[str] = None):
+        """Record a warning against ``key`` in the current stage's contract (or ``file``)."""
+        self.warnings.append(message)
+        self.findings.append(make_finding('warning', message, file or self._current_file, key))
+    
+    def add_hook(self, hook: MetricsHook):
+        """Register a callable that receives each run's metrics (see validation_report.metrics_record)."""
+        self.hooks.append(hook)
         
     def load_yaml(self, filename: str) -> Dict[str, Any]:
-        """Load a YAML file and return its contents."""
-        filepath = self.contracts_dir / filename
-        if not filepath.exists():
-            self.errors.append(f"Missing contract file: {filename}")
+        """Load a YAML file through the shared contract store."""
+        if not self.store.exists(filename):
+            self.error(f"Missing contract file: {filename}", file=filename)
             return {}
         
+        started = time.perf_counter()
         try:
-            with open(filepath, 'r') as f:
-                return yaml.safe_load(f) or {}
+            data = self.store.load(filename)
         except yaml.YAMLError as e:
-            self.errors.append(f"Invalid YAML in {filename}: {e}")
+            self.error(f"Invalid YAML in {filename}: {e}", file=filename)
             return {}
+        finally:
+            self._load_seconds += time.perf_counter() - started
+        self._records += count_records(filename, data)
+        return data
     
     def validate_vlans(self, vlans_data: Dict[str, Any]) -> Dict[str, Dict]:
         """Validate VLAN definitions and return normalized VLAN data."""
         vlans = {}
         
         if 'vlans' not in vlans_data:
-            self.errors.append("vlans.yaml: Missing 'vlans' key")
+            self.error("vlans.yaml: Missing 'vlans' key")
             return vlans
         
         for vlan_name, vlan_config in vlans_data['vlans'].items():
             if 'id' not in vlan_config:
-                self.errors.append(f"VLAN '{vlan_name}': Missing 'id' field")
+                self.error(f"VLAN '{vlan_name}': Missing 'id' field", ('vlans', vlan_name))
                 continue
             
             vlan_id = vlan_config['id']
             if vlan_id in [v['id'] for v in vlans.values()]:
-                self.errors.append(f"VLAN '{vlan_name}': Duplicate VLAN ID {vlan_id}")
+                self.error(f"VLAN '{vlan_name}': Duplicate VLAN ID {vlan_id}", ('vlans', vlan_name, 'id'))
             
             vlans[vlan_name] = {
                 'id': vlan_id,
@@ -62,160 +130,331 @@ class ContractValidator:
         networks = {}
         
         if 'networks' not in ipam_data:
-            self.errors.append("ipam.yaml: Missing 'networks' key")
+            self.error("ipam.yaml: Missing 'networks' key")
             return networks
         
         # Build VLAN ID to name mapping
         vlan_id_to_name = {v['id']: name for name, v in vlans.items()}
+        ipam = ipam_model(ipam_data)
         
         for network_name, network_config in ipam_data['networks'].items():
             if 'vlan_id' not in network_config:
-                self.errors.append(f"Network '{network_name}': Missing 'vlan_id' field")
+                self.error(f"Network '{network_name}': Missing 'vlan_id' field", ('networks', network_name))
                 continue
             
             vlan_id = network_config['vlan_id']
             if vlan_id not in vlan_id_to_name:
-                self.errors.append(f"Network '{network_name}': VLAN ID {vlan_id} not defined in vlans.yaml")
+                self.error(f"Network '{network_name}': VLAN ID {vlan_id} not defined in vlans.yaml",
+                           ('networks', network_name, 'vlan_id'))
             
             # Validate CIDR
             if 'cidr' not in network_config:
-                self.errors.append(f"Network '{network_name}': Missing 'cidr' field")
+                self.error(f"Network '{network_name}': Missing 'cidr' field", ('networks', network_name))
                 continue
             
-            try:
-                cidr = ipaddress.ip_network(network_config['cidr'], strict=False)
-            except ValueError as e:
-                self.errors.append(f"Network '{network_name}': Invalid CIDR '{network_config['cidr']}': {e}")
+            network = ipam.networks.get(network_name)
+            if network is None:
+                try:
+                    ipaddress.ip_network(network_config['cidr'], strict=False)
+                except (TypeError, ValueError) as e:
+                    self.error(f"Network '{network_name}': Invalid CIDR '{network_config['cidr']}': {e}",
+                               ('networks', network_name, 'cidr'))
                 continue
             
+            # Validate optional reserved_ranges: CIDRs, single IPs or first-last ranges
+            reserved_ranges = network_config.get('reserved_ranges')
+            if reserved_ranges is not None and not isinstance(reserved_ranges, list):
+                self.error(f"Network '{network_name}': 'reserved_ranges' must be a list",
+                           ('networks', network_name, 'reserved_ranges'))
+            else:
+                for position, entry in enumerate(reserved_ranges or []):
+                    range_version, first, last = parse_range(entry)
+                    if first == INVALID:
+                        self.error(f"Network '{network_name}': Invalid reserved range '{entry}'",
+                                   ('networks', network_name, 'reserved_ranges', position))
+                    elif not (network.contains(range_version, first) and network.contains(range_version, last)):
+                        self.error(f"Network '{network_name}': Reserved range '{entry}' not in CIDR {network.cidr}",
+                                   ('networks', network_name, 'reserved_ranges', position))
+            
             # Validate gateway
             if 'gateway' not in network_config:
-                self.errors.append(f"Network '{network_name}': Missing 'gateway' field")
+                self.error(f"Network '{network_name}': Missing 'gateway' field", ('networks', network_name))
                 continue
             
-            try:
-                gateway = ipaddress.ip_address(network_config['gateway'])
-                if gateway not in cidr:
-                    self.errors.append(f"Network '{network_name}': Gateway {gateway} not in CIDR {cidr}")
-            except ValueError as e:
-                self.errors.append(f"Network '{network_name}': Invalid gateway '{network_config['gateway']}': {e}")
+            gateway_version, gateway = parse_ip(network_config['gateway'])
+            if gateway == INVALID:
+                try:
+                    ipaddress.ip_address(network_config['gateway'])
+                except ValueError as e:
+                    self.error(f"Network '{network_name}': Invalid gateway '{network_config['gateway']}': {e}",
+                               ('networks', network_name, 'gateway'))
+            elif not network.contains(gateway_version, gateway):
+                self.error(
+                    f"Network '{network_name}': Gateway {format_ip(gateway_version, gateway)} not in CIDR {network.cidr}",
+                    ('networks', network_name, 'gateway')
+                )
             
             networks[network_name] = {
                 'vlan_id': vlan_id,
-                'cidr': str(cidr),
+                'cidr': network.cidr,
                 'gateway': network_config['gateway'],
                 'vlan_name': vlan_id_to_name.get(vlan_id)
             }
         
-        # Validate reservations
+        # Index networks once and detect overlapping CIDRs by sort-and-sweep
+        self.ipam_index = IPAMIndex.from_model(ipam, networks)
+        for outer, inner in self.ipam_index.find_overlaps():
+            self.error(
+                f"Network '{inner}': CIDR {networks[inner]['cidr']} overlaps network '{outer}' ({networks[outer]['cidr']})",
+                ('networks', inner, 'cidr')
+            )
+
+        # An IPv4 and an IPv6 prefix per VLAN is dual-stack; two of one family is worth a look
+        by_vlan: Dict[Any, List[str]] = {}
+        for network_name, network_info in networks.items():
+            family = ipam.networks[network_name].version
+            by_vlan.setdefault((network_info['vlan_id'], family), []).append(network_name)
+        for (vlan_id, family), names in by_vlan.items():
+            if len(names) > 1:
+                self.warning(
+                    f"Network '{names[-1]}': VLAN ID {vlan_id} carries several IPv{family} networks "
+                    f"({', '.join(names)}); generators use all of them",
+                    ('networks', names[-1], 'vlan_id')
+                )
+
+        # Validate reservations; table rows follow the contract order
         if 'reservations' in ipam_data:
-            for res_name, res_config in ipam_data['reservations'].items():
+            table = ipam.reservations
+            for row, (res_name, res_config) in enumerate(ipam_data['reservations'].items()):
                 if 'ip' not in res_config:
-                    self.errors.append(f"Reservation '{res_name}': Missing 'ip' field")
+                    self.error(f"Reservation '{res_name}': Missing 'ip' field", ('reservations', res_name))
                     continue
                 
                 if 'vlan' not in res_config:
-                    self.errors.append(f"Reservation '{res_name}': Missing 'vlan' field")
+                    self.error(f"Reservation '{res_name}': Missing 'vlan' field", ('reservations', res_name))
                     continue
                 
-                try:
-                    ip = ipaddress.ip_address(res_config['ip'])
-                except ValueError as e:
-                    self.errors.append(f"Reservation '{res_name}': Invalid IP '{res_config['ip']}': {e}")
+                ip = (table.versions[row], table.ips[row])
+                if ip[1] == INVALID:
+                    try:
+                        ipaddress.ip_address(res_config['ip'])
+                    except ValueError as e:
+                        self.error(f"Reservation '{res_name}': Invalid IP '{res_config['ip']}': {e}",
+                                   ('reservations', res_name, 'ip'))
                     continue
                 
                 vlan_ref = res_config['vlan']
                 if vlan_ref not in networks:
-                    self.errors.append(f"Reservation '{res_name}': VLAN reference '{vlan_ref}' not found in networks")
+                    self.error(f"Reservation '{res_name}': VLAN reference '{vlan_ref}' not found in networks",
+                               ('reservations', res_name, 'vlan'))
                     continue
                 
-                network_cidr = ipaddress.ip_network(networks[vlan_ref]['cidr'])
-                if ip not in network_cidr:
-                    self.errors.append(f"Reservation '{res_name}': IP {ip} not in network CIDR {network_cidr}")
+                if not self.ipam_index.contains(vlan_ref, ip):
+                    owner = self.ipam_index.lookup(ip)
+                    hint = f" (belongs to '{owner}')" if owner else ""
+                    self.error(
+                        f"Reservation '{res_name}': IP {table.ip(row)} not in network CIDR {networks[vlan_ref]['cidr']}{hint}",
+                        ('reservations', res_name, 'ip')
+                    )
         
         return networks
     
     def validate_dns(self, dns_data: Dict[str, Any], networks: Dict[str, Dict], 
-                     reservations: Dict[str, Dict]) -> Dict[str, List]:
-        """Validate DNS zones and check consistency with IPAM."""
+                     reservations: Dict[str, Dict]) -> Dict[str, ZoneIndex]:
+        """Validate DNS zones and check consistency with IPAM.
+        
+        Each zone's records are indexed once by normalized (FQDN, type); the
+        structural checks run on that index, and reservations and A/AAAA
+        records are hash-joined on normalized IP and FQDN, so everything is
+        linear in records + reservations. Returns the index of each zone.
+        """
         dns_records = {}
         
         if 'zones' not in dns_data:
-            self.errors.append("dns-zones.yaml: Missing 'zones' key")
+            self.error("dns-zones.yaml: Missing 'zones' key")
             return dns_records
         
-        # Build IP to reservation mapping
-        ip_to_reservation = {}
-        if reservations:
-            for res_name, res_config in reservations.items():
-                if 'ip' in res_config:
-                    ip_to_reservation[res_config['ip']] = res_name
-        
-        for zone in dns_data['zones']:
-            zone_name = zone.get('name', 'unknown')
-            if zone_name not in dns_records:
-                dns_records[zone_name] = []
+        # Join tables are hash indexes over the reservation columns:
+        # (version, int IP) -> rows and normalized hostname -> row
+        table = reservation_table(reservations or {})
+        matched_reservations = set()
+        zone_names = set()
+        
+        for zone_index_number, (zone_raw, zone) in enumerate(zip(dns_data['zones'], dns_model(dns_data).zones)):
+            zone_name = zone_raw.get('name', 'unknown')
+            zone_names.add(normalize_fqdn(zone_name))
             
-            if 'records' not in zone:
-                self.warnings.append(f"Zone '{zone_name}': No records defined")
+            if not zone.has_records:
+                self.warning(f"Zone '{zone_name}': No records defined", ('zones', zone_index_number))
                 continue
             
-            for record in zone['records']:
-                if record.get('type') == 'A':
-                    ip = record.get('value')
-                    if not ip:
-                        self.errors.append(f"Zone '{zone_name}': Record '{record.get('name')}' missing IP value")
-                        continue
-                    
+            index = dns_records[zone_name] = zone_index(zone)
+            self._check_zone_index(zone_name, zone_index_number, index)
+            
+            for record_index, (name, record_type, value, version, ip_value) in enumerate(
+                    zip(zone.names, index.types, zone.values, zone.versions, zone.ips)):
+                if record_type not in ('A', 'AAAA'):
+                    continue
+                record_key = ('zones', zone_index_number, 'records', record_index)
+                
+                if not value:
+                    self.error(f"Zone '{zone_name}': Record '{name}' missing IP value", record_key)
+                    continue
+                
+                if ip_value == INVALID:
+                    version, ip_value = parse_ip(value)
+                if ip_value == INVALID or (version == 4) != (record_type == 'A'):
                     try:
-                        ipaddress.ip_address(ip)
+                        address = ipaddress.ip_address(value)
                     except ValueError as e:
-                        self.errors.append(f"Zone '{zone_name}': Record '{record.get('name')}' has invalid IP '{ip}': {e}")
-                        continue
-                    
-                    # Check if IP matches a reservation
-                    if ip not in ip_to_reservation.values() and ip not in [r.get('ip') for r in reservations.values()]:
-                        self.warnings.append(f"Zone '{zone_name}': Record '{record.get('name')}' IP {ip} not found in IPAM reservations")
+                        self.error(f"Zone '{zone_name}': Record '{name}' has invalid IP '{value}': {e}",
+                                   record_key + ('value',))
+                    else:
+                        self.error(f"Zone '{zone_name}': {record_type} record '{name}' holds IPv{address.version} "
+                                   f"address {value}", record_key + ('value',))
+                    continue
+                
+                ip = format_ip(version, ip_value)
+                if networks and self.ipam_index.lookup((version, ip_value)) is None:
+                    self.warning(f"Zone '{zone_name}': Record '{name}' IP {ip} not within any IPAM network",
+                                     record_key + ('value',))
+                
+                fqdn = index.fqdns[record_index] or index.zone
+                by_name = table.row_for_hostname(fqdn)
+                by_ip = table.rows_for_ip(version, ip_value)
+                
+                if by_name is None and not by_ip:
+                    self.warning(f"Zone '{zone_name}': Record '{name}' IP {ip} not found in IPAM reservations",
+                                     record_key)
+                    continue
+                
+                if by_name is not None:
+                    res_name = table.names[by_name]
+                    matched_reservations.add(res_name)
+                    if table.ips[by_name] != ip_value or table.versions[by_name] != version:
+                        self.error(
+                            f"Zone '{zone_name}': Record '{name}' resolves to {ip} "
+                            f"but reservation '{res_name}' reserves {table.ip(by_name)} for {fqdn}",
+                            record_key + ('value',)
+                        )
+                
+                if by_ip:
+                    for row in by_ip:
+                        matched_reservations.add(table.names[row])
+                    if by_name is None:
+                        owners = ', '.join(
+                            f"'{table.names[row]}' ({normalize_fqdn(table.hostnames[row] or '') or 'no hostname'})"
+                            for row in by_ip
+                        )
+                        self.warning(
+                            f"Zone '{zone_name}': Record '{name}' IP {ip} is reserved for {owners}, "
+                            f"not {fqdn}",
+                            record_key
+                        )
+        
+        # Reverse direction: reservations inside a defined zone with no record
+        for hostname, row in table.hostname_rows():
+            res_name = table.names[row]
+            if res_name in matched_reservations:
+                continue
+            if _in_zones(hostname, zone_names):
+                self.warning(f"Reservation '{res_name}': Hostname {hostname} ({table.ip(row)}) has no DNS record",
+                             ('reservations', res_name, 'hostname'), file='ipam.yaml')
         
         return dns_records
     
+    def _check_zone_index(self, zone_name: str, zone_number: int, index: ZoneIndex):
+        """Report structural problems found by a zone's record index."""
+        names = index.records.names
+        
+        def key(row):
+            return ('zones', zone_number, 'records', row)
+        
+        for row in index.double_suffixed:
+            self.error(f"Zone '{zone_name}': Record '{names[row]}' repeats the zone suffix ({index.fqdns[row]})",
+                       key(row) + ('name',))
+        
+        for row in index.out_of_zone:
+            self.error(f"Zone '{zone_name}': Record '{names[row]}' is out-of-zone data ({index.fqdns[row]} "
+                       f"is not in {index.zone})", key(row) + ('name',))
+        
+        for fqdn, record_type, groups in index.duplicates():
+            for rows in groups:
+                if len(rows) > 1:
+                    self.error(f"Zone '{zone_name}': Duplicate {record_type} record {fqdn} -> {index.value(rows[0])} "
+                               f"({len(rows)} times)", key(rows[1]))
+            if len(groups) > 1:
+                values = ', '.join(index.value(rows[0]) for rows in groups)
+                message = f"Zone '{zone_name}': {fqdn} has {len(groups)} {record_type} records ({values})"
+                if record_type == 'CNAME':
+                    self.error(message, key(groups[1][0]))
+                else:
+                    self.warning(message, key(groups[1][0]))
+        
+        for fqdn, types, rows in index.cname_conflicts():
+            self.error(f"Zone '{zone_name}': CNAME {fqdn} shares its name with {', '.join(types)} data",
+                       key(rows[0]))
+        
+        for row in index.untyped:
+            if names[row]:
+                self.warning(f"Zone '{zone_name}': Record '{names[row]}' has no type; assuming A", key(row))
+    
     def validate_access_matrix(self, access_data: Dict[str, Any], vlans: Dict[str, Dict]):
-        """Validate access matrix rules reference valid VLANs."""
+        """Validate access matrix rules and compile them into a decision table."""
         if 'access_matrix' not in access_data:
-            self.errors.append("access-matrix.yaml: Missing 'access_matrix' key")
+            self.error("access-matrix.yaml: Missing 'access_matrix' key")
             return
         
         vlan_names = set(vlans.keys())
         vlan_names.add('*')  # Wildcard is valid
         vlan_names.add('internet')  # Internet is a special target
         
-        for rule in access_data['access_matrix']:
+        for rule_index, rule in enumerate(access_data['access_matrix']):
             if 'from' not in rule:
-                self.errors.append(f"Access rule: Missing 'from' field")
+                self.error(f"Access rule: Missing 'from' field", ('access_matrix', rule_index))
                 continue
             
             if 'to' not in rule:
-                self.errors.append(f"Access rule: Missing 'to' field")
+                self.error(f"Access rule: Missing 'to' field", ('access_matrix', rule_index))
                 continue
             
             from_vlan = rule['from']
             to_vlan = rule['to']
             
             if from_vlan not in vlan_names:
-                self.errors.append(f"Access rule: Invalid 'from' VLAN '{from_vlan}'")
+                self.error(f"Access rule: Invalid 'from' VLAN '{from_vlan}'", ('access_matrix', rule_index, 'from'))
             
             if to_vlan not in vlan_names:
-                self.errors.append(f"Access rule: Invalid 'to' VLAN '{to_vlan}'")
+                self.error(f"Access rule: Invalid 'to' VLAN '{to_vlan}'", ('access_matrix', rule_index, 'to'))
             
             if 'action' not in rule:
-                self.errors.append(f"Access rule: Missing 'action' field")
+                self.error(f"Access rule: Missing 'action' field", ('access_matrix', rule_index))
             elif rule['action'] not in ['allow', 'deny']:
-                self.errors.append(f"Access rule: Invalid action '{rule['action']}' (must be 'allow' or 'deny')")
+                self.error(f"Access rule: Invalid action '{rule['action']}' (must be 'allow' or 'deny')",
+                           ('access_matrix', rule_index, 'action'))
+            
+            try:
+                parse_ports(rule.get('ports'))
+            except ValueError as e:
+                self.error(f"Access rule {from_vlan} -> {to_vlan}: {e}", ('access_matrix', rule_index, 'ports'))
+        
+        # Compile once; downstream checks and generators query the table
+        self.access_matrix = AccessMatrix.compile(access_data['access_matrix'], vlans)
+        
+        # Shadowed rules never take effect; partial shadowing is the usual
+        # "specific exception before a broad rule" idiom and is left to
+        # access_matrix.py --analyze
+        findings, _ = self.access_matrix.analyze()
+        for finding in findings:
+            if finding['kind'] == 'shadowed':
+                self.error(self.access_matrix.format_finding(finding), ('access_matrix', finding['rule']))
+            elif finding['kind'] == 'redundant':
+                self.warning(self.access_matrix.format_finding(finding), ('access_matrix', finding['rule']))
     
     def validate_platform(self, platform_data: Dict[str, Any]):
         """Validate platform configuration."""
         if 'platform' not in platform_data:
-            self.errors.append("platform.yaml: Missing 'platform' key")
+            self.error("platform.yaml: Missing 'platform' key")
             return
         
         platform = platform_data['platform']
@@ -225,33 +464,97 @@ class ContractValidator:
             if 'primary_node' in k8s:
                 node_name = k8s['primary_node']
                 if not node_name.endswith('.home.internal'):
-                    self.warnings.append(f"Platform: Kubernetes primary_node '{node_name}' doesn't match expected domain pattern")
+                    self.warning(f"Platform: Kubernetes primary_node '{node_name}' doesn't match expected domain pattern",
+                                 ('platform', 'kubernetes', 'primary_node'))
     
-    def validate_all(self) -> bool:
-        """Run all validation checks."""
-        print("Loading contract files...")
+    def stage_keys(self) -> Dict[str, str]:
+        """Compute each stage's cache key from content hashes of its inputs."""
+        code_hash = hash_files([Path(__file__).parent / name for name in CODE_FILES])
+        keys = {}
+        for stage, filename, deps, _ in STAGES:
+            digest = self.store.digest(filename) or 'missing'
+            keys[stage] = stage_key(code_hash, stage, digest, *[keys[dep] for dep in deps])
+        return keys
+    
+    def run_stage(self, stage: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one validation stage and return the state it exposes downstream."""
+        if stage == 'vlans':
+            return {'vlans': self.validate_vlans(self.load_yaml('vlans.yaml'))}
+        
+        if stage == 'ipam':
+            ipam_data = self.load_yaml('ipam.yaml')
+            networks = self.validate_ipam(ipam_data, state['vlans'])
+            return {'networks': networks, 'reservations': ipam_data.get('reservations', {})}
         
-        vlans_data = self.load_yaml('vlans.yaml')
-        ipam_data = self.load_yaml('ipam.yaml')
-        dns_data = self.load_yaml('dns-zones.yaml')
-        access_data = self.load_yaml('access-matrix.yaml')
-        platform_data = self.load_yaml('platform.yaml')
+        if stage == 'dns':
+            # IPAM may have been replayed from cache; rebuild its index from state
+            if state['networks'] and not self.ipam_index.networks:
+                self.ipam_index = IPAMIndex.from_networks(state['networks'])
+            self.validate_dns(self.load_yaml('dns-zones.yaml'), state['networks'], state['reservations'])
+            return {}
+        
+        if stage == 'access':
+            self.validate_access_matrix(self.load_yaml('access-matrix.yaml'), state['vlans'])
+            return {}
+        
+        if stage == 'platform':
+            self.validate_platform(self.load_yaml('platform.yaml'))
+            return {}
         
-        print("Validating VLANs...")
-        vlans = self.validate_vlans(vlans_data)
+        raise ValueError(f"Unknown validation stage: {stage}")
+    
+    def validate_all(self, cache: Optional[ValidationCache] = None, profile: bool = False) -> bool:
+        """Run all validation checks.
         
-        print("Validating IPAM...")
-        networks = self.validate_ipam(ipam_data, vlans)
-        reservations = ipam_data.get('reservations', {})
+        With a cache, stages whose inputs are unchanged replay their stored
+        findings instead of running. Per-stage wall time and record counts
+        are collected in ``self.stages``; contract loading is timed
+        separately as the ``load`` stage. ``profile`` prints them.
+        """
+        started = time.perf_counter()
+        print("Loading contract files...")
         
-        print("Validating DNS zones...")
-        dns_records = self.validate_dns(dns_data, networks, reservations)
+        keys = self.stage_keys() if cache is not None else {}
+        state: Dict[str, Any] = {}
+        self.stages = []
         
-        print("Validating access matrix...")
-        self.validate_access_matrix(access_data, vlans)
+        for stage, filename, _, label in STAGES:
+            self._current_file = filename
+            entry = cache.get(stage, keys[stage]) if cache is not None else None
+            findings_before = len(self.findings)
+            if entry is not None:
+                print(f"{label} (cached)")
+                self._replay(entry)
+                state.update(entry['state'])
+                self._record_stage(stage, filename, 0.0, entry.get('records', 0), True, findings_before)
+                continue
+            
+            print(label)
+            stage_started = time.perf_counter()
+            load_before, self._records = self._load_seconds, 0
+            stage_state = self.run_stage(stage, state)
+            seconds = time.perf_counter() - stage_started - (self._load_seconds - load_before)
+            state.update(stage_state)
+            self._record_stage(stage, filename, seconds, self._records, False, findings_before)
+            
+            if cache is not None:
+                stage_findings = self.findings[findings_before:]
+                cache.put(stage, keys[stage],
+                          [finding['message'] for finding in stage_findings if finding['level'] == 'error'],
+                          [finding['message'] for finding in stage_findings if finding['level'] == 'warning'],
+                          stage_state, findings=stage_findings, records=self._records)
+        self._current_file = None
         
-        print("Validating platform configuration...")
-        self.validate_platform(platform_data)
+        if cache is not None:
+            cache.save()
+        
+        loaded = [stage for stage in self.stages if not stage['cached']]
+        self.stages.insert(0, {
+            'stage': 'load', 'file': None, 'ms': round(self._load_seconds * 1000, 3),
+            'records': sum(stage['records'] for stage in loaded), 'cached': not loaded,
+            'errors': 0, 'warnings': 0,
+        })
+        self.elapsed = elapsed = time.perf_counter() - started
         
         # Print results
         print("\n" + "="*60)
@@ -270,19 +573,83 @@ class ContractValidator:
         
         print("="*60 + "\n")
         
+        if profile:
+            print_profile(self.stages, elapsed)
+            print()
+        
+        if self.hooks:
+            metrics = metrics_record(self.build_report(locate=False))
+            for hook in self.hooks:
+                hook(metrics)
+        
         return len(self.errors) == 0
+    
+    def build_report(self, locate: bool = True) -> Dict[str, Any]:
+        """Findings and stage metrics of the last run, for ``write_report``."""
+        return build_report(self.findings, self.stages, self.contracts_dir, self.elapsed, locate)
+    
+    def _replay(self, entry: Dict[str, Any]):
+        """Re-emit a cached stage's findings."""
+        findings = entry.get('findings')
+        if findings is None:
+            findings = [make_finding('error', message, self._current_file) for message in entry['errors']]
+            findings += [make_finding('warning', message, self._current_file) for message in entry['warnings']]
+        for finding in findings:
+            (self.errors if finding['level'] == 'error' else self.warnings).append(finding['message'])
+            self.findings.append(finding)
+    
+    def _record_stage(self, stage: str, filename: str, seconds: float, records: int, cached: bool,
+                      findings_from: int):
+        own = self.findings[findings_from:]
+        for finding in own:
+            finding['stage'] = stage
+        self.stages.append({
+            'stage': stage,
+            'file': filename,
+            'ms': round(seconds * 1000, 3),
+            'records': records,
+            'cached': cached,
+            'errors': sum(1 for finding in own if finding['level'] == 'error'),
+            'warnings': sum(1 for finding in own if finding['level'] == 'warning'),
+        })
 
 
 def main():
     """Main entry point."""
-    contracts_dir = Path(__file__).parent.parent.parent / 'infra' / 'contracts'
+    parser = argparse.ArgumentParser(description="Validate homelab infrastructure contracts")
+    parser.add_argument('--contracts-dir', type=Path,
+                        default=Path(__file__).parent.parent.parent / 'infra' / 'contracts',
+                        help="Directory containing the contract files")
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_FILE,
+                        help="Result cache file for incremental validation")
+    parser.add_argument('--no-cache', action='store_true', help="Revalidate every contract")
+    parser.add_argument('--profile', action='store_true', help="Print per-stage wall time and record counts")
+    parser.add_argument('--report', type=Path, help="Write findings and stage metrics to a JSON or .sarif file")
+    parser.add_argument('--report-format', choices=['json', 'sarif'], help="Report format (default: from suffix)")
+    parser.add_argument('--metrics', type=Path, help="Append this run's stage metrics as a JSON line")
+    parser.add_argument('--batch', type=Path, nargs='+', metavar='ROOT',
+                        help="Validate every contract directory under these roots and compare them")
+    parser.add_argument('-j', '--jobs', type=int, help="Validator processes in --batch mode (default: auto)")
+    args = parser.parse_args()
+    
+    if args.batch:
+        from batch_validate import DEFAULT_CACHE_DIR, run_batch
+        sys.exit(0 if run_batch(args.batch, args.jobs, None if args.no_cache else DEFAULT_CACHE_DIR) else 1)
+    
+    contracts_dir = args.contracts_dir
     
     if not contracts_dir.exists():
         print(f"Error: Contracts directory not found: {contracts_dir}")
         sys.exit(1)
     
+    cache = None if args.no_cache else ValidationCache(args.cache)
+    
     validator = ContractValidator(contracts_dir)
-    success = validator.validate_all()
+    if args.metrics:
+        validator.add_hook(jsonl_hook(args.metrics))
+    success = validator.validate_all(cache, args.profile)
+    if args.report:
+        write_report(args.report, validator.build_report(), args.report_format)
     
     sys.exit(0 if success else 1)
 
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Cross-reference validator for the k8s/ manifest tree.
+Parses every multi-document manifest once, on a process pool for large
+trees, with parse results cached by content hash, and checks:
+
+- kustomization ``resources``/``components``/patch paths exist
+- namespaces referenced by manifests are defined under k8s/base/namespaces
+- ArgoCD Applications reference an existing AppProject whose destinations
+  and source repositories allow them
+
+Usage:
+    validate_k8s.py
+    validate_k8s.py --k8s-dir k8s infra
+"""
+
+import argparse
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml not installed
+    from yaml import SafeLoader
+
+
+CACHE_VERSION = 2
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_K8S_DIR = REPO_ROOT / 'k8s'
+DEFAULT_CACHE_DIR = REPO_ROOT / '.cache' / 'k8s'
+
+# Below this many files a pool costs more to start than it saves
+POOL_THRESHOLD = 64
+
+YAML_SUFFIXES = ('.yaml', '.yml')
+KUSTOMIZATION_NAMES = ('kustomization.yaml', 'kustomization.yml', 'Kustomization')
+
+# Namespaces every cluster has
+BUILTIN_NAMESPACES = {'default', 'kube-system', 'kube-public', 'kube-node-lease'}
+
+# (file, parsed documents or None, error message or None)
+ParseResult = Tuple[str, Optional[List[Any]], Optional[str]]
+
+
+def parse_manifest(path: str, cache_dir: Optional[str] = None) -> ParseResult:
+    """Parse every document in ``path``, reusing a cached parse of identical content.
+
+    Runs in pool workers, so it only takes and returns picklable values.
+    Cache entries are marshalled plain data, which cannot run code when
+    loaded; an unreadable or foreign entry (e.g. restored by CI from an older
+    cache) is ignored and the file is parsed again.
+    """
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except OSError as e:
+        return path, None, f"cannot read file: {e}"
+
+    cache_path = None
+    if cache_dir:
+        digest = hashlib.sha256(content).hexdigest()
+        cache_path = Path(cache_dir) / digest[:2] / f"{digest}.marshal"
+        try:
+            with open(cache_path, 'rb') as f:
+                version, documents, error = marshal.load(f)
+            if version == CACHE_VERSION:
+                return path, documents, error
+        except Exception:
+            pass
+
+    try:
+        documents, error = list(yaml.load_all(content, Loader=SafeLoader)), None
+    except yaml.YAMLError as e:
+        documents, error = None, _yaml_error(e)
+
+    if cache_path is not None:
+        try:
+            entry = marshal.dumps((CACHE_VERSION, documents, error))
+        except ValueError:
+            # Timestamps and other non-marshallable values are parsed every run
+            entry = None
+        try:
+            if entry is not None:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(entry)
+                os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
+    return path, documents, error
+
+
+def _yaml_error(error: yaml.YAMLError) -> str:
+    mark = getattr(error, 'problem_mark', None)
+    problem = getattr(error, 'problem', None) or str(error)
+    if mark is not None:
+        return f"invalid YAML at line {mark.line + 1}, column {mark.column + 1}: {problem}"
+    return f"invalid YAML: {problem}"
+
+
+def _is_remote(reference: str) -> bool:
+    return '://' in reference or reference.startswith(('github.com/', 'git@')) or '?ref=' in reference
+
+
+class K8sValidator:
+    def __init__(self, k8s_dir: Path, extra_dirs: Optional[List[Path]] = None,
+                 cache_dir: Optional[Path] = DEFAULT_CACHE_DIR, jobs: Optional[int] = None):
+        self.k8s_dir = Path(k8s_dir)
+        self.extra_dirs = [Path(path) for path in extra_dirs or []]
+        self.cache_dir = cache_dir
+        self.jobs = jobs
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+        # relative path -> parsed documents (files that failed to parse are absent)
+        self.manifests: Dict[str, List[Any]] = {}
+
+    def _relative(self, path: Path) -> str:
+        try:
+            return str(path.resolve().relative_to(REPO_ROOT))
+        except ValueError:
+            return str(path)
+
+    def find_files(self) -> List[Path]:
+        """Every YAML file under the k8s tree and any extra parse-only directories."""
+        files = []
+        for root in [self.k8s_dir] + self.extra_dirs:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+                for name in sorted(filenames):
+                    if name.endswith(YAML_SUFFIXES) or name == 'Kustomization':
+                        files.append(Path(dirpath) / name)
+        return files
+
+    def parse_all(self, files: List[Path]):
+        """Parse ``files`` on a process pool (inline for small trees)."""
+        cache_dir = str(self.cache_dir) if self.cache_dir else None
+        paths = [str(path) for path in files]
+        workers = self.jobs if self.jobs is not None else (None if len(paths) >= POOL_THRESHOLD else 1)
+
+        if workers == 1:
+            results = [parse_manifest(path, cache_dir) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, len(paths) // ((os.cpu_count() or 1) * 4))
+                results = list(pool.map(parse_manifest, paths, [cache_dir] * len(paths), chunksize=chunksize))
+
+        for path, documents, error in results:
+            relative = self._relative(Path(path))
+            if error:
+                self.errors.append(f"{relative}: {error}")
+            else:
+                self.manifests[relative] = [document for document in documents if document is not None]
+
+    def _objects(self, under: Optional[Path] = None):
+        """Yield (file, document index, object) for Kubernetes objects in the k8s tree."""
+        prefix = self._relative(under or self.k8s_dir)
+        for relative, documents in self.manifests.items():
+            if not relative.startswith(prefix + os.sep):
+                continue
+            for index, document in enumerate(documents):
+                if isinstance(document, dict) and 'kind' in document:
+                    yield relative, index, document
+
+    def validate_kustomizations(self):
+        """Check that every local path a kustomization references exists."""
+        for relative, _, document in self._objects():
+            if document.get('kind') != 'Kustomization':
+                continue
+            base = (REPO_ROOT / relative).parent
+            references = [('resources', item) for item in document.get('resources') or []]
+            references += [('components', item) for item in document.get('components') or []]
+            references += [('crds', item) for item in document.get('crds') or []]
+            references += [('patchesStrategicMerge', item) for item in document.get('patchesStrategicMerge') or []
+                           if isinstance(item, str) and '\n' not in item]
+            references += [('patches', patch['path']) for patch in document.get('patches') or []
+                           if isinstance(patch, dict) and 'path' in patch]
+
+            for field, reference in references:
+                if not isinstance(reference, str) or _is_remote(reference):
+                    continue
+                target = base / reference
+                if target.is_dir():
+                    if field in ('resources', 'components') and \
+                            not any((target / name).exists() for name in KUSTOMIZATION_NAMES):
+                        self.errors.append(f"{relative}: {field} entry '{reference}' is a directory "
+                                           f"without a kustomization")
+                elif not target.is_file():
+                    self.errors.append(f"{relative}: {field} entry '{reference}' does not exist")
+
+    def defined_namespaces(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Namespaces defined under k8s/base/namespaces, and those created elsewhere.
+
+        "Elsewhere" covers Namespace objects in other directories and ArgoCD
+        Applications that sync with ``CreateNamespace=true``.
+        """
+        canonical_dir = self.k8s_dir / 'base' / 'namespaces'
+        canonical_prefix = self._relative(canonical_dir) + os.sep
+        canonical: Dict[str, str] = {}
+        elsewhere: Dict[str, str] = {}
+
+        for relative, _, document in self._objects():
+            kind = document.get('kind')
+            if kind == 'Namespace':
+                name = (document.get('metadata') or {}).get('name')
+                if name:
+                    target = canonical if relative.startswith(canonical_prefix) else elsewhere
+                    target.setdefault(name, relative)
+            elif kind == 'Application':
+                spec = document.get('spec') or {}
+                options = (spec.get('syncPolicy') or {}).get('syncOptions') or []
+                namespace = (spec.get('destination') or {}).get('namespace')
+                if namespace and 'CreateNamespace=true' in options:
+                    elsewhere.setdefault(namespace, relative)
+        return canonical, elsewhere
+
+    def validate_namespaces(self):
+        """Check that referenced namespaces are defined.
+
+        A namespace nobody creates is an error. One that exists but is not
+        defined under k8s/base/namespaces is a warning.
+        """
+        canonical, elsewhere = self.defined_namespaces()
+        references: Dict[str, List[str]] = {}
+
+        for relative, index, document in self._objects():
+            kind = document.get('kind')
+            if kind == 'Kustomization':
+                namespace = document.get('namespace')
+            elif kind == 'Application':
+                namespace = ((document.get('spec') or {}).get('destination') or {}).get('namespace')
+            else:
+                namespace = (document.get('metadata') or {}).get('namespace')
+            if isinstance(namespace, str) and namespace:
+                references.setdefault(namespace, []).append(f"{relative}#{index + 1}" if index else relative)
+
+        for namespace, sources in sorted(references.items()):
+            if namespace in canonical or namespace in BUILTIN_NAMESPACES:
+                continue
+            where = ', '.join(sorted(set(sources))[:3]) + (f" and {len(set(sources)) - 3} more"
+                                                           if len(set(sources)) > 3 else "")
+            if namespace in elsewhere:
+                self.warnings.append(f"Namespace '{namespace}' (used by {where}) is not defined under "
+                                     f"{self._relative(self.k8s_dir / 'base' / 'namespaces')}, "
+                                     f"only in {elsewhere[namespace]}")
+            else:
+                self.errors.append(f"Namespace '{namespace}' (used by {where}) is not defined anywhere")
+
+    def validate_argocd(self):
+        """Check Applications against their AppProject's destinations and source repos."""
+        projects: Dict[str, Dict[str, Any]] = {}
+        for relative, _, document in self._objects():
+            if document.get('kind') == 'AppProject':
+                name = (document.get('metadata') or {}).get('name')
+                if name:
+                    projects[name] = document.get('spec') or {}
+
+        for relative, _, document in self._objects():
+            if document.get('kind') != 'Application':
+                continue
+            name = (document.get('metadata') or {}).get('name', '?')
+            spec = document.get('spec') or {}
+            project_name = spec.get('project', 'default')
+
+            if project_name not in projects:
+                if project_name != 'default':
+                    self.errors.append(f"{relative}: Application '{name}' uses undefined AppProject '{project_name}'")
+                continue
+            project = projects[project_name]
+
+            destination = spec.get('destination') or {}
+            if not any(self._destination_allowed(destination, allowed) for allowed in project.get('destinations') or []):
+                target = destination.get('server') or destination.get('name') or '?'
+                self.errors.append(
+                    f"{relative}: Application '{name}' destination {target} namespace "
+                    f"'{destination.get('namespace', '')}' is not allowed by AppProject '{project_name}'"
+                )
+
+            sources = [spec['source']] if isinstance(spec.get('source'), dict) else []
+            sources += [source for source in spec.get('sources') or [] if isinstance(source, dict)]
+            allowed_repos = project.get('sourceRepos') or []
+            for source in sources:
+                repo = source.get('repoURL')
+                if repo and not any(fnmatchcase(repo, pattern) or fnmatchcase(repo.rstrip('/'), pattern.rstrip('/'))
+                                    for pattern in allowed_repos):
+                    self.errors.append(f"{relative}: Application '{name}' source {repo} is not in AppProject "
+                                       f"'{project_name}' sourceRepos")
+
+    @staticmethod
+    def _destination_allowed(destination: Dict[str, Any], allowed: Dict[str, Any]) -> bool:
+        namespace = destination.get('namespace', '')
+        if not fnmatchcase(namespace, str(allowed.get('namespace', ''))):
+            return False
+        if 'server' in destination:
+            return fnmatchcase(destination['server'], str(allowed.get('server', '')))
+        if 'name' in destination:
+            return fnmatchcase(destination['name'], str(allowed.get('name', '')))
+        return False
+
+    def validate_all(self) -> bool:
+        """Parse the tree and run every cross-reference check."""
+        files = self.find_files()
+        print(f"Parsing {len(files)} manifest file(s)...")
+        self.parse_all(files)
+        print("Checking kustomization references...")
+        self.validate_kustomizations()
+        print("Checking namespace references...")
+        self.validate_namespaces()
+        print("Checking ArgoCD projects...")
+        self.validate_argocd()
+
+        print("\n" + "="*60)
+        if self.errors:
+            print(f"[ERROR] Found {len(self.errors)} error(s):")
+            for error in self.errors:
+                print(f"  - {error}")
+
+        if self.warnings:
+            print(f"\n[WARNING] Found {len(self.warnings)} warning(s):")
+            for warning in self.warnings:
+                print(f"  - {warning}")
+
+        if not self.errors and not self.warnings:
+            print("[SUCCESS] All manifests are valid!")
+
+        print("="*60 + "\n")
+
+        return len(self.errors) == 0
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Validate k8s manifest cross-references")
+    parser.add_argument('paths', nargs='*', type=Path, help="Extra directories to syntax-check only")
+    parser.add_argument('--k8s-dir', type=Path, default=DEFAULT_K8S_DIR, help="Root of the k8s manifest tree")
+    parser.add_argument('-j', '--jobs', type=int, help="Parser processes (default: auto)")
+    parser.add_argument('--no-cache', action='store_true', help="Reparse every file")
+    args = parser.parse_args()
+
+    if not args.k8s_dir.exists():
+        print(f"Error: k8s directory not found: {args.k8s_dir}")
+        sys.exit(1)
+
+    validator = K8sValidator(args.k8s_dir, args.paths, None if args.no_cache else DEFAULT_CACHE_DIR, args.jobs)
+    sys.exit(0 if validator.validate_all() else 1)
+
+
+if __name__ == '__main__':
+    main()
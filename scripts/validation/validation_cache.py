@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Persistent result cache for contract validation.
+Stores each validation stage's errors, warnings and downstream state keyed
+by a content hash of its inputs, so unchanged stages can be replayed.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+
+CACHE_VERSION = 1
+
+
+def hash_files(paths: List[Path]) -> str:
+    """Return a combined digest of several files' contents."""
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(b'missing')
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def stage_key(*parts: str) -> str:
+    """Combine input digests into a stage cache key."""
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ValidationCache:
+    """JSON file mapping stage name -> {key, errors, warnings, state}."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.hits: List[str] = []
+        self.misses: List[str] = []
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Read the cache file, starting empty if it is missing or stale."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+            self.stages = data.get('stages', {})
+
+    def get(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for ``stage`` if its key still matches."""
+        entry = self.stages.get(stage)
+        if entry is not None and entry.get('key') == key:
+            self.hits.append(stage)
+            return entry
+        self.misses.append(stage)
+        return None
+
+    def put(self, stage: str, key: str, errors: List[str], warnings: List[str], state: Dict[str, Any],
+            findings: Optional[List[Dict[str, Any]]] = None, records: int = 0):
+        """Record the outcome of running ``stage`` with inputs ``key``.
+
+        ``findings`` are the structured (file/key) forms of ``errors`` and
+        ``warnings``; ``records`` is the stage's record count for metrics.
+        """
+        self.stages[stage] = {
+            'key': key,
+            'errors': list(errors),
+            'warnings': list(warnings),
+            'state': state,
+            'findings': list(findings or []),
+            'records': records,
+        }
+        self._dirty = True
+
+    def save(self):
+        """Atomically write the cache file if anything changed."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.validation-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'stages': self.stages}, f, default=str)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._dirty = False
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Structured findings, stage metrics and machine-readable reports for
+contract validation.
+Findings carry the contract file and key path they refer to; YAML
+line/column positions are resolved lazily, composing each contract at most
+once and only when a report is written.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union, Any
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml not installed
+    from yaml import SafeLoader
+
+
+REPORT_VERSION = 1
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+TOOL_NAME = 'homelab-validate-contracts'
+
+# Environment variable naming a JSON-lines file that receives run metrics
+METRICS_ENV = 'HOMELAB_VALIDATION_METRICS'
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+Key = Tuple[Union[str, int], ...]
+MetricsHook = Callable[[Dict[str, Any]], None]
+
+
+def make_finding(level: str, message: str, file: Optional[str], key: Key = ()) -> Dict[str, Any]:
+    """Build a finding dict; ``key`` is the path into the contract, e.g. ('networks', 'vlan10_iot', 'cidr')."""
+    return {'level': level, 'message': message, 'file': file, 'key': list(key)}
+
+
+def format_key(key: List[Union[str, int]]) -> str:
+    """Render a key path as ``networks.vlan10_iot.cidr`` / ``zones[0].records[3]``."""
+    text = ''
+    for part in key:
+        if isinstance(part, int):
+            text += f"[{part}]"
+        else:
+            text += ('.' if text else '') + str(part)
+    return text
+
+
+def count_records(filename: str, data: Any) -> int:
+    """Number of records a contract holds, for stage metrics."""
+    if not isinstance(data, dict):
+        return 0
+    if filename == 'vlans.yaml':
+        return len(data.get('vlans') or {})
+    if filename == 'ipam.yaml':
+        return len(data.get('networks') or {}) + len(data.get('reservations') or {})
+    if filename == 'dns-zones.yaml':
+        return sum(len(zone.get('records') or []) for zone in data.get('zones') or [] if isinstance(zone, dict))
+    if filename == 'access-matrix.yaml':
+        return len(data.get('access_matrix') or [])
+    if filename == 'platform.yaml':
+        return len(data.get('platform') or {})
+    return len(data)
+
+
+class YAMLLocator:
+    """Resolves contract key paths to 1-based YAML line/column positions."""
+
+    def __init__(self, contracts_dir: Path):
+        self.contracts_dir = Path(contracts_dir)
+        self._roots: Dict[str, Optional[yaml.Node]] = {}
+        # id(mapping node) -> {key text: (key node, value node)}
+        self._mappings: Dict[int, Dict[str, Tuple[yaml.Node, yaml.Node]]] = {}
+
+    def _root(self, filename: str) -> Optional[yaml.Node]:
+        if filename not in self._roots:
+            try:
+                with open(self.contracts_dir / filename, 'r', encoding='utf-8') as f:
+                    self._roots[filename] = yaml.compose(f, Loader=SafeLoader)
+            except (OSError, yaml.YAMLError):
+                self._roots[filename] = None
+        return self._roots[filename]
+
+    def locate(self, filename: Optional[str], key: List[Union[str, int]]) -> Tuple[Optional[int], Optional[int]]:
+        """Position of the deepest node along ``key`` that exists in the file.
+
+        A mapping entry is located at its key, so a missing field points at
+        the record that lacks it.
+        """
+        if not filename:
+            return None, None
+        node = self._root(filename)
+        if node is None:
+            return None, None
+        mark = node.start_mark
+        for part in key:
+            child = None
+            if isinstance(node, yaml.MappingNode):
+                entries = self._mappings.get(id(node))
+                if entries is None:
+                    entries = self._mappings[id(node)] = {}
+                    for key_node, value_node in node.value:
+                        entries.setdefault(str(key_node.value), (key_node, value_node))
+                entry = entries.get(str(part))
+                if entry is not None:
+                    mark, child = entry[0].start_mark, entry[1]
+            elif isinstance(node, yaml.SequenceNode) and isinstance(part, int) and 0 <= part < len(node.value):
+                child = node.value[part]
+                mark = child.start_mark
+            if child is None:
+                break
+            node = child
+        return mark.line + 1, mark.column + 1
+
+
+def build_report(findings: List[Dict[str, Any]], stages: List[Dict[str, Any]],
+                 contracts_dir: Path, elapsed: float, locate: bool = True) -> Dict[str, Any]:
+    """Assemble the JSON report: findings plus per-stage metrics.
+
+    With ``locate`` each finding gets the YAML line/column of its key, which
+    composes the affected contracts; metrics hooks skip that.
+    """
+    locator = YAMLLocator(contracts_dir) if locate else None
+    located = []
+    for finding in findings:
+        line, column = locator.locate(finding['file'], finding['key']) if locator else (None, None)
+        located.append(dict(finding, key=format_key(finding['key']), line=line, column=column))
+    return {
+        'version': REPORT_VERSION,
+        'tool': TOOL_NAME,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'contracts_dir': _display_path(contracts_dir),
+        'elapsed_ms': round(elapsed * 1000, 3),
+        'errors': sum(1 for finding in findings if finding['level'] == 'error'),
+        'warnings': sum(1 for finding in findings if finding['level'] == 'warning'),
+        'stages': stages,
+        'findings': located,
+    }
+
+
+def to_sarif(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a JSON report to SARIF 2.1.0 for code-scanning upload."""
+    rules: Dict[str, Dict[str, Any]] = {}
+    results = []
+    contracts_dir = report['contracts_dir']
+    for finding in report['findings']:
+        rule_id = f"contracts/{(finding['file'] or 'contracts').rsplit('.', 1)[0]}"
+        rules.setdefault(rule_id, {'id': rule_id, 'shortDescription': {'text': f"Contract check for {finding['file']}"}})
+        result = {
+            'ruleId': rule_id,
+            'level': finding['level'],
+            'message': {'text': finding['message']},
+            'properties': {'contractKey': finding['key']},
+        }
+        if finding['file']:
+            location = {'artifactLocation': {'uri': f"{contracts_dir}/{finding['file']}"}}
+            if finding['line']:
+                location['region'] = {'startLine': finding['line'], 'startColumn': finding['column']}
+            result['locations'] = [{'physicalLocation': location}]
+        results.append(result)
+
+    return {
+        '$schema': SARIF_SCHEMA,
+        'version': '2.1.0',
+        'runs': [{
+            'tool': {'driver': {'name': TOOL_NAME, 'rules': list(rules.values())}},
+            'results': results,
+            'properties': {'elapsed_ms': report['elapsed_ms'], 'stages': report['stages']},
+        }],
+    }
+
+
+def write_report(path: Path, report: Dict[str, Any], fmt: Optional[str] = None):
+    """Write ``report`` as JSON, or SARIF when ``fmt`` or the suffix says so."""
+    fmt = fmt or ('sarif' if Path(path).suffix == '.sarif' else 'json')
+    document = to_sarif(report) if fmt == 'sarif' else report
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, default=str)
+        f.write('\n')
+
+
+def metrics_record(report: Dict[str, Any]) -> Dict[str, Any]:
+    """The per-run numbers passed to metrics hooks: totals and stage timings, no messages."""
+    return {key: value for key, value in report.items() if key != 'findings'}
+
+
+def jsonl_hook(path: Path) -> MetricsHook:
+    """Hook that appends each run's metrics as one JSON line to ``path``."""
+    def hook(metrics: Dict[str, Any]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(metrics, separators=(',', ':'), default=str) + '\n')
+    return hook
+
+
+def default_hooks() -> List[MetricsHook]:
+    """Hooks configured through the environment (``HOMELAB_VALIDATION_METRICS``)."""
+    path = os.environ.get(METRICS_ENV)
+    return [jsonl_hook(Path(path))] if path else []
+
+
+def print_profile(stages: List[Dict[str, Any]], elapsed: float):
+    """Print a per-stage timing table, slowest stages easy to spot."""
+    print("Stage timings:")
+    for stage in stages:
+        cached = "  (cached)" if stage.get('cached') else ""
+        line = f"  {stage['stage']:<10} {stage['ms']:9.2f} ms  {stage['records']:>7} records  {stage['file'] or '':<20}"
+        print((line + cached).rstrip())
+    print(f"  {'total':<10} {elapsed * 1000:9.2f} ms")
+
+
+def _display_path(path: Path) -> str:
+    try:
+        return str(Path(path).resolve().relative_to(REPO_ROOT))
+    except ValueError:
+        return str(path)